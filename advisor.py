@@ -1,8 +1,16 @@
 # advisor.py — rule-based recommendations using forecast + historical KPIs
 from __future__ import annotations
+import string
 from datetime import date
 from statistics import median
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from helpers.advice_rules import RULEBOOK, Rule
+from helpers.tracing import span
+
+_FORMATTER = string.Formatter()
 
 def compute_temp_anomaly(forecast_temp: float, hist_day_temps: List[float] | None) -> float:
     if not hist_day_temps:
@@ -10,50 +18,152 @@ def compute_temp_anomaly(forecast_temp: float, hist_day_temps: List[float] | Non
     avg = sum(hist_day_temps) / len(hist_day_temps)
     return forecast_temp - avg
 
-def advisor_for_store(store_name: str, hist_day: Dict[str, Any], forecast_day: Dict[str, Any], cci_value: float) -> Dict[str, Any]:
-    acts_store: List[str] = []
-    acts_region: List[str] = []
-
+def _row(hist_day: Dict[str, Any], forecast_day: Dict[str, Any], cci_value: float) -> Dict[str, Any]:
+    """One store × day as the advice_columns fields (numpy scalars), for the compiled rule predicates."""
     temp_anom = compute_temp_anomaly(forecast_day.get("temp", 0.0), hist_day.get("temps", []))
-    pop = float(forecast_day.get("pop", 0.0))  # precipitation probability 0..1
-
-    # Weer → staffing & floor actions
-    if pop >= 0.60 and hist_day.get("visitors", 0) >= max(1, hist_day.get("visitors_p30", 0)):
-        acts_store.append("Verplaats pauzes 30 min vóór verwachte bui; focus op begroeten/fit-advies om conversiedip te voorkomen.")
-    if temp_anom >= 4:
-        acts_store.append("Verleng piekshift +1u en highlight lichte/outdoor sets bij entree (verwachte +SPV).")
-    if forecast_day.get("feels_like", 999) <= 5:
-        acts_store.append("Comfort-maatregelen bij entree; promoot cold-weather accessoires.")
-
-    # Dead hour / SPV taken
-    if hist_day.get("visitors", 0) >= hist_day.get("visitors_p30", 0) and hist_day.get("spv", 0) < hist_day.get("spv_median", 0):
-        acts_store.append("Dead hour: 3-stappen script (actieve begroeting • add-on prompt • kassa-script). Doel: +€0,50 SPV.")
-
-    # Macro (CCI) → boodschap
-    if cci_value < 0:
-        acts_store.append("Benadruk bundel/waardeproposities vandaag.")
-    else:
-        acts_store.append("Push premium add-ons tijdens piekuren; richt SPV-doel op +€0,50.")
-
-    # Regionale invalshoek
-    if pop >= 0.60:
-        acts_region.append(f"{store_name}: regen-risico → mobiele FTE op 16–19u en queue-buster paraat.")
-    if abs(temp_anom) >= 4:
-        acts_region.append(f"{store_name}: temperatuurafwijking {temp_anom:+.0f}°C → check thematafel/omslag.")
-
-    return {"store_actions": acts_store, "regional_actions": acts_region}
+    return {
+        "visitors": np.float64(hist_day.get("visitors", 0)),
+        "visitors_p30": np.float64(hist_day.get("visitors_p30", 0)),
+        "spv": np.float64(hist_day.get("spv", 0)),
+        "spv_median": np.float64(hist_day.get("spv_median", 0)),
+        "temp_anom": np.float64(temp_anom),
+        "pop": np.float64(forecast_day.get("pop", 0.0)),  # precipitation probability 0..1
+        "feels_like": np.float64(forecast_day.get("feels_like", 999)),
+        "cci": np.float64(cci_value),
+    }
+
+def advisor_for_store(store_name: str, hist_day: Dict[str, Any], forecast_day: Dict[str, Any], cci_value: float,
+                      rules: List[Rule] | None = None) -> Dict[str, Any]:
+    """Store and regional actions for one store on one day, rule by rule (advisor_rules.json unless `rules` is given)."""
+    row = _row(hist_day, forecast_day, cci_value)
+    acts: Dict[str, List[str]] = {"store": [], "region": []}
+    with np.errstate(invalid="ignore"):
+        for scope, predicate, message in RULEBOOK.rules() if rules is None else rules:
+            if predicate(row):
+                acts[scope].append(message.format(store=store_name, temp_anom=float(row["temp_anom"])))
+    return {"store_actions": acts["store"], "regional_actions": acts["region"]}
 
 def build_advice(company_name: str,
                  stores_hist_by_weekday: Dict[int, Dict[str, Dict[str, Any]]],
                  forecast: List[Dict[str, Any]],
-                 cci_value: float) -> Dict[str, Any]:
+                 cci_value: float,
+                 client: str | int | None = None,
+                 rules: List[Rule] | None = None) -> Dict[str, Any]:
+    """Advice per forecast day per store, evaluating the rules one store at a time.
+
+    The straightforward form of build_advice_batch (same rules, same output);
+    the benchmarks check the batch engine against it.
+    """
+    rules = RULEBOOK.rules(client) if rules is None else rules
     out = {"company": company_name, "cci": cci_value, "days": []}
+    with span("advisor.build_advice", days=len(forecast)) as s:
+        for f in forecast:
+            wd = date.fromisoformat(f["date"]).weekday()  # 0=Mon
+            day_hist = stores_hist_by_weekday.get(wd, {})
+            stores_out = []
+            for store_name, hist in day_hist.items():
+                advice = advisor_for_store(store_name, hist, f, cci_value, rules)
+                stores_out.append({"store": store_name, **advice})
+            out["days"].append({"date": f["date"], "weather": f, "stores": stores_out})
+        s.set(rows=sum(len(d["stores"]) for d in out["days"]))
+    return out
+
+
+# --- Batch-engine: alle winkels × alle dagen in één keer ---
+
+def _weekday_block(day_hist: Dict[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Column arrays for one weekday's stores (computed once per weekday, not per forecast day)."""
+    names = list(day_hist)
+    temps = [h.get("temps", []) for h in day_hist.values()]
+    return {
+        "store": np.array(names, dtype=object),
+        "visitors": np.array([h.get("visitors", 0) for h in day_hist.values()], dtype="float64"),
+        "visitors_p30": np.array([h.get("visitors_p30", 0) for h in day_hist.values()], dtype="float64"),
+        "spv": np.array([h.get("spv", 0) for h in day_hist.values()], dtype="float64"),
+        "spv_median": np.array([h.get("spv_median", 0) for h in day_hist.values()], dtype="float64"),
+        # zelfde optelvolgorde als compute_temp_anomaly → bitgelijke afwijking
+        "temp_avg": np.array([sum(t) / len(t) if t else np.nan for t in temps], dtype="float64"),
+    }
+
+
+def advice_columns(stores_hist_by_weekday: Dict[int, Dict[str, Dict[str, Any]]],
+                   forecast: List[Dict[str, Any]], cci_value: float) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """stores × days as flat column arrays (rows: forecast order, then store order) + row offsets per day."""
+    blocks: Dict[int, Dict[str, np.ndarray]] = {}
+    parts: List[Dict[str, np.ndarray]] = []
     for f in forecast:
-        wd = date.fromisoformat(f["date"]).weekday()  # 0=Mon
-        day_hist = stores_hist_by_weekday.get(wd, {})
-        stores_out = []
-        for store_name, hist in day_hist.items():
-            advice = advisor_for_store(store_name, hist, f, cci_value)
-            stores_out.append({"store": store_name, **advice})
-        out["days"].append({"date": f["date"], "weather": f, "stores": stores_out})
+        wd = date.fromisoformat(f["date"]).weekday()
+        if wd not in blocks:
+            blocks[wd] = _weekday_block(stores_hist_by_weekday.get(wd, {}))
+        block = blocks[wd]
+        n = len(block["store"])
+        temp = f.get("temp", 0.0)
+        parts.append({
+            **block,
+            "temp_anom": np.where(np.isnan(block["temp_avg"]), 0.0, temp - block["temp_avg"]) if n else np.empty(0),
+            "pop": np.full(n, float(f.get("pop", 0.0))),
+            "feels_like": np.full(n, float(f.get("feels_like", 999))),
+        })
+    sizes = np.array([len(p["store"]) for p in parts], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    keys = ["store", "visitors", "visitors_p30", "spv", "spv_median", "temp_anom", "pop", "feels_like"]
+    cols = {k: np.concatenate([p[k] for p in parts]) if parts else np.empty(0) for k in keys}
+    cols["cci"] = np.full(int(offsets[-1]), float(cci_value))
+    return cols, offsets
+
+
+def evaluate_rules(cols: Dict[str, np.ndarray], rules: List[Rule]) -> Tuple[List[List[str]], List[List[str]]]:
+    """Per row the store and regional action lists.
+
+    Every predicate runs once over all rows. A fired message is formatted once
+    per store; only messages with {temp_anom} are formatted per row.
+    """
+    n = len(cols["store"])
+    stores, anoms = cols["store"].tolist(), cols["temp_anom"].tolist()
+    actions: Dict[str, List[List[str]]] = {"store": [[] for _ in range(n)], "region": [[] for _ in range(n)]}
+    with np.errstate(invalid="ignore"):
+        for scope, predicate, message in rules:
+            rows = np.flatnonzero(np.broadcast_to(predicate(cols), (n,))).tolist()
+            out = actions[scope]
+            fields = {name for _, name, _, _ in _FORMATTER.parse(message) if name is not None}
+            if "temp_anom" in fields:
+                for i in rows:
+                    out[i].append(message.format(store=stores[i], temp_anom=anoms[i]))
+                continue
+            if not fields:  # vaste tekst: één keer (alleen {{ }} uitpakken)
+                text = message.format()
+                for i in rows:
+                    out[i].append(text)
+                continue
+            texts: Dict[str, str] = {}
+            for i in rows:
+                text = texts.get(stores[i])
+                if text is None:
+                    text = texts[stores[i]] = message.format(store=stores[i])
+                out[i].append(text)
+    return actions["store"], actions["region"]
+
+
+def build_advice_batch(company_name: str,
+                       stores_hist_by_weekday: Dict[int, Dict[str, Dict[str, Any]]],
+                       forecast: List[Dict[str, Any]],
+                       cci_value: float,
+                       client: str | int | None = None,
+                       rules: List[Rule] | None = None) -> Dict[str, Any]:
+    """Same result as build_advice, with every rule evaluated once as a column over all stores × days.
+
+    Rules come from advisor_rules.json (compiled, reloaded on change) with the
+    overrides of `client`, unless `rules` is given.
+    """
+    with span("advisor.build_advice_batch", days=len(forecast)) as s:
+        cols, offsets = advice_columns(stores_hist_by_weekday, forecast, cci_value)
+        store_actions, region_actions = evaluate_rules(cols, RULEBOOK.rules(client) if rules is None else rules)
+        names, bounds = cols["store"].tolist(), offsets.tolist()
+        out = {"company": company_name, "cci": cci_value, "days": []}
+        for k, f in enumerate(forecast):
+            lo, hi = bounds[k], bounds[k + 1]
+            stores_out = [{"store": name, "store_actions": acts, "regional_actions": region}
+                          for name, acts, region in zip(names[lo:hi], store_actions[lo:hi], region_actions[lo:hi])]
+            out["days"].append({"date": f["date"], "weather": f, "stores": stores_out})
+        s.set(rows=len(names))
     return out
@@ -0,0 +1,67 @@
+# benchmarks/bench_advisor.py – build_advice (per winkel per dag) vs build_advice_batch (regels als kolommen)
+# Gebruik: python benchmarks/bench_advisor.py [--stores 500] [--days 14] [--repeat 3]
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from advisor import build_advice, build_advice_batch
+from benchmarks.timing import best_of
+
+
+def synthetic_inputs(n_stores: int, n_days: int, seed: int = 42):
+    """stores_hist_by_weekday + forecast zoals build_advice ze verwacht, met randgevallen (lege temps, ontbrekende velden)."""
+    rng = np.random.default_rng(seed)
+    hist = {}
+    for wd in range(7):
+        day = {}
+        for s in range(n_stores):
+            entry = {
+                "visitors": int(rng.integers(0, 900)),
+                "visitors_p30": float(rng.integers(0, 600)),
+                "spv": round(float(rng.normal(2.7, 0.5)), 2),
+                "spv_median": round(float(rng.normal(2.7, 0.3)), 2),
+                "temps": [round(float(t), 1) for t in rng.normal(10, 5, int(rng.integers(0, 8)))],
+            }
+            if s % 17 == 0:
+                entry.pop("visitors_p30")
+            day[f"Winkel {s:04d}"] = entry
+        hist[wd] = day
+    start = date(2025, 11, 20)
+    forecast = []
+    for d in range(n_days):
+        f = {"date": (start + timedelta(days=d)).isoformat(), "temp": round(float(rng.normal(9, 6)), 1),
+             "pop": round(float(rng.uniform(0, 1)), 2)}
+        if d % 3:
+            f["feels_like"] = round(f["temp"] - float(rng.uniform(0, 5)), 1)
+        forecast.append(f)
+    return hist, forecast
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=500)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    hist, forecast = synthetic_inputs(args.stores, args.days)
+    for cci in (-27.0, 4.0):
+        assert build_advice("Demo", hist, forecast, cci) == build_advice_batch("Demo", hist, forecast, cci)
+
+    t_old = best_of(lambda: build_advice("Demo", hist, forecast, -27.0), args.repeat)
+    t_new = best_of(lambda: build_advice_batch("Demo", hist, forecast, -27.0), args.repeat)
+    print(f"{args.stores} winkels × {args.days} dagen ({args.stores * args.days:,} adviezen), best of {args.repeat}")
+    print(f"  build_advice       : {t_old * 1000:9.1f} ms")
+    print(f"  build_advice_batch : {t_new * 1000:9.1f} ms")
+    print(f"  speedup            : {t_old / t_new:9.1f}×  (output identiek)")
+
+
+if __name__ == "__main__":
+    main()
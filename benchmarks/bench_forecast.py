@@ -0,0 +1,85 @@
+# benchmarks/bench_forecast.py – ARIMA per shop vs snelle weekdag-seizoens voorspelling (NumPy): fout en latency
+# Gebruik: python benchmarks/bench_forecast.py [--shops 100] [--days 91] [--steps 7]
+#          python benchmarks/bench_forecast.py --company 1234   (historie uit de lokale Arrow-store)
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from helpers.forecast import ForecastEngine
+from helpers.mock_api import SyntheticRetail
+
+BENCH_END = "2025-12-31"
+
+
+def synthetic_history(n_shops: int, n_days: int, seed: int = 42) -> pd.DataFrame:
+    """count_in per shop per dag uit helpers/mock_api.py: niveau × weekdagpatroon × seizoen × trend + ruis."""
+    return SyntheticRetail(n_shops, n_days, end=BENCH_END, seed=seed).frame(["count_in"])
+
+
+def store_history(company_id: int) -> pd.DataFrame:
+    from helpers.history_store import HISTORY
+    shops = [int(s) for s in HISTORY.manifest(company_id)]
+    return HISTORY.read(company_id, shops)[["shop_id", "date", "count_in"]]
+
+
+def errors(forecasts: dict, actual: pd.DataFrame) -> tuple:
+    """MAE en MAPE over alle shops × dagen (dagen zonder bezoekers tellen niet mee in MAPE)."""
+    pred = np.array([forecasts[sid] for sid in actual.index], dtype=float)
+    truth = actual.to_numpy(dtype=float)
+    mae = np.nanmean(np.abs(pred - truth))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mape = np.nanmean(np.where(truth > 0, np.abs(pred - truth) / truth, np.nan)) * 100
+    return mae, mape
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shops", type=int, default=100)
+    parser.add_argument("--days", type=int, default=91)
+    parser.add_argument("--steps", type=int, default=7)
+    parser.add_argument("--company", type=int, default=None)
+    args = parser.parse_args()
+
+    df = store_history(args.company) if args.company else synthetic_history(args.shops, args.days)
+    dates = pd.to_datetime(df["date"])
+    cutoff = dates.max() - pd.Timedelta(days=args.steps)  # laatste `steps` dagen = holdout
+    train = df[dates <= cutoff]
+    actual = (df[dates > cutoff].assign(date=dates[dates > cutoff])
+              .pivot_table(index="shop_id", columns="date", values="count_in", aggfunc="sum"))
+    actual = actual[actual.index.isin(train["shop_id"].unique())]
+
+    engine = ForecastEngine()
+    try:
+        t0 = time.perf_counter()
+        fast = engine.forecast_all(train, args.steps, today=cutoff, mode="fast")
+        t_fast = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        auto = engine.forecast_all(train, args.steps, today=cutoff, mode="auto")  # zelfde vorm als de pagina's
+        t_auto = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        arima = ForecastEngine().forecast_all(train, args.steps, today=cutoff, mode="arima")
+        t_arima = time.perf_counter() - t0
+    finally:
+        engine.shutdown()
+
+    n = len(actual)
+    print(f"{n} shops, {args.steps} dagen holdout na {cutoff.date()}")
+    print(f"  {'':14}{'latency':>12}{'MAE':>10}{'MAPE %':>10}")
+    for name, fc, t in (("fast (numpy)", fast, t_fast), ("auto (1e run)", auto, t_auto), ("arima (pool)", arima, t_arima)):
+        mae, mape = errors(fc, actual)
+        print(f"  {name:14}{t * 1000:10.1f}ms{mae:10.1f}{mape:10.1f}")
+    print(f"  fast is {t_arima / t_fast:.0f}× sneller dan ARIMA")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_imports.py – opstartkosten per pagina: de import-regels van elke pagina in een vers proces timen
+# Gebruik: python benchmarks/bench_imports.py [--repeat 3] [pages/retailgift.py ...]
+# Alleen de imports op moduleniveau worden uitgevoerd (geen st.secrets/API-calls), dus dit draait zonder Streamlit-server.
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HEAVY = ["statsmodels", "scipy", "openai", "plotly", "pyarrow", "streamlit"]
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def page_imports(path: str) -> str:
+    """The page's module-level import statements (also inside a top-level try), as source."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    nodes = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            nodes.append(node)
+        elif isinstance(node, ast.Try):
+            nodes.extend(n for n in node.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+
+def time_imports(imports: str, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        code = PROBE.format(root=ROOT, imports=imports, heavy=HEAVY)
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if out.returncode != 0:
+            return {"seconds": float("nan"), "loaded": [], "error": out.stderr.strip().splitlines()[-1]}
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pages", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = args.pages or [os.path.join(ROOT, "home.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+    print(f"import-tijd per pagina (vers proces, best of {args.repeat})")
+    for path in pages:
+        result = time_imports(page_imports(path), args.repeat)
+        name = os.path.relpath(path, ROOT)
+        if "error" in result:
+            print(f"  {name:28s}:      fout  ({result['error']})")
+            continue
+        print(f"  {name:28s}: {result['seconds'] * 1000:7.0f} ms   geladen: {', '.join(result['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_normalize.py – oude rij-voor-rij normalisatie vs kolomgebaseerde versie
+# Gebruik: python benchmarks/bench_normalize.py [--shops 500] [--days 365] [--repeat 3]
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from helpers.mock_api import SyntheticRetail
+from helpers.normalize import KPI_COLUMNS, normalize_vemcount_response
+from helpers.schema import compact
+from benchmarks.timing import best_of
+
+BENCH_END = "2025-12-31"
+
+
+def legacy_normalize(response):
+    """Letterlijke kopie van de vorige implementatie – referentie voor output en snelheid."""
+    rows = []
+    data = response.get("data", {})
+    for period_key, shops in data.items():
+        for shop_id_str, shop_info in shops.items():
+            try:
+                shop_id = int(shop_id_str)
+            except:
+                continue
+            dates_dict = shop_info.get("dates", {})
+            if not isinstance(dates_dict, dict):
+                continue
+            for date_label, date_entry in dates_dict.items():
+                day_data = date_entry.get("data", {}) if isinstance(date_entry, dict) else {}
+                dt_raw = day_data.get("dt", "")
+                if not dt_raw:
+                    continue
+                try:
+                    dt_obj = datetime.fromisoformat(dt_raw.replace(" ", "T"))
+                    date_iso = dt_obj.strftime("%Y-%m-%d")
+                except:
+                    continue
+
+                def safe_float(val, default=0.0):
+                    try:
+                        return float(val) if val is not None else default
+                    except:
+                        return default
+
+                def safe_int(val, default=0):
+                    try:
+                        return int(float(val)) if val is not None else default
+                    except:
+                        return default
+
+                rows.append({
+                    "shop_id": shop_id,
+                    "date": date_iso,
+                    "count_in": safe_int(day_data.get("count_in")),
+                    "conversion_rate": safe_float(day_data.get("conversion_rate")),
+                    "turnover": safe_float(day_data.get("turnover")),
+                    "sales_per_visitor": safe_float(day_data.get("sales_per_visitor")),
+                })
+    df = pd.DataFrame(rows)
+    return df if not df.empty else pd.DataFrame(columns=["shop_id", "date", "count_in", "conversion_rate", "turnover", "sales_per_visitor"])
+
+
+def synthetic_payload(n_shops: int, n_days: int, seed: int = 42) -> dict:
+    """Nested data → period → shop → dates payload zoals /get-report die teruggeeft (helpers/mock_api.py)."""
+    data = SyntheticRetail(n_shops, n_days, end=BENCH_END, seed=seed, quirks=0.05)  # met strings en nulls
+    return data.report(data.shop_ids, KPI_COLUMNS, period="date", date_from=str(data.dates[0].date()), date_to=BENCH_END)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shops", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.shops, args.days)
+    legacy_df, new_df = legacy_normalize(payload), normalize_vemcount_response(payload)
+    pd.testing.assert_frame_equal(compact(legacy_df), new_df)  # zelfde waarden, compact schema
+
+    t_old = best_of(lambda: legacy_normalize(payload), args.repeat)
+    t_new = best_of(lambda: normalize_vemcount_response(payload), args.repeat)
+    print(f"{args.shops} shops × {args.days} dagen ({args.shops * args.days:,} rijen), best of {args.repeat}")
+    print(f"  legacy   : {t_old * 1000:9.1f} ms")
+    print(f"  columnar : {t_new * 1000:9.1f} ms")
+    print(f"  speedup  : {t_old / t_new:9.1f}×  (output identiek)")
+    mem_old, mem_new = legacy_df.memory_usage(deep=True).sum(), new_df.memory_usage(deep=True).sum()
+    print(f"  geheugen : {mem_old / 2**20:7.1f} MB → {mem_new / 2**20:.1f} MB ({mem_old / mem_new:.1f}× kleiner)")
+
+
+if __name__ == "__main__":
+    main()
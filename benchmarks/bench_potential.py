@@ -0,0 +1,67 @@
+# benchmarks/bench_potential.py – Location Potential 2.0: oude iterrows-lus vs één groupby voor alle shops
+# Gebruik: python benchmarks/bench_potential.py [--shops 1000] [--days 365] [--repeat 3]
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from helpers.mock_api import SyntheticRetail
+from helpers.potential import location_potential
+from benchmarks.timing import best_of
+
+BENCH_END = "2025-12-31"
+
+
+def legacy_potential(df, df_full):
+    """Letterlijke kopie van de vorige lus in pages/retailgift_regio.py."""
+    pot_list = []
+    for _, r in df.iterrows():
+        hist = df_full[df_full["shop_id"] == r["shop_id"]]
+        best_conv = hist["conversion_rate"].quantile(0.75)/100 if len(hist)>5 else 0.16
+        best_spv = hist["sales_per_visitor"].quantile(0.75) if len(hist)>5 else 3.3
+        foot = hist["count_in"].tail(30).mean() or 500
+        pot_perf = foot * best_conv * best_spv * 30 * 1.03
+        pot_m2 = r.get("sq_meter", 100) * 87.5 * 1.03
+        final = max(pot_perf, pot_m2)
+        gap = final - r["turnover"]
+        pot_list.append({"Winkel": r["name"], "Gap €": int(gap), "Realisatie": f"{int(r['turnover']/final*100)}%"})
+    return pd.DataFrame(pot_list).sort_values("Gap €", ascending=False)
+
+
+def synthetic_frames(n_shops: int, n_days: int, seed: int = 42):
+    data = SyntheticRetail(n_shops, n_days, end=BENCH_END, seed=seed)  # helpers/mock_api.py
+    dates = data.dates
+    df_full = data.frame()
+    df_full = df_full[~((df_full["shop_id"] % 97 == 0) & (df_full["date"] > dates[3]))]  # paar shops met weinig historie
+    month = df_full[df_full["date"] >= dates[-30]]
+    df = (month.groupby("shop_id")["turnover"].sum()
+          .reindex(df_full["shop_id"].unique(), fill_value=0).rename_axis("shop_id").reset_index())
+    df["name"] = "Winkel " + df["shop_id"].astype(str)
+    return df, df_full
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shops", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df, df_full = synthetic_frames(args.shops, args.days)
+    pd.testing.assert_frame_equal(legacy_potential(df, df_full), location_potential(df, df_full))
+
+    t_old = best_of(lambda: legacy_potential(df, df_full), args.repeat)
+    t_new = best_of(lambda: location_potential(df, df_full), args.repeat)
+    print(f"{len(df)} shops, {len(df_full):,} dagrijen, best of {args.repeat}")
+    print(f"  iterrows : {t_old * 1000:9.1f} ms")
+    print(f"  groupby  : {t_new * 1000:9.1f} ms")
+    print(f"  speedup  : {t_old / t_new:9.1f}×  (gap-tabel identiek)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# benchmarks/suite.py – benchmarksuite voor de hele dashboard-pijplijn: elke stap × aantal shops × historielengte
+# Gebruik: python benchmarks/suite.py [--shops 10 100 500 2000] [--days 30 180 365 730] [--repeat 3] [--quick]
+#                                     [--only normalize potential ...] [--out benchmarks/results/x.json]
+#                                     [--baseline benchmarks/results/vorige.json] [--tolerance 0.2]
+# Schrijft een JSON-rapport (commit, versies, beste tijd per stap/grootte) om releases te vergelijken; met --baseline
+# worden stappen die meer dan --tolerance trager zijn als regressie gemeld en eindigt het script met exit code 1.
+# Data komt uit helpers/mock_api.py (vaste seed en einddatum), de pijplijn-stappen lopen via de in-process fake API.
+import argparse
+import functools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime
+
+# vóór de helpers-imports: history/stats in een wegwerpmap, geen weer-API, geen ARIMA-pool op de achtergrond
+os.environ["HISTORY_DIR"] = tempfile.mkdtemp(prefix="bench-history-")
+os.environ["WEATHER_PROVIDER"] = "file"
+os.environ["WEATHER_DIR"] = os.path.join(os.environ["HISTORY_DIR"], "weather")
+os.environ["FORECAST_MODE"] = "fast"
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from advisor import build_advice, build_advice_batch
+from benchmarks.timing import best_of
+from helpers.dashboard import Dashboard
+from helpers.forecast import ForecastEngine, forecast_series, recent_series
+from helpers.history_store import HISTORY, HISTORY_OUTPUTS
+from helpers.mock_api import MOCK_BASE, SyntheticRetail, use_mock_api
+from helpers.normalize import KPI_COLUMNS, normalize_stream, normalize_vemcount_response
+from helpers.potential import location_potential
+from helpers.reports import invalidate
+from helpers.rollup import Rollup
+from helpers.running_stats import STATS
+from helpers.shop_index import ShopDateIndex
+from helpers.weekday_profile import advice_history, weekday_profiles
+
+BENCH_END = "2025-12-31"
+BENCH_COMPANY = 3363
+FORECAST_SAMPLE = 8  # ARIMA per shop duurt ~0.1–0.3 s: een vaste steekproef, tijd per shop in het rapport
+NOISE_FLOOR = 0.005  # stappen onder 5 ms tellen niet mee als regressie
+GRIDS = {"full": ([10, 100, 500, 2000], [30, 180, 365, 730]), "quick": ([10, 100], [30, 365])}
+
+
+class Fixture:
+    """Inputs for one (shops, days) cell, built on first use so --only skips what it does not need."""
+
+    def __init__(self, shops: int, days: int):
+        self.shops, self.days = shops, days
+        self.data = SyntheticRetail(shops, days, companies=[BENCH_COMPANY], end=BENCH_END)
+        self.end = self.data.end
+
+    @functools.cached_property
+    def payload(self) -> dict:
+        return self.data.report(self.data.shop_ids, KPI_COLUMNS, period="date",
+                                date_from=str(self.data.dates[0].date()), date_to=BENCH_END)
+
+    @functools.cached_property
+    def body(self) -> bytes:
+        return json.dumps(self.payload, separators=(",", ":")).encode()
+
+    @functools.cached_property
+    def locations(self) -> list:
+        return self.data.locations(BENCH_COMPANY)
+
+    @functools.cached_property
+    def df_full(self) -> pd.DataFrame:
+        return self.data.frame(HISTORY_OUTPUTS)
+
+    @functools.cached_property
+    def index(self):
+        regions = {loc["id"]: loc["region"] for loc in self.locations}
+        return ShopDateIndex(self.df_full), Rollup(self.df_full, regions)
+
+    @functools.cached_property
+    def month(self):
+        first = self.end.replace(day=1)
+        return first, first + pd.DateOffset(months=1) - pd.Timedelta(days=1)
+
+    @functools.cached_property
+    def period_df(self) -> pd.DataFrame:
+        df = self.index[1].period(*self.month)
+        df["name"] = "Winkel " + df["shop_id"].astype(str)
+        df["sq_meter"] = 100
+        return df
+
+    @functools.cached_property
+    def advice_inputs(self):
+        names = {loc["id"]: loc["name"] for loc in self.locations}
+        hist = advice_history(weekday_profiles(self.df_full), names)
+        rng = np.random.default_rng(7)
+        forecast = [{"date": (self.end + pd.Timedelta(days=d)).date().isoformat(), "temp": round(float(rng.normal(6, 5)), 1),
+                     "feels_like": round(float(rng.normal(3, 5)), 1), "pop": round(float(rng.uniform(0, 1)), 2)}
+                    for d in range(1, 8)]
+        return hist, forecast
+
+
+# --- de stappen: (fixture) → (functie om te timen, aantal eenheden, reset vóór elke meting of None) ---
+
+def case_normalize(fx: Fixture):
+    payload = fx.payload
+    return lambda: normalize_vemcount_response(payload), fx.shops * fx.days, None
+
+
+def case_normalize_stream(fx: Fixture):
+    chunks = [fx.body[i:i + 65536] for i in range(0, len(fx.body), 65536)]  # zoals r.iter_bytes()
+    return lambda: normalize_stream(chunks), fx.shops * fx.days, None
+
+
+def case_index(fx: Fixture):
+    """What a data load builds once: the (shop, date) index and the rollup (store/regio pages)."""
+    df, regions = fx.df_full, {loc["id"]: loc["region"] for loc in fx.locations}
+    return lambda: (ShopDateIndex(df), Rollup(df, regions)), fx.shops * fx.days, None
+
+
+def case_period(fx: Fixture):
+    """Store page per rerun: this month's KPIs per shop and the daily rows of one shop."""
+    idx, rollup = fx.index
+    first, last = fx.month
+    shop = int(fx.data.shop_ids[0])
+
+    def run():
+        rollup.period(first, last)
+        rollup.totals(first - pd.DateOffset(months=1), first - pd.Timedelta(days=1))
+        idx.range(first, last, shop_ids=[shop])
+    return run, fx.shops, None
+
+
+def case_potential(fx: Fixture):
+    df, df_full = fx.period_df, fx.df_full
+    return lambda: location_potential(df, df_full), fx.shops, None
+
+
+def case_forecast_series(fx: Fixture):
+    series, _ = recent_series(fx.df_full, fx.end)
+    sample = list(series.values())[:FORECAST_SAMPLE]
+    forecast_series(sample[0], 7)  # statsmodels-import niet meetellen
+    return lambda: [forecast_series(s, 7) for s in sample], len(sample), None
+
+
+def case_forecast_fast(fx: Fixture):
+    engine, df_full = ForecastEngine(), fx.df_full
+    return lambda: engine.forecast_fast(df_full, 7, today=fx.end), fx.shops, None
+
+
+def case_advice(fx: Fixture):
+    hist, forecast = fx.advice_inputs
+    return lambda: build_advice("Bench", hist, forecast, -20.0), fx.shops * len(forecast), None
+
+
+def case_advice_batch(fx: Fixture):
+    hist, forecast = fx.advice_inputs
+    return lambda: build_advice_batch("Bench", hist, forecast, -20.0), fx.shops * len(forecast), None
+
+
+def _pipeline(fx: Fixture, cold: bool, latency: float):
+    """Page load through the fake API: sync + load, month KPIs, outlook, weekday averages, potential, forecast."""
+    data = fx.data  # zelfde einddatum als de andere stappen; Dashboard(today=...) zet die door tot in de history-sync
+    api = use_mock_api(data, latency=latency)
+    locations = data.locations(BENCH_COMPANY)
+    shop_ids = [loc["id"] for loc in locations]
+
+    def reset():
+        invalidate(BENCH_COMPANY)
+        STATS._mem.pop(BENCH_COMPANY, None)
+        if cold:
+            shutil.rmtree(os.path.join(HISTORY.root, f"company={BENCH_COMPANY}"), ignore_errors=True)
+
+    def run():
+        before = sum(api.requests.values())
+        dash = Dashboard(MOCK_BASE, BENCH_COMPANY, locations, today=data.end)
+        err = dash.load(shop_ids)
+        assert err is None, err
+        first, last = dash.period_bounds()["this_month"]
+        dash.period_kpis(shop_ids, first, last)
+        dash.month_outlook(shop_ids)
+        dash.weekday_avg(shop_ids)
+        dash.potential(shop_ids, first, last)
+        dash.forecast(shop_ids, 7)
+        run.requests = sum(api.requests.values()) - before  # API-calls van deze paginaload
+        run.rows = len(dash.data(shop_ids).df_full)  # "this_year": bij days > dagen-in-het-jaar minder dan shops × days
+
+    if not cold:  # warme store: één keer vooraf synchroniseren
+        reset()
+        shutil.rmtree(os.path.join(HISTORY.root, f"company={BENCH_COMPANY}"), ignore_errors=True)
+        run()
+    return run, fx.shops, reset
+
+
+CASES = {
+    "normalize": case_normalize,
+    "normalize_stream": case_normalize_stream,
+    "index": case_index,
+    "period": case_period,
+    "potential": case_potential,
+    "forecast_series": case_forecast_series,
+    "forecast_fast": case_forecast_fast,
+    "advice": case_advice,
+    "advice_batch": case_advice_batch,
+    "pipeline_cold": lambda fx, latency=0.0: _pipeline(fx, cold=True, latency=latency),
+    "pipeline_warm": lambda fx, latency=0.0: _pipeline(fx, cold=False, latency=latency),
+}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"created": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """(result, old seconds, ratio) for every step that got more than `tolerance` slower than the baseline."""
+    old = {(r["case"], r["shops"], r["days"]): r["seconds"] for r in baseline.get("results", [])}
+    out = []
+    for r in results:
+        before = old.get((r["case"], r["shops"], r["days"]))
+        if before and max(r["seconds"], before) >= NOISE_FLOOR and r["seconds"] > before * (1 + tolerance):
+            out.append((r, before, r["seconds"] / before))
+    return out
+
+
+def print_table(results: list, days_grid: list) -> None:
+    print(f"\n{'stap':18}{'shops':>7}" + "".join(f"{f'{d} d':>11}" for d in days_grid) + "   (ms, best of)")
+    by_key = {(r["case"], r["shops"], r["days"]): r for r in results}
+    for case in dict.fromkeys(r["case"] for r in results):
+        for shops in sorted({r["shops"] for r in results if r["case"] == case}):
+            cells = [by_key.get((case, shops, d)) for d in days_grid]
+            print(f"{case:18}{shops:7d}" + "".join(f"{c['seconds'] * 1000:11.1f}" if c else f"{'-':>11}" for c in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shops", type=int, nargs="+", default=None)
+    parser.add_argument("--days", type=int, nargs="+", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help=f"klein raster {GRIDS['quick']}")
+    parser.add_argument("--only", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--latency", type=float, default=0.0, help="gesimuleerde API-latency (s) in de pijplijn-stappen")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    shops_grid, days_grid = GRIDS["quick" if args.quick else "full"]
+    shops_grid, days_grid = args.shops or shops_grid, args.days or days_grid
+
+    results = []
+    try:
+        for shops in shops_grid:
+            for days in days_grid:
+                fx = Fixture(shops, days)
+                for case in args.only:
+                    make = CASES[case]
+                    fn, units, reset = make(fx, args.latency) if case.startswith("pipeline") else make(fx)
+                    seconds = best_of(fn, args.repeat, reset)
+                    result = {"case": case, "shops": shops, "days": days, "seconds": seconds, "units": units,
+                              "per_unit_us": seconds / max(units, 1) * 1e6}
+                    if hasattr(fn, "requests"):
+                        result["requests"] = fn.requests
+                    if hasattr(fn, "rows"):
+                        result["rows"] = fn.rows
+                    results.append(result)
+                    print(f"  {case:18} {shops:5d} shops × {days:3d} d: {seconds * 1000:9.1f} ms", flush=True)
+                del fx
+    finally:
+        shutil.rmtree(os.environ["HISTORY_DIR"], ignore_errors=True)
+
+    report = {**environment(), "repeat": args.repeat, "end": BENCH_END, "forecast_sample": FORECAST_SAMPLE,
+              "results": results}
+    print_table(results, days_grid)
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"{date.today().isoformat()}-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nrapport: {os.path.relpath(out)}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.tolerance)
+        print(f"vs {args.baseline} (commit {baseline.get('commit')}): "
+              f"{len(slower)} regressie(s) boven {args.tolerance:.0%}")
+        for r, before, ratio in slower:
+            print(f"  {r['case']:18} {r['shops']:5d} shops × {r['days']:3d} d: "
+                  f"{before * 1000:9.1f} → {r['seconds'] * 1000:9.1f} ms  ({ratio:.2f}×)")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+# benchmarks/timing.py – gedeelde timer voor de benchmarks: beste tijd van `repeat` runs
+# Gebruik: from benchmarks.timing import best_of (repo-root staat op sys.path, ook als script gestart)
+import time
+
+
+def best_of(fn, repeat: int, reset=None) -> float:
+    """Fastest of `repeat` calls to fn(), in seconds; reset() runs untimed before each call."""
+    timings = []
+    for _ in range(repeat):
+        if reset:
+            reset()
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
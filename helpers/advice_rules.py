@@ -0,0 +1,201 @@
+# helpers/advice_rules.py – declaratieve advisor-regels (JSON/YAML) → gecompileerde, gevectoriseerde predicaten
+# Formaat (zie advisor_rules.json):
+#   thresholds: {naam: getal}
+#   rules:      [{id, scope: store|region, when: [[lhs, op, rhs], ...], unless: [...], message}]
+#   clients:    {company_id: {thresholds: {...}, disable: [rule-id, ...]}}
+# Operand: getal | "$drempel" | kolomnaam | {"abs": x} | {"max": [x, y]} | {"min": [x, y]}
+# Message: tekst met optioneel {store} en {temp_anom[:spec]}; letterlijke accolades als {{ }}
+from __future__ import annotations
+import json
+import operator
+import os
+import string
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import yaml  # optioneel: alleen nodig voor .yaml/.yml regelbestanden
+except ImportError:
+    yaml = None
+
+RULES_PATH = os.getenv("ADVISOR_RULES", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "advisor_rules.json"))
+RELOAD_CHECK_SECONDS = float(os.getenv("ADVISOR_RULES_CHECK", "2"))  # hoe vaak mtime gecheckt wordt
+
+# kolommen van advisor.advice_columns waar regels naar mogen verwijzen
+FIELDS = ("visitors", "visitors_p30", "spv", "spv_median", "temp_anom", "pop", "feels_like", "cci")
+OPS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt, "==": operator.eq, "!=": operator.ne}
+SCOPES = ("store", "region")
+MESSAGE_FIELDS = {"store": "Winkel", "temp_anom": 0.0}  # placeholders die advisor.evaluate_rules invult (+ proefwaarde)
+
+Rule = Tuple[str, Callable[[Dict[str, np.ndarray]], np.ndarray], str]
+
+
+def load_rules_file(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError(f"{path}: PyYAML is not installed, use JSON")
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def _operand(spec: Any, thresholds: Dict[str, float], rule_id: str) -> Callable[[Dict[str, np.ndarray]], Any]:
+    if isinstance(spec, bool) or not isinstance(spec, (int, float, str, dict)):
+        raise ValueError(f"rule {rule_id}: invalid operand {spec!r}")
+    if isinstance(spec, (int, float)):
+        value = float(spec)
+        return lambda c: value
+    if isinstance(spec, str):
+        if spec.startswith("$"):
+            if spec[1:] not in thresholds:
+                raise ValueError(f"rule {rule_id}: unknown threshold {spec}")
+            value = float(thresholds[spec[1:]])
+            return lambda c: value
+        if spec not in FIELDS:
+            raise ValueError(f"rule {rule_id}: unknown field {spec!r}")
+        return lambda c: c[spec]
+    if len(spec) != 1:
+        raise ValueError(f"rule {rule_id}: invalid operand {spec!r}")
+    (fn, args), = spec.items()
+    if fn == "abs":
+        inner = _operand(args, thresholds, rule_id)
+        return lambda c: np.abs(inner(c))
+    if fn in ("max", "min") and isinstance(args, list) and len(args) == 2:
+        a, b = (_operand(x, thresholds, rule_id) for x in args)
+        ufunc = np.maximum if fn == "max" else np.minimum
+        return lambda c: ufunc(a(c), b(c))
+    raise ValueError(f"rule {rule_id}: invalid operand {spec!r}")
+
+
+def _condition(spec: Any, thresholds: Dict[str, float], rule_id: str) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    if not isinstance(spec, list) or len(spec) != 3 or spec[1] not in OPS:
+        raise ValueError(f"rule {rule_id}: condition must be [lhs, op, rhs] with op in {list(OPS)}, got {spec!r}")
+    lhs, op, rhs = _operand(spec[0], thresholds, rule_id), OPS[spec[1]], _operand(spec[2], thresholds, rule_id)
+    return lambda c: op(lhs(c), rhs(c))
+
+
+def _check_message(message: str, rule_id: str) -> None:
+    """Reject templates evaluate_rules cannot fill: unknown or nested placeholders, bad specs, stray braces."""
+    try:
+        fields = [(name, spec) for _, name, spec, _ in string.Formatter().parse(message) if name is not None]
+    except ValueError as e:
+        raise ValueError(f"rule {rule_id}: invalid message template: {e}") from None
+    for name, spec in fields:
+        if name not in MESSAGE_FIELDS:
+            raise ValueError(f"rule {rule_id}: unknown placeholder {{{name}}} in message, use {list(MESSAGE_FIELDS)}")
+        if "{" in spec:
+            raise ValueError(f"rule {rule_id}: nested placeholder in {{{name}:{spec}}}")
+    try:
+        message.format(**MESSAGE_FIELDS)
+    except ValueError as e:
+        raise ValueError(f"rule {rule_id}: invalid message template: {e}") from None
+
+
+def _all(conditions: List[Callable]) -> Callable[[Dict[str, np.ndarray]], Any]:
+    if len(conditions) == 1:
+        return conditions[0]
+    def predicate(c):
+        mask = conditions[0](c)
+        for cond in conditions[1:]:
+            mask = mask & cond(c)
+        return mask
+    return predicate
+
+
+def compile_rules(spec: Dict[str, Any], client: str | int | None = None) -> List[Rule]:
+    """Rule spec → [(scope, predicate over columns, message)] for advisor.evaluate_rules.
+
+    A rule fires where all `when` conditions hold and not all `unless` conditions
+    hold. Thresholds and disabled rules of `client` override the defaults.
+    Messages may only use the MESSAGE_FIELDS placeholders; anything else is a
+    ValueError here instead of a KeyError while rendering.
+    """
+    overrides = (spec.get("clients") or {}).get(str(client), {}) if client is not None else {}
+    thresholds = {**(spec.get("thresholds") or {}), **(overrides.get("thresholds") or {})}
+    disabled = set(overrides.get("disable") or [])
+    compiled: List[Rule] = []
+    for i, rule in enumerate(spec.get("rules") or []):
+        rule_id = rule.get("id", f"#{i}")
+        if rule_id in disabled:
+            continue
+        if rule.get("scope") not in SCOPES or not isinstance(rule.get("message"), str):
+            raise ValueError(f"rule {rule_id}: needs scope in {SCOPES} and a message")
+        _check_message(rule["message"], rule_id)
+        when = [_condition(c, thresholds, rule_id) for c in rule.get("when") or []]
+        unless = [_condition(c, thresholds, rule_id) for c in rule.get("unless") or []]
+        if not when and not unless:
+            raise ValueError(f"rule {rule_id}: needs 'when' or 'unless'")
+        if unless:
+            positive, negative = (_all(when) if when else None), _all(unless)
+            predicate = (lambda c, p=positive, n=negative: p(c) & ~n(c)) if positive else (lambda c, n=negative: ~n(c))
+        else:
+            predicate = _all(when)
+        compiled.append((rule["scope"], predicate, rule["message"]))
+    return compiled
+
+
+class RuleBook:
+    """Compiled advisor rules from one file, recompiled when the file changes.
+
+    The file's mtime is checked at most every `check_every` seconds; per client
+    the compiled list is cached until the next change. A broken edit keeps the
+    last good version in use (see `error`).
+    """
+
+    def __init__(self, path: str = RULES_PATH, check_every: float = RELOAD_CHECK_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.check_every = check_every
+        self.clock = clock
+        self.error: str | None = None
+        self._lock = threading.RLock()
+        self._spec: Dict[str, Any] | None = None
+        self._mtime: float | None = None
+        self._checked = float("-inf")
+        self._compiled: Dict[str | None, List[Rule]] = {}
+
+    def _refresh(self) -> None:
+        now = self.clock()
+        if self._spec is not None and now - self._checked < self.check_every:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._spec is None:
+                raise
+            self.error = str(e)
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            spec = load_rules_file(self.path)
+            compiled = {None: compile_rules(spec)}
+            for client in spec.get("clients") or {}:
+                compiled[str(client)] = compile_rules(spec, client)
+        except Exception as e:
+            if self._spec is None:
+                raise
+            self.error = f"{self.path}: {e}"  # vorige versie blijft actief
+            self._mtime = mtime
+            return
+        self._spec, self._mtime, self._compiled, self.error = spec, mtime, compiled, None
+
+    def rules(self, client: str | int | None = None) -> List[Rule]:
+        """Compiled rules for `client` (company_id); clients without overrides get the defaults."""
+        with self._lock:
+            self._refresh()
+            key = str(client) if client is not None else None
+            return self._compiled.get(key, self._compiled[None])
+
+    def thresholds(self, client: str | int | None = None) -> Dict[str, float]:
+        with self._lock:
+            self._refresh()
+            overrides = (self._spec.get("clients") or {}).get(str(client), {}) if client is not None else {}
+            return {**(self._spec.get("thresholds") or {}), **(overrides.get("thresholds") or {})}
+
+
+RULEBOOK = RuleBook()
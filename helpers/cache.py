@@ -0,0 +1,71 @@
+# helpers/cache.py – kleine thread-safe TTL + LRU cache (gedeeld door alle pagina's in het Streamlit-proces)
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Tuple
+
+
+class TTLCache:
+    """Dict-like cache with a time-to-live per entry and least-recently-used eviction.
+
+    `clock` is injectable so schedulers and benchmarks can run on a fake clock.
+    """
+
+    def __init__(self, maxsize: int = 32, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= self.clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._data[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Snapshot of the live (non-expired) entries, most recently used last."""
+        with self._lock:
+            now = self.clock()
+            for key in [k for k, (exp, _) in self._data.items() if exp <= now]:
+                del self._data[key]
+            return iter([(k, v) for k, (_, v) in self._data.items()])
+
+    def touch(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+_MISSING = object()
@@ -0,0 +1,249 @@
+# helpers/dashboard.py – headless rekenkern voor alle pagina's: laden, periode-KPI's, voorspelling, potentieel, advies
+# Geen Streamlit: de pagina's tekenen alleen wat Dashboard teruggeeft. Resultaten worden per invoer gememoïseerd
+# (zelfde TTL als de report-cache), dus het zware werk draait één keer per data-verversing, niet per klik per pagina.
+from __future__ import annotations
+import functools
+import itertools
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from .cache import TTLCache
+from .forecast import FORECASTS
+from .potential import location_potential
+from .reports import DERIVED_CACHES, REPORT_TTL_SECONDS, ReportPlan, fetch_history
+from .running_stats import STATS
+from .schema import add_shop_meta
+from .tracing import span
+from .shop_index import ShopDateIndex
+from .rollup import Rollup
+from .weather import WEATHER, area_forecast, postcode_for
+from .weekday_profile import PROFILE_WEEKS, PROFILES, RECENT_WEEKS, advice_history
+
+KPI_OUTPUTS = ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]
+WEEKDAY_OUTPUTS = ["conversion_rate", "sales_per_transaction"]
+MONTH_UPLIFT = 1.07  # +7% Q4 uplift op de rest van de maand
+DEFAULT_WEEKDAY_AVG = {"conversion_rate": 13.0, "sales_per_transaction": 22.0}
+
+# sleutel begint met company_id → reports.invalidate(company_id) ruimt ook deze resultaten op
+DASHBOARD_CACHE = TTLCache(maxsize=512, ttl=REPORT_TTL_SECONDS)
+DERIVED_CACHES.append(DASHBOARD_CACHE)
+_versions = itertools.count(1)
+
+
+class ReportError(RuntimeError):
+    """/get-report failed; `err` is the api_get_report error dict."""
+
+    def __init__(self, err: Dict[str, Any]):
+        super().__init__(err.get("error") if isinstance(err, dict) else str(err))
+        self.err = err
+
+
+class ClientData:
+    """One load of a client's report: sorted frame + index, rollup and the weekday frame."""
+
+    def __init__(self, df_full: pd.DataFrame, weekday: pd.DataFrame, regions: Dict[int, str]):
+        self.idx = ShopDateIndex(df_full)
+        self.df_full = self.idx.df
+        self.weekday = weekday
+        self.rollup = Rollup(self.df_full, regions)
+        self.version = next(_versions)  # nieuwe load → afgeleide resultaten opnieuw
+
+
+def _shops(shop_ids: Iterable[int]) -> Tuple[int, ...]:
+    return tuple(sorted({int(s) for s in shop_ids}))
+
+
+def _arg(value: Any) -> Any:
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)) or hasattr(value, "isoformat"):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_arg(v) for v in value)
+    return value
+
+
+def _memo(method):
+    """Memoize per (company, today, shops, data version, arguments); frames are handed out as copies."""
+    @functools.wraps(method)
+    def wrapper(self: "Dashboard", shop_ids: Iterable[int], *args, **kwargs):
+        shops = _shops(shop_ids)
+        key = (self.company_id, self.today.isoformat(), method.__name__, shops, self.data(shops).version,
+               tuple(_arg(a) for a in args), tuple(sorted((k, _arg(v)) for k, v in kwargs.items())))
+        with span(f"dashboard.{method.__name__}", shops=len(shops)) as s:
+            hit = DASHBOARD_CACHE.get(key)
+            s.set(cache="hit" if hit is not None else "miss")
+            if hit is None:
+                hit = method(self, shops, *args, **kwargs)
+                DASHBOARD_CACHE.set(key, hit)
+        return hit.copy() if isinstance(hit, (pd.DataFrame, pd.Series, dict)) else hit
+    return wrapper
+
+
+class Dashboard:
+    """Analytics for one client, without any UI.
+
+        dash = Dashboard(API_BASE, client_id, locations)
+        err = dash.load(shop_ids)                # api_get_report error dict of None
+        df = dash.period_kpis(shop_ids, first_of_month, last_of_this_month)
+        outlook = dash.month_outlook(shop_ids)
+
+    Construct it freshly on every rerun; the work is cached at module level,
+    shared by all pages and sessions of the process.
+    """
+
+    def __init__(self, api_base: str, company_id: int, locations: List[Dict[str, Any]],
+                 today: pd.Timestamp | str | None = None):
+        self.api_base = api_base
+        self.company_id = company_id
+        self.locations = locations
+        self.today = pd.Timestamp(today if today is not None else pd.Timestamp.today()).normalize()
+        self.names = {loc["id"]: loc["name"] for loc in locations}
+        self.regions = {loc["id"]: loc.get("region", "ALL") for loc in locations}
+        self.sq_meters = {loc["id"]: loc.get("sq_meter", 100) for loc in locations}
+        self.postcodes = {loc["id"]: postcode_for(loc) for loc in locations}
+
+    # --- kalender ---
+    def period_bounds(self) -> Dict[str, Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Named periods (the /get-report period names) → (first, last day)."""
+        today = self.today
+        start_week = today - pd.Timedelta(days=today.weekday())
+        first_of_month = today.replace(day=1)
+        return {
+            "yesterday": (today - pd.Timedelta(days=1), today - pd.Timedelta(days=1)),
+            "today": (today, today),
+            "this_week": (start_week, start_week + pd.Timedelta(days=6)),
+            "last_week": (start_week - pd.Timedelta(days=7), start_week - pd.Timedelta(days=1)),
+            "this_month": (first_of_month, first_of_month + pd.DateOffset(months=1) - pd.Timedelta(days=1)),
+            "last_month": (first_of_month - pd.DateOffset(months=1), first_of_month - pd.Timedelta(days=1)),
+        }
+
+    # --- data ---
+    def load(self, shop_ids: Iterable[int]) -> Dict[str, Any] | None:
+        """Fetch (or reuse) the report for these shops; returns the api_get_report error dict, or None."""
+        try:
+            self.data(shop_ids)
+        except ReportError as e:
+            return e.err
+        return None
+
+    def data(self, shop_ids: Iterable[int]) -> ClientData:
+        shops = _shops(shop_ids)
+        key = (self.company_id, self.today.isoformat(), "data", shops)
+        hit = DASHBOARD_CACHE.get(key)
+        if hit is not None:
+            return hit
+        with span("dashboard.data", shops=len(shops)) as s:
+            plan = ReportPlan(self.api_base, self.company_id, shops, today=self.today.date())
+            plan.need("kpis", KPI_OUTPUTS)
+            plan.need("weekday", WEEKDAY_OUTPUTS)
+            frames, err = plan.fetch()  # één /get-report voor alle secties
+            if err:
+                raise ReportError(err)
+            df_full = add_shop_meta(frames["kpis"], self.locations).dropna(subset=["date"])
+            data = ClientData(df_full, frames["weekday"], self.regions)
+            s.set(rows=len(df_full))
+        DASHBOARD_CACHE.set(key, data)
+        return data
+
+    def daily(self, shop_ids: Iterable[int], date_from, date_to=None) -> pd.DataFrame:
+        """Daily rows of these shops in [date_from, date_to] (ShopDateIndex slice, a copy)."""
+        return self.data(shop_ids).idx.range(date_from, date_to, shop_ids=_shops(shop_ids)).copy()
+
+    def shop_history(self, shop_id: int) -> pd.DataFrame:
+        return self.data([shop_id]).idx.shop(shop_id)
+
+    # --- KPI's ---
+    @_memo
+    def period_kpis(self, shop_ids: Tuple[int, ...], date_from, date_to) -> pd.DataFrame:
+        """Per shop the period KPIs (rollup) plus name and sq_meter."""
+        df = self.data(shop_ids).rollup.period(date_from, date_to, shop_ids)
+        df["name"] = df["shop_id"].map(self.names)
+        df["sq_meter"] = df["shop_id"].map(self.sq_meters)
+        return df
+
+    @_memo
+    def totals(self, shop_ids: Tuple[int, ...], date_from, date_to) -> pd.Series:
+        return self.data(shop_ids).rollup.totals(date_from, date_to, shop_ids)
+
+    @_memo
+    def month_outlook(self, shop_ids: Tuple[int, ...]) -> Dict[str, Any]:
+        """Turnover so far this month, expected remainder and total, and the change vs last month."""
+        bounds = self.period_bounds()
+        first, last = bounds["this_month"]
+        current = float(self.data(shop_ids).rollup.period(first, last, shop_ids)["turnover"].sum())
+        days_passed = self.today.day
+        days_left = last.day - days_passed
+        avg_daily = current / days_passed if days_passed > 0 else 0
+        expected_remaining = int(avg_daily * days_left * MONTH_UPLIFT)
+        total_expected = current + expected_remaining
+        last_month = float(self.data(shop_ids).rollup.totals(*bounds["last_month"], shop_ids).get("turnover", 0))
+        return {
+            "current_turnover": current,
+            "days_passed": days_passed,
+            "days_left": days_left,
+            "expected_remaining": expected_remaining,
+            "total_expected": total_expected,
+            "last_month_turnover": last_month,
+            "vs_last": f"{(total_expected / last_month - 1)*100:+.1f}%" if last_month > 0 else "N/A",
+        }
+
+    @_memo
+    def weekday_avg(self, shop_ids: Tuple[int, ...]) -> pd.DataFrame:
+        """Mean conversion_rate / sales_per_transaction per weekday (0=Mon) from the running stats."""
+        stats = STATS.get(self.company_id, self.data(shop_ids).weekday, today=self.today.date())
+        out = pd.DataFrame({k: [v] * 7 for k, v in DEFAULT_WEEKDAY_AVG.items()}, index=range(7))
+        out.update(stats.weekday_means(list(DEFAULT_WEEKDAY_AVG), shop_ids))
+        return out
+
+    # --- voorspelling (niet gememoïseerd: FORECASTS cachet zelf en ververst ARIMA op de achtergrond) ---
+    def forecast(self, shop_ids: Iterable[int], steps: int = 7) -> Dict[int, List[int]]:
+        df_full = self.data(shop_ids).df_full
+        with span("dashboard.forecast", shops=len(_shops(shop_ids))):
+            return FORECASTS.forecast_all(df_full, steps, today=self.today)
+
+    def forecast_frame(self, shop_ids: Iterable[int], steps: int = 7) -> pd.DataFrame:
+        df_full = self.data(shop_ids).df_full
+        with span("dashboard.forecast_frame", shops=len(_shops(shop_ids))):
+            fc = FORECASTS.forecast_frame(df_full, steps, today=self.today)
+        fc["name"] = fc["shop_id"].map(self.names).fillna("Onbekend")
+        return fc
+
+    # --- potentieel, weer, advies ---
+    @_memo
+    def potential(self, shop_ids: Tuple[int, ...], date_from, date_to) -> pd.DataFrame:
+        """Location Potential 2.0 gap table for the period."""
+        data = self.data(shop_ids)
+        stats = STATS.get(self.company_id, data.df_full, today=self.today.date())
+        return location_potential(self.period_kpis(shop_ids, date_from, date_to), data.df_full, stats=stats)
+
+    def weather(self, shop_ids: Iterable[int], date_from, date_to) -> pd.DataFrame:
+        """WeatherStore frame for the shops' postcodes (cached per postcode by the store itself)."""
+        with span("dashboard.weather") as s:
+            wx = WEATHER.get([self.postcodes.get(int(s)) for s in shop_ids], date_from, date_to, today=self.today.date())
+            s.set(rows=len(wx))
+        return wx
+
+    def profiles(self, shop_ids: Iterable[int]) -> pd.DataFrame:
+        """Weekday profiles over the last PROFILE_WEEKS weeks, so also from history before this year."""
+        shops = _shops(shop_ids)
+        with span("dashboard.profiles", shops=len(shops)) as s:
+            # ruim één week extra: het venster loopt tot de laatste dag mét data, niet tot vandaag
+            df, err = fetch_history(self.api_base, self.company_id, shops,
+                                    self.today - pd.Timedelta(weeks=PROFILE_WEEKS + 1), today=self.today.date())
+            if err:
+                raise ReportError(err)
+            profile = PROFILES.get(self.company_id, df)  # alleen nieuwe dagen worden bijgewerkt
+            s.set(rows=len(df))
+        return profile
+
+    @_memo
+    def advice(self, shop_ids: Tuple[int, ...], cci: float, company_name: str = "", steps: int = 7) -> Dict[str, Any]:
+        """advisor.build_advice_batch for the next `steps` days: weekday profiles + area weather + client rules."""
+        from advisor import build_advice_batch  # advisor.py staat in de repo-root
+        data = self.data(shop_ids)
+        profiles = self.profiles(shop_ids)
+        last_day = data.df_full["date"].max()
+        wx_hist = self.weather(shop_ids, last_day - pd.Timedelta(weeks=RECENT_WEEKS) + pd.Timedelta(days=1), last_day)
+        wx_next = self.weather(shop_ids, self.today, self.today + pd.Timedelta(days=steps - 1))
+        hist = advice_history(profiles, self.names, wx_hist, self.postcodes)
+        return build_advice_batch(company_name, hist, area_forecast(wx_next), cci, client=self.company_id)
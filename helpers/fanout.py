@@ -0,0 +1,92 @@
+# helpers/fanout.py – grote /get-report pulls opknippen (shops × maanden) en gelijktijdig ophalen
+from __future__ import annotations
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from .normalize import normalize_vemcount_response
+from .utils import api_get_report_df, build_report_params
+
+SHOP_CHUNK_SIZE = int(os.getenv("REPORT_SHOP_CHUNK", "50"))
+REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", "6"))
+
+Chunk = Tuple[List[int], str | None, str | None]  # (shop_ids, date_from, date_to)
+
+
+def month_ranges(date_from: str, date_to: str) -> List[Tuple[str, str]]:
+    """Split [date_from, date_to] (YYYY-MM-DD) into calendar-month pieces."""
+    lo, hi = date.fromisoformat(str(date_from)), date.fromisoformat(str(date_to))
+    out = []
+    while lo <= hi:
+        next_month = (lo.replace(day=28) + timedelta(days=4)).replace(day=1)
+        end = min(hi, next_month - timedelta(days=1))
+        out.append((lo.isoformat(), end.isoformat()))
+        lo = next_month
+    return out
+
+
+def plan_chunks(shop_ids: Iterable[int], chunk_size: int = SHOP_CHUNK_SIZE, date_from: str | None = None,
+                date_to: str | None = None, split_months: bool = False) -> List[Chunk]:
+    shop_ids = list(shop_ids)
+    shop_chunks = [shop_ids[i:i + chunk_size] for i in range(0, len(shop_ids), max(1, chunk_size))] or [[]]
+    ranges: List[Tuple[str | None, str | None]] = [(date_from, date_to)]
+    if split_months and date_from and date_to:
+        ranges = month_ranges(date_from, date_to)
+    return [(chunk, lo, hi) for chunk in shop_chunks for lo, hi in ranges]
+
+
+async def fetch_chunks_async(api_base: str, shop_ids: Iterable[int], outputs: List[str], period: str = "this_year",
+                             period_step: str = "day", source: str = "shops", date_from: str | None = None,
+                             date_to: str | None = None, chunk_size: int = SHOP_CHUNK_SIZE, split_months: bool = False,
+                             concurrency: int = REPORT_CONCURRENCY,
+                             timeout: int = 60) -> Tuple[pd.DataFrame, Dict[str, Any] | None]:
+    """Fetch every chunk with at most `concurrency` requests in flight, normalizing each as it lands.
+
+    Results are concatenated in plan order, so the frame does not depend on
+    which chunk answered first. The first error cancels the rest and is returned.
+    """
+    chunks = plan_chunks(shop_ids, chunk_size, date_from, date_to, split_months)
+    url = f"{api_base.rstrip('/')}/get-report"
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(chunk: Chunk) -> pd.DataFrame:
+        sids, lo, hi = chunk
+        params = build_report_params(sids, outputs, period="date" if lo else period,
+                                     period_step=period_step, source=source, date_from=lo, date_to=hi)
+        async with sem:
+            # body wordt per shop geparst terwijl hij binnenkomt (normalize_stream)
+            df, err = await asyncio.to_thread(api_get_report_df, params, outputs, timeout=timeout, url=url,
+                                              method="GET", plain_keys=False)
+        if err:
+            raise _ChunkError(err)
+        return df
+
+    tasks = [asyncio.create_task(one(c)) for c in chunks]
+    try:
+        frames = await asyncio.gather(*tasks)
+    except _ChunkError as e:
+        for t in tasks:
+            t.cancel()
+        return pd.DataFrame(), e.err
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return normalize_vemcount_response({}, outputs), None
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if split_months and len(chunks) > 1:
+        df = df.sort_values(["shop_id", "date"], kind="stable", ignore_index=True)
+    return df, None
+
+
+def fetch_chunked(*args: Any, **kwargs: Any) -> Tuple[pd.DataFrame, Dict[str, Any] | None]:
+    """Blocking wrapper for fetch_chunks_async (Streamlit scripts have no running loop)."""
+    return asyncio.run(fetch_chunks_async(*args, **kwargs))
+
+
+class _ChunkError(Exception):
+    def __init__(self, err: Dict[str, Any]):
+        super().__init__(err.get("exception"))
+        self.err = err
@@ -0,0 +1,236 @@
+# helpers/forecast.py – footfall-voorspelling: ARIMA per shop (process pool, cache) + snelle NumPy-variant
+from __future__ import annotations
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cache import TTLCache
+from .tracing import span
+
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "0")) or None  # None → os.cpu_count()
+FORECAST_MIN_PARALLEL = 4  # minder shops → inline; pool opstarten kost meer dan het oplevert
+FORECAST_BATCH = 16        # series per worker-taak
+FORECAST_MODE = os.getenv("FORECAST_MODE", "auto")  # arima | fast | auto (eerst fast, ARIMA op de achtergrond)
+FAST_HISTORY_DAYS = 56     # 8 weken → elke weekdag minstens 8 keer gezien
+FAST_ALPHA = 0.3           # gewicht van de laatste dag in het exponentieel gewogen niveau
+
+
+def _arima():
+    """statsmodels' ARIMA, imported on the first fit (≈2 s) instead of at page import; fast mode never pays it."""
+    from statsmodels.tsa.arima.model import ARIMA
+    return ARIMA
+
+
+def forecast_series(series: Sequence[float], steps: int = 7) -> List[int]:
+    """ARIMA(1,1,1) on the positive values of `series`; mean (or 240) when it cannot fit."""
+    series = [x for x in series if pd.notnull(x) and x > 0]
+    if len(series) < 3:
+        return [int(np.mean(series))] * steps if series else [240] * steps
+    try:
+        model = _arima()(series, order=(1, 1, 1))
+        forecast = model.fit().forecast(steps=steps)
+        return [max(50, int(round(f))) for f in forecast]
+    except:
+        return [int(np.mean(series))] * steps if series else [240] * steps
+
+
+def _forecast_batch(batch: List[Tuple[Hashable, List[float], int]]) -> List[Tuple[Hashable, List[int]]]:
+    # draait in een worker-proces
+    return [(key, forecast_series(series, steps)) for key, series, steps in batch]
+
+
+def recent_series(df_full: pd.DataFrame, today: pd.Timestamp | None = None,
+                  history_days: int = 30) -> Tuple[Dict[int, List[int]], Dict[int, str]]:
+    """Per shop the count_in of the last `history_days` days (date order) and the last date seen."""
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    dates = pd.to_datetime(df_full["date"])
+    recent = df_full.loc[dates >= today - pd.Timedelta(days=history_days), ["shop_id", "count_in"]]
+    recent = recent.assign(date=dates[recent.index]).sort_values(["shop_id", "date"], kind="stable")
+    series, last = {}, {}
+    for sid, g in recent.groupby("shop_id", sort=False):
+        series[int(sid)] = g["count_in"].fillna(240).astype(int).tolist()
+        last[int(sid)] = g["date"].iloc[-1].strftime("%Y-%m-%d")
+    return series, last
+
+
+def series_matrix(df_full: pd.DataFrame, today: pd.Timestamp | None = None,
+                  history_days: int = FAST_HISTORY_DAYS) -> Tuple[np.ndarray, np.ndarray, pd.Timestamp]:
+    """(shop_ids, shops × days count_in matrix, first day) for the `history_days` days up to today; NaN = no data."""
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    first = today - pd.Timedelta(days=history_days - 1)
+    dates = pd.to_datetime(df_full["date"]).to_numpy(dtype="datetime64[D]")
+    keep = (dates >= first.to_datetime64()) & (dates <= today.to_datetime64())
+    shop_ids, row = np.unique(df_full["shop_id"].to_numpy()[keep], return_inverse=True)
+    col = (dates[keep] - first.to_datetime64().astype("datetime64[D]")).astype(np.int64)
+    values = np.full((len(shop_ids), history_days), np.nan)
+    values[row, col] = pd.to_numeric(df_full["count_in"], errors="coerce").to_numpy(dtype="float64")[keep]
+    return shop_ids.astype(np.int64), values, first
+
+
+def fast_forecast(values: np.ndarray, first_day: pd.Timestamp, steps: int = 7, alpha: float = FAST_ALPHA) -> np.ndarray:
+    """Weekday-seasonal exponential smoothing for all shops at once (shops × steps, int).
+
+    Per shop: weekday factor = mean of that weekday / overall mean, level =
+    exponentially weighted mean of the de-seasonalised days (newest weight
+    alpha). Forecast = level × factor of the future weekday. Days without data
+    (NaN or ≤ 0) are ignored; same floor (50) and empty fallback (240) as ARIMA.
+    """
+    n_days = values.shape[1]
+    valid = np.isfinite(values) & (values > 0)
+    v = np.where(valid, values, 0.0)
+    weekday = (pd.Timestamp(first_day).dayofweek + np.arange(n_days)) % 7
+    onehot = (weekday[:, None] == np.arange(7)[None, :]).astype(np.float64)  # days × 7
+    with np.errstate(invalid="ignore", divide="ignore"):
+        wd_mean = (v @ onehot) / (valid @ onehot)
+        overall = v.sum(axis=1, keepdims=True) / valid.sum(axis=1, keepdims=True)
+        factor = wd_mean / overall
+        factor = np.where(np.isfinite(factor) & (factor > 0), factor, 1.0)
+
+        weights = np.where(valid, alpha * (1 - alpha) ** np.arange(n_days)[::-1], 0.0)
+        level = (v / factor[:, weekday] * weights).sum(axis=1) / weights.sum(axis=1)
+        future = (pd.Timestamp(first_day).dayofweek + n_days + np.arange(steps)) % 7
+        forecast = level[:, None] * factor[:, future]
+    return np.where(np.isfinite(forecast), np.maximum(50, np.rint(forecast)), 240).astype(np.int64)
+
+
+class ForecastEngine:
+    """Batch footfall forecasts for every shop of a client.
+
+    Results are cached per (shop, last data date, steps, series). A rerun with
+    unchanged data costs nothing; a new day only refits the shops that got one.
+    Misses are fitted in a process pool (spawn context, safe next to
+    Streamlit's threads) or inline when there are only a few.
+
+    Modes (FORECAST_MODE): "arima" waits for the fits, "fast" only uses
+    fast_forecast, "auto" answers with cached ARIMA where available and
+    fast_forecast elsewhere, while the missing ARIMA fits run in the pool; the
+    next rerun picks them up from the cache.
+    """
+
+    def __init__(self, max_workers: int | None = FORECAST_WORKERS, cache_size: int = 4096, ttl: float = 24 * 3600):
+        self.max_workers = max_workers
+        self.cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending: set = set()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _lookup(self, series_by_shop: Dict[int, Sequence[float]], last_dates: Dict[int, str] | None,
+                steps: int) -> Tuple[Dict[int, List[int]], List[Tuple[Hashable, List[float], int]]]:
+        """Cached ARIMA forecasts, plus the (key, series, steps) jobs still to fit."""
+        last_dates = last_dates or {}
+        out: Dict[int, List[int]] = {}
+        todo: List[Tuple[Hashable, List[float], int]] = []
+        for sid, series in series_by_shop.items():
+            series = list(series)
+            key = (sid, last_dates.get(sid), steps, hash(tuple(series)))
+            hit = self.cache.get(key)
+            if hit is not None:
+                out[sid] = hit
+            else:
+                todo.append((key, series, steps))
+        return out, todo
+
+    def forecast_many(self, series_by_shop: Dict[int, Sequence[float]], last_dates: Dict[int, str] | None = None,
+                      steps: int = 7) -> Dict[int, List[int]]:
+        out, todo = self._lookup(series_by_shop, last_dates, steps)
+        with span("forecast.arima", shops=len(todo), cached=len(out)):
+            if len(todo) < FORECAST_MIN_PARALLEL:
+                results = _forecast_batch(todo)
+            else:
+                batches = [todo[i:i + FORECAST_BATCH] for i in range(0, len(todo), FORECAST_BATCH)]
+                try:
+                    results = [r for part in self._executor().map(_forecast_batch, batches) for r in part]
+                except Exception:  # kapotte pool (bv. worker gekilld) → inline afmaken
+                    self.shutdown()
+                    results = _forecast_batch(todo)
+
+        for key, forecast in results:
+            self.cache.set(key, forecast)
+            out[key[0]] = forecast
+        return out
+
+    def refine_async(self, series_by_shop: Dict[int, Sequence[float]], last_dates: Dict[int, str] | None = None,
+                     steps: int = 7) -> int:
+        """Queue ARIMA fits for the uncached series without waiting; returns how many were queued."""
+        _, todo = self._lookup(series_by_shop, last_dates, steps)
+        with self._lock:
+            todo = [job for job in todo if job[0] not in self._pending]
+            self._pending.update(job[0] for job in todo)
+        if not todo:
+            return 0
+        try:
+            pool = self._executor()
+            for i in range(0, len(todo), FORECAST_BATCH):
+                batch = todo[i:i + FORECAST_BATCH]
+                pool.submit(_forecast_batch, batch).add_done_callback(lambda f, b=batch: self._store(f, b))
+        except Exception:
+            self.shutdown()
+            with self._lock:
+                self._pending.difference_update(job[0] for job in todo)
+        return len(todo)
+
+    def _store(self, future, batch) -> None:
+        try:
+            for key, forecast in future.result():
+                self.cache.set(key, forecast)
+        except Exception:  # pool weg of gecanceld → volgende rerun probeert opnieuw
+            pass
+        with self._lock:
+            self._pending.difference_update(job[0] for job in batch)
+
+    def forecast_fast(self, df_full: pd.DataFrame, steps: int = 7, today: pd.Timestamp | None = None,
+                      history_days: int = FAST_HISTORY_DAYS) -> Dict[int, List[int]]:
+        """fast_forecast for every shop in df_full, as {shop_id: [steps]}."""
+        with span("forecast.fast") as s:
+            shop_ids, values, first = series_matrix(df_full, today, history_days)
+            forecast = fast_forecast(values, first, steps)
+            s.set(shops=len(shop_ids))
+        return {int(sid): row.tolist() for sid, row in zip(shop_ids, forecast)}
+
+    def forecast_all(self, df_full: pd.DataFrame, steps: int = 7, history_days: int = 30,
+                     today: pd.Timestamp | None = None, mode: str | None = None) -> Dict[int, List[int]]:
+        """{shop_id: [steps daily footfall forecasts]} for every shop in df_full."""
+        mode = mode or FORECAST_MODE
+        if mode == "fast":
+            return self.forecast_fast(df_full, steps, today)
+        series, last = recent_series(df_full, today, history_days)
+        if mode != "auto":
+            return self.forecast_many(series, last, steps)
+        out, _ = self._lookup(series, last, steps)
+        if len(out) < len(series):
+            self.refine_async(series, last, steps)
+            fast = self.forecast_fast(df_full, steps, today)
+            out = {sid: out.get(sid) or fast.get(sid, [240] * steps) for sid in series}
+        return out
+
+    def forecast_frame(self, df_full: pd.DataFrame, steps: int = 7, history_days: int = 30,
+                       today: pd.Timestamp | None = None, mode: str | None = None) -> pd.DataFrame:
+        """Long frame shop_id, date, count_in_forecast for the `steps` days after today."""
+        today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+        forecasts = self.forecast_all(df_full, steps, history_days, today, mode)
+        future = pd.date_range(today + pd.Timedelta(days=1), periods=steps)
+        return pd.DataFrame({
+            "shop_id": np.repeat(list(forecasts.keys()), steps).astype(np.int64),
+            "date": np.tile(future.values, len(forecasts)),
+            "count_in_forecast": np.concatenate([forecasts[s] for s in forecasts]) if forecasts else np.array([], dtype=np.int64),
+        })
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+FORECASTS = ForecastEngine()
@@ -0,0 +1,67 @@
+# helpers/forecast_compose.py – omzetvoorspelling = footfall × conversie × SPV × multipliers, voor alle shops × dagen in één keer
+from __future__ import annotations
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+CONV_REF = 13.0          # conversie (%) waarop de weekdag-multiplier 1.0 is
+SPT_REF = 22.0           # sales_per_transaction waarop de weekdag-multiplier 1.0 is
+WEEKDAY_FLOOR = 0.85     # weekdag-multiplier nooit lager
+TURNOVER_FLOOR = 400     # minimale dagomzet in de voorspelling
+
+
+def weekday_multipliers(weekday_avg: pd.DataFrame, conv_ref: float = CONV_REF, spt_ref: float = SPT_REF,
+                        floor: float = WEEKDAY_FLOOR) -> Tuple[np.ndarray, np.ndarray]:
+    """(conv_mult, spv_mult) per weekday 0..6 from a weekday × [conversion_rate, sales_per_transaction] table."""
+    avg = weekday_avg.reindex(range(7))
+    conv = np.maximum(avg["conversion_rate"].to_numpy(dtype="float64") / conv_ref, floor)
+    spv = np.maximum(avg["sales_per_transaction"].to_numpy(dtype="float64") / spt_ref, floor)
+    return np.nan_to_num(conv, nan=1.0), np.nan_to_num(spv, nan=1.0)
+
+
+def calendar_table(dates: pd.DatetimeIndex, table: Dict | float | None, key: str = "day",
+                   default: float = 1.0) -> np.ndarray:
+    """Multiplier per date from a lookup table.
+
+    key: "day" (day of month), "month", "weekday" or "date" (YYYY-MM-DD). A
+    plain number applies to every date; None means 1.0.
+    """
+    if table is None:
+        return np.ones(len(dates))
+    if np.isscalar(table):
+        return np.full(len(dates), float(table))
+    keys = {
+        "day": dates.day, "month": dates.month, "weekday": dates.dayofweek, "date": dates.strftime("%Y-%m-%d"),
+    }[key]
+    return pd.Index(keys).map(lambda k: table.get(k, default)).to_numpy(dtype="float64")
+
+
+def compose_turnover(footfall: np.ndarray, base_conv: np.ndarray, base_spv: np.ndarray, dates: pd.DatetimeIndex,
+                     weekday: Tuple[np.ndarray, np.ndarray] | None = None, weather: np.ndarray | None = None,
+                     event: np.ndarray | None = None, cbs: np.ndarray | None = None,
+                     floor: int = TURNOVER_FLOOR) -> np.ndarray:
+    """Turnover forecast (shops × horizons, int) in one broadcast.
+
+    footfall is shops × horizons; base_conv (fraction) and base_spv are per
+    shop. weekday is (conv_mult, spv_mult), each 7 or shops × 7. weather,
+    event and cbs are horizons or shops × horizons and scale conversion and
+    SPV both, as in the old per-day loop.
+    """
+    footfall = np.atleast_2d(np.asarray(footfall, dtype="float64"))
+    base_conv = np.asarray(base_conv, dtype="float64").reshape(-1, 1)
+    base_spv = np.asarray(base_spv, dtype="float64").reshape(-1, 1)
+    wd = np.asarray(dates.dayofweek)
+
+    conv_mult = spv_mult = np.ones(len(dates))
+    if weekday is not None:
+        conv_mult = np.asarray(weekday[0])[..., wd]
+        spv_mult = np.asarray(weekday[1])[..., wd]
+    shared = np.ones(len(dates))
+    for table in (weather, event, cbs):
+        if table is not None:
+            shared = shared * np.asarray(table, dtype="float64")
+
+    conv = base_conv * conv_mult * shared
+    spv = base_spv * spv_mult * shared
+    return np.maximum(floor, np.rint(footfall * conv * spv)).astype(np.int64)
@@ -0,0 +1,192 @@
+# helpers/history_store.py – lokale dag-KPI historie (Arrow IPC, memory-mapped) + incrementele sync
+# Layout: {HISTORY_DIR}/company={id}/shop={id}/{YYYY-MM}.arrow  +  company={id}/_manifest.json
+# Manifest per shop: {synced_from, synced_through, outputs}; daartussen staat elke dag op schijf
+from __future__ import annotations
+import json
+import os
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .fanout import fetch_chunked
+from .schema import compact, empty_frame
+from .tracing import span
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".history"))
+HISTORY_OUTPUTS = ["count_in", "conversion_rate", "turnover", "sales_per_visitor", "sales_per_transaction"]
+MUTABLE_DAYS = 2  # vandaag en gisteren kunnen nog wijzigen → altijd opnieuw ophalen
+
+
+class HistoryStore:
+    """Normalized daily KPI rows, one Arrow IPC file per company / shop / month.
+
+    Reads memory-map the files, so a cold start costs a few mmaps instead of a
+    full-year download and normalization.
+    """
+
+    def __init__(self, root: str = HISTORY_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+
+    # --- paden ---
+    def _company_dir(self, company_id: int) -> str:
+        return os.path.join(self.root, f"company={company_id}")
+
+    def _shop_dir(self, company_id: int, shop_id: int) -> str:
+        return os.path.join(self._company_dir(company_id), f"shop={shop_id}")
+
+    def _manifest_path(self, company_id: int) -> str:
+        return os.path.join(self._company_dir(company_id), "_manifest.json")
+
+    # --- manifest: tot welke dag is elke shop gesynchroniseerd ---
+    def manifest(self, company_id: int) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._manifest_path(company_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def mark_synced(self, company_id: int, shop_ids: Iterable[int], start: date, through: date,
+                    outputs: List[str]) -> None:
+        """Record that [start, through] was fetched; joins the range already on disk when they touch."""
+        with self._lock:
+            man = self.manifest(company_id)
+            for sid in shop_ids:
+                since = start
+                old = synced_range(man.get(str(sid)), outputs)
+                if old and old[0] <= start <= old[1] + timedelta(days=1):
+                    since = old[0]
+                man[str(sid)] = {"synced_from": since.isoformat(), "synced_through": through.isoformat(),
+                                 "outputs": list(outputs)}
+            os.makedirs(self._company_dir(company_id), exist_ok=True)
+            _atomic_write(self._manifest_path(company_id), lambda f: f.write(json.dumps(man, indent=1).encode()))
+
+    # --- lezen / schrijven ---
+    @staticmethod
+    def _read_file(path: str) -> pa.Table:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        if pa.types.is_string(table.schema.field("date").type) or pa.types.is_large_string(table.schema.field("date").type):
+            # bestanden van vóór het compacte schema: datum als tekst → omzetten bij het lezen
+            table = pa.Table.from_pandas(compact(table.to_pandas()), preserve_index=False)
+        return table
+
+    def write(self, company_id: int, df: pd.DataFrame) -> None:
+        """Upsert normalized rows; a (shop, date) already on disk is replaced by the new row."""
+        if df.empty:
+            return
+        df = compact(df).sort_values(["shop_id", "date"], kind="stable").reset_index(drop=True)
+        shops = df["shop_id"].to_numpy()
+        months = np.datetime_as_string(df["date"].to_numpy().astype("datetime64[M]"), unit="M")
+        # partitiegrenzen in de gesorteerde frame → één Arrow-tabel, per partitie een slice
+        cuts = np.flatnonzero((shops[1:] != shops[:-1]) | (months[1:] != months[:-1])) + 1
+        bounds = np.concatenate([[0], cuts, [len(df)]])
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with self._lock:
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                shop_dir = self._shop_dir(company_id, int(shops[lo]))
+                os.makedirs(shop_dir, exist_ok=True)
+                path = os.path.join(shop_dir, f"{months[lo]}.arrow")
+                part = table.slice(lo, hi - lo)
+                if os.path.exists(path):
+                    old = self._read_file(path)
+                    keep = pc.invert(pc.is_in(old["date"], value_set=part["date"]))
+                    part = pa.concat_tables([old.filter(keep), part], promote_options="default").sort_by("date")
+                _atomic_write(path, lambda f: _write_ipc(f, part))
+
+    def read(self, company_id: int, shop_ids: Iterable[int], date_from: str | None = None,
+             date_to: str | None = None) -> pd.DataFrame:
+        """Rows for these shops (in the given order, by date) within [date_from, date_to]."""
+        lo, hi = (date_from or "")[:7], (date_to or "9999-12")[:7]
+        tables = []
+        for sid in shop_ids:
+            shop_dir = self._shop_dir(company_id, int(sid))
+            if not os.path.isdir(shop_dir):
+                continue
+            for name in sorted(os.listdir(shop_dir)):
+                if name.endswith(".arrow") and lo <= name[:7] <= hi:
+                    tables.append(self._read_file(os.path.join(shop_dir, name)))
+        if not tables:
+            return empty_frame(HISTORY_OUTPUTS)
+        df = pa.concat_tables(tables, promote_options="default").to_pandas()
+        if date_from:
+            df = df[df["date"] >= pd.Timestamp(date_from)]
+        if date_to:
+            df = df[df["date"] <= pd.Timestamp(date_to)]
+        return df.reset_index(drop=True)
+
+
+def synced_range(entry: Dict[str, Any] | None, outputs: List[str] = HISTORY_OUTPUTS) -> Tuple[date, date] | None:
+    """(first, last) day a manifest entry covers without gaps, or None if it is missing or for other outputs."""
+    if not entry or entry.get("outputs") != outputs:
+        return None
+    through = date.fromisoformat(entry["synced_through"])
+    # entries van vóór synced_from: de sync begon altijd op 1 januari van dat jaar
+    since = date.fromisoformat(entry["synced_from"]) if entry.get("synced_from") else date(through.year, 1, 1)
+    return since, through
+
+
+def _write_ipc(f, table: pa.Table) -> None:
+    with pa.ipc.new_file(f, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp = f"{path}.tmp{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+HISTORY = HistoryStore()
+_SYNC_LOCKS: Dict[int, threading.Lock] = {}
+_SYNC_LOCKS_GUARD = threading.Lock()
+
+
+def _sync_lock(company_id: int) -> threading.Lock:
+    with _SYNC_LOCKS_GUARD:
+        return _SYNC_LOCKS.setdefault(company_id, threading.Lock())
+
+
+def sync_history(api_base: str, company_id: int, shop_ids: Iterable[int], store: HistoryStore | None = None,
+                 today: date | None = None, timeout: int = 60, date_from: date | None = None) -> Dict[str, Any] | None:
+    """Fetch only the days the store is missing (plus the still-mutable last days) and append them.
+
+    The store has to cover `date_from` (default: 1 January) through `today`.
+    Shops are grouped by their first missing day; each group is fetched through
+    fetch_chunked (shop blocks, plus months on a cold start). Returns the
+    api_get_report error dict, or None.
+    """
+    store = store or HISTORY
+    today = today or date.today()
+    shop_ids = list(shop_ids)
+    with span("history.sync", shops=len(shop_ids)), _sync_lock(company_id):
+        return _sync(api_base, company_id, shop_ids, store, today, timeout, date_from or date(today.year, 1, 1))
+
+
+def _sync(api_base: str, company_id: int, shop_ids: Iterable[int], store: HistoryStore, today: date,
+          timeout: int, first: date) -> Dict[str, Any] | None:
+    man = store.manifest(company_id)
+
+    pending: Dict[date, List[int]] = {}
+    for sid in shop_ids:
+        covered = synced_range(man.get(str(sid)))
+        start = first
+        if covered and covered[0] <= first:  # begint het opgeslagen stuk later → vanaf `first` opnieuw
+            start = max(first, covered[1] - timedelta(days=MUTABLE_DAYS - 1))
+        pending.setdefault(start, []).append(int(sid))
+
+    for start, sids in sorted(pending.items()):
+        # lange inhaalslag (koude start) → per maand en per shopblok gelijktijdig ophalen
+        df, err = fetch_chunked(api_base, sids, HISTORY_OUTPUTS, period="date", date_from=start.isoformat(),
+                                date_to=today.isoformat(), split_months=(today - start).days > 31, timeout=timeout)
+        if err:
+            return err
+        store.write(company_id, df)
+        store.mark_synced(company_id, sids, start, today, HISTORY_OUTPUTS)
+    return None
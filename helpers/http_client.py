@@ -0,0 +1,145 @@
+# helpers/http_client.py – één gedeelde httpx-client: keep-alive, timeouts, retries met backoff, max verbindingen per host
+from __future__ import annotations
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+import httpx
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}  # andere methodes alleen met retry=True
+
+
+class PooledClient:
+    """Thread-safe wrapper around one httpx.Client.
+
+    Connections are kept alive and reused across Streamlit reruns and pages.
+    Every host gets at most `max_per_host` requests in flight. Transport
+    errors and 429/5xx answers of idempotent methods (or with retry=True) are
+    retried `retries` times with exponential backoff; a numeric Retry-After
+    header is honoured, capped at backoff_max. The host slot is released
+    while a request waits out its backoff.
+    """
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT, connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 retries: int = HTTP_RETRIES, backoff: float = HTTP_BACKOFF, backoff_max: float = HTTP_BACKOFF_MAX,
+                 max_per_host: int = HTTP_MAX_PER_HOST, transport: httpx.BaseTransport | None = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.max_per_host = max_per_host
+        self.sleep = sleep
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=max_per_host * 4),
+            transport=transport,
+            follow_redirects=True,
+        )
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = httpx.URL(url).host
+        with self._slots_lock:
+            return self._slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+
+    def _delay(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return min(self.backoff * 2 ** attempt, self.backoff_max)
+
+    def _send(self, method: str, url: str, params: Any, timeout: float | None, headers: dict | None,
+              stream: bool, retry: bool | None) -> Tuple[httpx.Response, threading.BoundedSemaphore]:
+        """One request with the retry policy applied; returns with the host slot held (the caller releases it)."""
+        kwargs: Dict[str, Any] = {"params": params, "headers": headers or {}}
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=min(timeout, HTTP_CONNECT_TIMEOUT))
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        retries = self.retries if retry else 0
+        slot = self._host_slot(url)
+        for attempt in range(retries + 1):
+            slot.acquire()
+            try:
+                r = self._client.send(self._client.build_request(method, url, **kwargs), stream=stream)
+            except BaseException as e:
+                slot.release()
+                if not isinstance(e, httpx.TransportError) or attempt >= retries:
+                    raise
+                self.sleep(self._delay(attempt, None))
+                continue
+            if r.status_code in RETRY_STATUS and attempt < retries:
+                r.close()
+                slot.release()  # niet op de backoff wachten met een plek van deze host bezet
+                self.sleep(self._delay(attempt, r))
+                continue
+            return r, slot
+        raise RuntimeError("unreachable")
+
+    def request(self, method: str, url: str, params: Any = None, timeout: float | None = None,
+                headers: dict | None = None, retry: bool | None = None) -> httpx.Response:
+        """`retry`: None = only idempotent methods are retried; True/False forces it on or off."""
+        r, slot = self._send(method, url, params, timeout, headers, stream=False, retry=retry)
+        slot.release()
+        return r
+
+    @contextmanager
+    def stream(self, method: str, url: str, params: Any = None, timeout: float | None = None,
+               headers: dict | None = None, retry: bool | None = None) -> Iterator[httpx.Response]:
+        """Like request(), but the body is left unread (r.iter_bytes()); the host slot is held until exit."""
+        r, slot = self._send(method, url, params, timeout, headers, stream=True, retry=retry)
+        try:
+            yield r
+        finally:
+            r.close()
+            slot.release()
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+_CLIENT: PooledClient | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> PooledClient:
+    """The process-wide client (created on first use)."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = PooledClient()
+        return _CLIENT
+
+
+def set_client(client: PooledClient | None) -> None:
+    """Swap the process-wide client, e.g. for one with a mock transport."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        old, _CLIENT = _CLIENT, client
+    if old is not None and old is not client:
+        old.close()
+
+
+def http_request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    return get_client().request(method, url, **kwargs)
+
+
+def http_get(url: str, **kwargs: Any) -> httpx.Response:
+    return get_client().get(url, **kwargs)
+
+
+def http_stream(method: str, url: str, **kwargs: Any):
+    return get_client().stream(method, url, **kwargs)
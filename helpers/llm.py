@@ -0,0 +1,37 @@
+# helpers/llm.py – LLM-backend (OpenAI) pas laden en aanmaken bij de eerste vraag, niet bij het importeren van een pagina
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, List
+
+from .utils import _secret
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+
+_client: Any = None
+_lock = threading.Lock()
+
+
+def _api_key() -> str:
+    return os.getenv("OPENAI_API_KEY") or _secret("openai_api_key")
+
+
+def llm_configured() -> bool:
+    """Whether a key is set; does not import openai."""
+    return bool(_api_key())
+
+
+def get_llm() -> Any:
+    """Shared OpenAI client; `import openai` (≈0.8 s) happens on the first call."""
+    global _client
+    with _lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=_api_key())
+        return _client
+
+
+def chat(messages: List[Dict[str, str]], model: str = LLM_MODEL, temperature: float = 0.3) -> str:
+    """One chat completion → answer text."""
+    response = get_llm().chat.completions.create(model=model, temperature=temperature, messages=messages)
+    return response.choices[0].message.content
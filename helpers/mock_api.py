@@ -0,0 +1,316 @@
+# helpers/mock_api.py – lokale stand-in voor de Vemcount API: synthetische winkeldata achter /clients/{id}/locations
+# en /get-report, in exact het geneste data → period → shop → dates → data.dt formaat, met instelbare latency en fouten.
+# Gebruik: in-process → api = use_mock_api(SyntheticRetail(shops=200, days=730), latency=0.05)
+#                        daarna gaan http_get/api_get_report_df (de gedeelde client) naar de fake; API-basis: MOCK_BASE
+#          los proces → python -m helpers.mock_api --shops 200 --days 730 [--port 8765] [--latency 0.05] [--error-rate 0.01]
+#                        en API_URL=http://127.0.0.1:8765, clients_json_url=http://127.0.0.1:8765/clients.json
+from __future__ import annotations
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from .http_client import PooledClient, set_client
+from .schema import dtype_for
+
+MOCK_BASE = "http://mock-vemcount"
+DEFAULT_COMPANIES = [3363, 4456, 4410]  # zelfde ids als clients.json
+FIRST_SHOP_ID = 30000
+WEEKDAY_FACTOR = np.array([0.75, 0.85, 0.9, 0.95, 1.15, 1.45, 0.95])  # ma..zo: zaterdag druk, maandag rustig
+CLOSED_DAYS = {(12, 25), (1, 1)}  # kerst en nieuwjaar: dicht
+CITIES = [("Amsterdam", "1012", "Randstad"), ("Utrecht", "3511", "Midden"), ("Eindhoven", "5611", "Zuid"),
+          ("Groningen", "9711", "Noord"), ("Arnhem", "6811", "Oost"), ("Rotterdam", "3011", "Randstad"),
+          ("Zwolle", "8011", "Oost"), ("Maastricht", "6211", "Zuid"), ("Leeuwarden", "8911", "Noord"),
+          ("Den Haag", "2511", "Randstad"), ("Amersfoort", "3811", "Midden"), ("Breda", "4811", "Zuid")]
+BRANDS = ["CASA", "MADAQ", "REJOES", "NORDA", "VELO", "PIKA"]
+
+
+class SyntheticRetail:
+    """Reproducible daily footfall, conversion and turnover for `shops` shops × `days` days up to `end`.
+
+    Per shop: a footfall level, weekday pattern, trend and conversion / basket
+    size; per day a yearly season (December peak), Poisson footfall and
+    binomial transactions, so conversion_rate, sales_per_visitor and
+    sales_per_transaction are consistent with count_in and turnover. Some shops
+    are closed on Sundays, all on Christmas and New Year's Day.
+
+    Everything is generated once (same seed and end → same numbers), so any
+    period or shop slice of a request agrees with every other request.
+    `quirks` is the share of values sent the way the live API sometimes does:
+    counts as numeric strings and turnover as null.
+    """
+
+    def __init__(self, shops: int = 50, days: int = 730, companies: Sequence[int] | None = None,
+                 end: pd.Timestamp | str | None = None, seed: int = 42, quirks: float = 0.0):
+        rng = np.random.default_rng(seed)
+        self.end = pd.Timestamp(end if end is not None else pd.Timestamp.today()).normalize()
+        self.dates = pd.date_range(end=self.end, periods=days)
+        self.shop_ids = np.arange(FIRST_SHOP_ID, FIRST_SHOP_ID + shops, dtype=np.int64)
+        self.companies = list(companies or DEFAULT_COMPANIES)
+        # shops om-en-om over de klanten verdeeld
+        self.company_of = {int(sid): self.companies[i % len(self.companies)] for i, sid in enumerate(self.shop_ids)}
+
+        n = (shops, 1)
+        level = rng.lognormal(np.log(350), 0.5, n)
+        weekday = WEEKDAY_FACTOR * rng.normal(1, 0.05, (shops, 7))
+        trend = 1 + rng.normal(0.03, 0.05, n) * np.arange(days) / 365
+        doy = self.dates.dayofyear.to_numpy()
+        season = 1 + 0.12 * np.cos(2 * np.pi * (doy - 355) / 365)
+        wd = self.dates.dayofweek.to_numpy()
+        open_ = np.ones((shops, days), dtype=bool)
+        open_[:, [(m, d) in CLOSED_DAYS for m, d in zip(self.dates.month, self.dates.day)]] = False
+        sunday_closed = rng.random(shops) < 0.2
+        open_[np.ix_(sunday_closed, wd == 6)] = False
+
+        count_in = np.where(open_, rng.poisson(level * weekday[:, wd] * trend * season), 0)
+        conv = np.clip(rng.uniform(9, 20, n) * (1 - 0.15 * (weekday[:, wd] - 1)) + rng.normal(0, 1.5, (shops, days)), 1, 60)
+        transactions = rng.binomial(count_in, conv / 100)
+        basket = rng.uniform(18, 45, n) * rng.normal(1, 0.08, (shops, days))
+        turnover = np.round(transactions * basket, 2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.values: Dict[str, np.ndarray] = {
+                "count_in": count_in.astype(np.int64),
+                "transactions": transactions.astype(np.int64),
+                "conversion_rate": np.nan_to_num(np.round(transactions / count_in * 100, 2)),
+                "turnover": turnover,
+                "sales_per_visitor": np.nan_to_num(np.round(turnover / count_in, 2)),
+                "sales_per_transaction": np.nan_to_num(np.round(turnover / transactions, 2)),
+            }
+        self.quirk = rng.random((shops, days)) < quirks
+        self.sq_meter = rng.integers(60, 600, shops)
+
+    # --- /clients.json en /clients/{id}/locations ---
+    def clients(self) -> List[Dict[str, Any]]:
+        return [{"company_id": cid, "name": f"Retailer {chr(65 + i)}", "brand": BRANDS[i % len(BRANDS)]}
+                for i, cid in enumerate(self.companies)]
+
+    def locations(self, company_id: int) -> List[Dict[str, Any]]:
+        out = []
+        for i, sid in enumerate(self.shop_ids):
+            if self.company_of[int(sid)] != company_id:
+                continue
+            city, postcode, region = CITIES[i % len(CITIES)]
+            out.append({"id": int(sid), "name": f"{city} {i // len(CITIES) + 1}", "region": region,
+                        "sq_meter": int(self.sq_meter[i]), "zip": f"{postcode} AB"})
+        return out
+
+    # --- /get-report ---
+    def period_range(self, period: str, date_from: str | None = None, date_to: str | None = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """(first, last day) of a /get-report period name, relative to `end` as today."""
+        today = self.end
+        start_week = today - pd.Timedelta(days=today.weekday())
+        first_of_month = today.replace(day=1)
+        ranges = {
+            "today": (today, today),
+            "yesterday": (today - pd.Timedelta(days=1), today - pd.Timedelta(days=1)),
+            "this_week": (start_week, today),
+            "last_week": (start_week - pd.Timedelta(days=7), start_week - pd.Timedelta(days=1)),
+            "this_month": (first_of_month, today),
+            "last_month": (first_of_month - pd.DateOffset(months=1), first_of_month - pd.Timedelta(days=1)),
+            "this_year": (today.replace(month=1, day=1), today),
+            "last_year": (today.replace(year=today.year - 1, month=1, day=1), today.replace(month=1, day=1) - pd.Timedelta(days=1)),
+        }
+        if period == "date":
+            if not date_from or not date_to:
+                raise ValueError("period=date needs form_date_from and form_date_to")
+            return pd.Timestamp(date_from), pd.Timestamp(date_to)
+        if period not in ranges:
+            raise ValueError(f"unknown period {period!r}")
+        return ranges[period]
+
+    def _slice(self, shop_ids: Iterable[int] | None, first: pd.Timestamp, last: pd.Timestamp) -> Tuple[np.ndarray, slice]:
+        rows = np.arange(len(self.shop_ids)) if shop_ids is None else \
+            np.flatnonzero(np.isin(self.shop_ids, np.fromiter((int(s) for s in shop_ids), dtype=np.int64)))
+        cols = slice(self.dates.searchsorted(first), self.dates.searchsorted(last, side="right"))
+        return rows, cols
+
+    def report(self, shop_ids: Iterable[int], outputs: Iterable[str], period: str = "this_year",
+               period_step: str = "day", date_from: str | None = None, date_to: str | None = None) -> Dict[str, Any]:
+        """The /get-report body as a dict; unknown shops are left out, unknown outputs are absent from the day data."""
+        if period_step != "day":
+            raise ValueError(f"period_step {period_step!r} not supported (mock serves daily data only)")
+        first, last = self.period_range(period, date_from, date_to)
+        rows, cols = self._slice(shop_ids, first, last)
+        outputs = [o for o in outputs if o in self.values]
+        dates = self.dates[cols]
+        labels = dates.strftime("%a %d %b %Y").tolist()
+        dts = dates.strftime("%Y-%m-%d 00:00:00").tolist()
+        shops: Dict[str, Any] = {}
+        for r in rows:
+            columns = [self.values[o][r, cols].tolist() for o in outputs]
+            quirk = self.quirk[r, cols]
+            days = {}
+            for j, label in enumerate(labels):
+                day = {"dt": dts[j]}
+                for o, values in zip(outputs, columns):
+                    day[o] = values[j]
+                if quirk[j]:  # zoals de live API soms: telling als string, omzet null
+                    if "count_in" in day:
+                        day["count_in"] = str(day["count_in"])
+                    if "turnover" in day:
+                        day["turnover"] = None
+                days[label] = {"data": day}
+            shops[str(self.shop_ids[r])] = {"dates": days}
+        return {"data": {period: shops}}
+
+    def frame(self, outputs: Iterable[str] | None = None, shop_ids: Iterable[int] | None = None,
+              date_from: str | None = None, date_to: str | None = None) -> pd.DataFrame:
+        """The same data as a long frame in the compact schema (what normalize makes of report() without quirks)."""
+        outputs = list(outputs) if outputs else ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]
+        rows, cols = self._slice(shop_ids, pd.Timestamp(date_from or self.dates[0]), pd.Timestamp(date_to or self.end))
+        dates = self.dates[cols].to_numpy()
+        out = {"shop_id": np.repeat(self.shop_ids[rows], len(dates)).astype(dtype_for("shop_id")),
+               "date": np.tile(dates, len(rows)).astype(dtype_for("date"))}
+        for o in outputs:
+            out[o] = self.values[o][rows, cols].ravel().astype(dtype_for(o))
+        return pd.DataFrame(out)
+
+
+def _param_list(params: httpx.QueryParams, key: str) -> List[str]:
+    """Both query styles the app sends: data[]=1&data[]=2 and data=1&data=2."""
+    return params.get_list(f"{key}[]") + params.get_list(key)
+
+
+class MockVemcount:
+    """httpx handler serving SyntheticRetail as the Vemcount API; plug into httpx.MockTransport or serve().
+
+    Routes: GET /clients.json, GET /clients/{id}/locations, GET/POST /get-report
+    (query parameters as build_report_params / api_get_report send them).
+    Every request waits `latency` (+ up to `jitter`) seconds and fails with
+    `error_status` with probability `error_rate`; the draws are seeded.
+    `requests`, `errors` and `bytes_sent` count what was served.
+    """
+
+    def __init__(self, data: SyntheticRetail, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: int = 0, sleep: Callable[[float], None] = time.sleep):
+        self.data = data
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.error_status = error_rate, error_status
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.errors = 0
+        self.bytes_sent = 0
+
+    def _json(self, status: int, body: Any) -> httpx.Response:
+        content = json.dumps(body, separators=(",", ":")).encode()
+        with self._lock:
+            self.bytes_sent += len(content)
+        return httpx.Response(status, content=content, headers={"Content-Type": "application/json"})
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.rstrip("/")
+        route = path.rsplit("/", 1)[-1].removesuffix(".json")  # get-report | locations | clients
+        with self._lock:
+            self.requests[route] += 1
+            delay = self.latency + self.jitter * self._rng.random()
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay > 0:
+            self.sleep(delay)
+        if fail:
+            return self._json(self.error_status, {"error": "synthetic failure"})
+
+        if path.endswith("/clients.json"):
+            return self._json(200, self.data.clients())
+        m = re.search(r"/clients/(\d+)/locations$", path)
+        if m:
+            company_id = int(m.group(1))
+            if company_id not in self.data.companies:
+                return self._json(404, {"error": f"unknown client {company_id}"})
+            return self._json(200, {"data": self.data.locations(company_id)})
+        if route == "get-report":
+            q = request.url.params
+            try:
+                body = self.data.report([int(s) for s in _param_list(q, "data")], _param_list(q, "data_output"),
+                                        period=q.get("period", "this_year"), period_step=q.get("period_step", "day"),
+                                        date_from=q.get("form_date_from"), date_to=q.get("form_date_to"))
+            except ValueError as e:
+                return self._json(400, {"error": str(e)})
+            return self._json(200, body)
+        return self._json(404, {"error": f"no route {path}"})
+
+
+def use_mock_api(data: SyntheticRetail | None = None, **kwargs: Any) -> MockVemcount:
+    """Point the shared http client at an in-process MockVemcount (no sockets); returns it for its counters.
+
+    kwargs go to MockVemcount (latency, error_rate, ...). Undo with set_client(None).
+    """
+    api = MockVemcount(data or SyntheticRetail(), **kwargs)
+    set_client(PooledClient(transport=httpx.MockTransport(api)))
+    return api
+
+
+def serve(api: MockVemcount, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """HTTP server (one thread per request) around the handler; port=0 picks a free port. Call serve_forever()."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = httpx.Request(self.command, f"http://{host}:{self.server.server_address[1]}{self.path}",
+                                    headers=dict(self.headers), content=self.rfile.read(length) if length else b"")
+            response = api(request)
+            self.send_response(response.status_code)
+            for key, value in response.headers.items():
+                if key.lower() != "content-length":
+                    self.send_header(key, value)
+            self.send_header("Content-Length", str(len(response.content)))
+            self.end_headers()
+            self.wfile.write(response.content)
+
+        do_GET = do_POST = _handle
+
+        def log_message(self, *args):  # geen regel per request op stderr
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(api: MockVemcount, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """serve() in a daemon thread; returns (server, base url). Stop with server.shutdown()."""
+    server = serve(api, host, port)
+    threading.Thread(target=server.serve_forever, name="mock-vemcount", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokale Vemcount-API met synthetische data")
+    parser.add_argument("--shops", type=int, default=50)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--companies", type=int, nargs="*", default=DEFAULT_COMPANIES)
+    parser.add_argument("--end", default=None, help="laatste dag (YYYY-MM-DD), standaard vandaag")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quirks", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconden per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    data = SyntheticRetail(args.shops, args.days, args.companies, args.end, args.seed, args.quirks)
+    api = MockVemcount(data, args.latency, args.jitter, args.error_rate, seed=args.seed)
+    server = serve(api, args.host, args.port)
+    print(f"mock Vemcount op http://{args.host}:{server.server_address[1]} – {args.shops} shops × {args.days} dagen "
+          f"t/m {data.end.date()}, klanten {', '.join(map(str, data.companies))}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
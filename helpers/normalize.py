@@ -1,69 +1,248 @@
-# helpers/normalize.py – FINAL & 100% WERKENDE VERSIE
+# helpers/normalize.py – kolomgebaseerde normalisatie van /get-report naar het compacte schema (helpers/schema.py)
+from __future__ import annotations
+import codecs
+import json
+import re
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+from .schema import dtype_for, empty_frame
+
+KPI_COLUMNS = ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]
+INT_KPIS = {"count_in"}
+STREAM_BATCH_ROWS = 20_000
+STREAM_WINDOW = 1 << 20  # tekens tekst per parse-poging
+
+
+def _py_float(val, default=0.0):
+    try:
+        return float(val) if val is not None else default
+    except:
+        return default
+
+
+def _coerce_numeric(values: List[Any], integer: bool = False) -> np.ndarray:
+    """Bulk version of the old per-row safe_float/safe_int.
+
+    NumPy/pd.to_numeric handle the common case; only the positions they could
+    not parse are retried with float() so edge cases keep their old outcome.
+    """
+    try:
+        out = np.array(values, dtype="float64")  # getallen, numerieke strings en None
+    except (ValueError, TypeError):
+        out = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype="float64", na_value=np.nan, copy=True)
+    for i in np.flatnonzero(np.isnan(out)):
+        out[i] = _py_float(values[i])
+    if integer:
+        out[~np.isfinite(out)] = 0
+        return np.trunc(out).astype(np.int64)
+    return out
+
+
+def _parse_days(raw: List[Any]) -> np.ndarray:
+    """ISO datetime strings → datetime64[D]; NaT where fromisoformat would fail."""
+    s = pd.Series(raw, dtype=object)
+    try:
+        parsed = pd.to_datetime(s, format="ISO8601", errors="coerce")
+        if getattr(parsed.dt, "tz", None) is not None:
+            parsed = parsed.dt.tz_localize(None)
+        days = parsed.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+        retry = np.flatnonzero(np.isnat(days))
+    except (ValueError, TypeError):
+        # gemengde tijdzones e.d. → alles via de oude route
+        days = np.full(len(raw), np.datetime64("NaT"), dtype="datetime64[D]")
+        retry = np.arange(len(raw))
+    for i in retry:
+        try:
+            days[i] = np.datetime64(datetime.fromisoformat(raw[i].replace(" ", "T")).date())
+        except:
+            pass
+    return days
 
-def normalize_vemcount_response(response: Dict[str, Any]) -> pd.DataFrame:
-    rows = []
-    data = response.get("data", {})
 
-    # ALLEEN VOOR DEBUG – ZET OP False IN PRODUCTIE
-    HARD_TEST = False
-    if HARD_TEST:
-        return pd.DataFrame([
-            {"shop_id": 29641, "date": "2025-11-10", "count_in": 264, "conversion_rate": 14.39, "turnover": 654.44, "sales_per_visitor": 2.48},
-            {"shop_id": 29641, "date": "2025-11-11", "count_in": 426, "conversion_rate": 16.2,  "turnover": 1325.32, "sales_per_visitor": 3.11},
-            {"shop_id": 29641, "date": "2025-11-12", "count_in": 168, "conversion_rate": 13.1,  "turnover": 409.74,  "sales_per_visitor": 2.44},
-            {"shop_id": 29641, "date": "2025-11-13", "count_in": 48,  "conversion_rate": 0.0,   "turnover": 0.0,     "sales_per_visitor": 0.0},
-            {"shop_id": 29641, "date": "2025-11-14", "count_in": 203, "conversion_rate": 0.0,   "turnover": 0.0,     "sales_per_visitor": 0.0},
-        ])
+def normalize_vemcount_response(response: Dict[str, Any], outputs: List[str] | None = None) -> pd.DataFrame:
+    """Long frame: shop_id, date + one column per data_output (default: the four KPI_COLUMNS).
 
+    Columns follow helpers.schema: int32 shop_id/count_in, datetime64[s] date,
+    float32 rates, float64 turnover.
+    """
+    outputs = list(outputs) if outputs else KPI_COLUMNS
+    data = response.get("data", {})
+
+    # 1. Alleen de JSON-boom aflopen: per shop de dag-dicts verzamelen
+    shop_ids: List[int] = []
+    counts: List[int] = []
+    days: List[Dict[str, Any]] = []
     for period_key, shops in data.items():
         for shop_id_str, shop_info in shops.items():
+            _collect_shop(shop_id_str, shop_info, shop_ids, counts, days)
+
+    # 2. Kolommen in bulk omzetten
+    return _build_frame(shop_ids, counts, days, outputs)
+
+
+def _collect_shop(shop_id_str: str, shop_info: Any, shop_ids: List[int], counts: List[int],
+                  days: List[Dict[str, Any]]) -> None:
+    try:
+        shop_id = int(shop_id_str)
+    except:
+        return
+
+    dates_dict = shop_info.get("dates", {})
+    if not isinstance(dates_dict, dict):
+        return
+
+    n = len(days)
+    days.extend(e.get("data", {}) if isinstance(e, dict) else {} for e in dates_dict.values())
+    shop_ids.append(shop_id)
+    counts.append(len(days) - n)
+
+
+def _build_frame(shop_ids: List[int], counts: List[int], days: List[Dict[str, Any]], outputs: List[str]) -> pd.DataFrame:
+    dt_raw = [d.get("dt", "") for d in days]
+    dates = _parse_days(dt_raw)
+    keep = ~np.isnat(dates)
+    if not keep.any():
+        return empty_frame(outputs)
+
+    cols: Dict[str, Any] = {
+        "shop_id": np.repeat(np.asarray(shop_ids, dtype=np.int64), counts)[keep].astype(dtype_for("shop_id")),
+        "date": dates[keep].astype(dtype_for("date")),
+    }
+    for kpi in outputs:
+        cols[kpi] = _coerce_numeric([d.get(kpi) for d in days], integer=kpi in INT_KPIS)[keep].astype(dtype_for(kpi))
+    return pd.DataFrame(cols)
+
+
+# --- Streaming: de response-body per shop parsen i.p.v. eerst de hele boom in het geheugen ---
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _JsonCursor:
+    """Incremental reader over a JSON byte stream: objects are walked key by key, values decoded by json's C scanner."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self._scan = json.JSONDecoder().raw_decode
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _fill(self, n: int) -> None:
+        """Buffer at least n unread characters (or up to the end of the body); read text is dropped."""
+        parts, have = [self.buf[self.pos:]], len(self.buf) - self.pos
+        while have < n and not self.eof:
+            chunk = next(self._chunks, None)
+            self.eof = chunk is None
+            text = self._decode(chunk or b"", final=self.eof)
+            parts.append(text)
+            have += len(text)
+        self.buf, self.pos = "".join(parts), 0
+
+    def peek(self) -> str:
+        """Next non-whitespace character, "" at the end of the body."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill(1)
+
+    def take(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"invalid JSON body: expected {char!r}, got {found or 'end of body'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next value; a value cut off by the buffer edge is retried with twice the text."""
+        self.peek()
+        want = STREAM_WINDOW
+        while True:
+            if len(self.buf) - self.pos < want:
+                self._fill(want)
             try:
-                shop_id = int(shop_id_str)
-            except:
+                value, end = self._scan(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                want = 2 * (len(self.buf) - self.pos)
                 continue
+            if end < len(self.buf) or self.eof:  # een getal op de rand kan nog doorlopen
+                self.pos = end
+                return value
+            want = len(self.buf) - self.pos + 1
+
+    def keys(self) -> Iterator[str]:
+        """Keys of the object at the cursor; the caller reads (or skips) each value before the next key."""
+        self.take("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("invalid JSON body: object key is not a string")
+            self.take(":")
+            yield key
+            sep = self.peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"invalid JSON body: expected ',' or '}}', got {sep or 'end of body'!r}")
+
+
+
+def iter_report_shops(chunks: Iterable[bytes]) -> Iterator[Tuple[str, str, Any]]:
+    """(period, shop_id, shop_info) straight off the byte stream, one shop in memory at a time.
 
-            dates_dict = shop_info.get("dates", {})
-            if not isinstance(dates_dict, dict):
+    Root, "data" and the periods under it are walked by hand, so every period
+    is read (as normalize_vemcount_response does); each shop is decoded in
+    one go by json's C scanner. Values that are not objects are skipped.
+    """
+    cur = _JsonCursor(chunks)
+    for key in cur.keys():
+        if key != "data" or cur.peek() != "{":
+            cur.value()
+            continue
+        for period in cur.keys():
+            if cur.peek() != "{":
+                cur.value()
                 continue
+            for shop_id in cur.keys():
+                yield period, shop_id, cur.value()
+    if cur.peek():
+        raise ValueError("invalid JSON body: extra data after the root object")
+
+
+def normalize_stream(chunks: Iterable[bytes], outputs: List[str] | None = None,
+                     batch_rows: int = STREAM_BATCH_ROWS) -> pd.DataFrame:
+    """Same frame as normalize_vemcount_response(json.loads(body)), built from the raw byte chunks.
+
+    Day dicts are turned into typed columns every `batch_rows` rows, so peak
+    memory is the output columns plus one batch instead of the whole JSON
+    tree. Malformed bodies raise ValueError, like json.loads.
+    """
+    outputs = list(outputs) if outputs else KPI_COLUMNS
+    frames: List[pd.DataFrame] = []
+    shop_ids: List[int] = []
+    counts: List[int] = []
+    days: List[Dict[str, Any]] = []
+    for _, shop_id_str, shop_info in iter_report_shops(chunks):
+        _collect_shop(shop_id_str, shop_info, shop_ids, counts, days)
+        if len(days) >= batch_rows:
+            frames.append(_build_frame(shop_ids, counts, days, outputs))
+            shop_ids, counts, days = [], [], []
+    if days or not frames:
+        frames.append(_build_frame(shop_ids, counts, days, outputs))
+    frames = [f for f in frames if not f.empty] or frames[:1]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
 
-            for date_label, date_entry in dates_dict.items():
-                day_data = date_entry.get("data", {}) if isinstance(date_entry, dict) else {}
-
-                dt_raw = day_data.get("dt", "")
-                if not dt_raw:
-                    continue
-
-                try:
-                    # Gebruik ISO direct → altijd werkend
-                    dt_obj = datetime.fromisoformat(dt_raw.replace(" ", "T"))
-                    date_iso = dt_obj.strftime("%Y-%m-%d")  # ← DIT IS CRUCIAAL
-                except:
-                    continue  # Skip ongeldige datum
-
-                def safe_float(val, default=0.0):
-                    try:
-                        return float(val) if val is not None else default
-                    except:
-                        return default
-
-                def safe_int(val, default=0):
-                    try:
-                        return int(float(val)) if val is not None else default
-                    except:
-                        return default
-
-                row = {
-                    "shop_id": shop_id,
-                    "date": date_iso,  # ← ISO string: 2025-11-14 → pd.to_datetime() werkt 100%
-                    "count_in": safe_int(day_data.get("count_in")),
-                    "conversion_rate": safe_float(day_data.get("conversion_rate")),
-                    "turnover": safe_float(day_data.get("turnover")),
-                    "sales_per_visitor": safe_float(day_data.get("sales_per_visitor"))
-                }
-                rows.append(row)
-
-    df = pd.DataFrame(rows)
-    return df if not df.empty else pd.DataFrame(columns=["shop_id", "date", "count_in", "conversion_rate", "turnover", "sales_per_visitor"])
+def to_wide(df: pd.DataFrame, value: str = "count_in") -> pd.DataFrame:
+    """Pivot the long (shop_id, date) frame to one row per date, one column per shop."""
+    if df.empty:
+        return pd.DataFrame()
+    return df.pivot_table(index="date", columns="shop_id", values=value, aggfunc="sum").sort_index()
@@ -0,0 +1,64 @@
+# helpers/potential.py – Location Potential 2.0: wat zou elke winkel moeten opleveren, alle shops in één groupby
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .running_stats import RunningStats
+
+BEST_QUANTILE = 0.75      # "beste dagen" = 75e percentiel van conversie en SPV
+MIN_HISTORY_ROWS = 5      # minder dagen → vaste benchmarks hieronder
+DEFAULT_CONV = 0.16
+DEFAULT_SPV = 3.3
+DEFAULT_FOOTFALL = 500
+FOOTFALL_DAYS = 30        # laatste 30 dagrijen voor de footfall-basis
+TURNOVER_PER_M2 = 87.5    # maandomzet per m² (benchmark)
+UPLIFT = 1.03
+DEFAULT_SQ_METER = 100
+
+
+def shop_potential(df_full: pd.DataFrame, stats: RunningStats | None = None) -> pd.DataFrame:
+    """Per shop: best_conv (fraction), best_spv and foot (mean of the last 30 rows), from the full history.
+
+    df_full must be sorted by date within each shop (ShopDateIndex / fetch_report order).
+    With `stats` the best-day quantiles come from its sketches instead of a
+    quantile over df_full (approximate, no pass over the history).
+    """
+    g = df_full.groupby("shop_id", sort=False)
+    if stats is not None:
+        shops = g.size().index
+        best = pd.DataFrame({m: stats.shop_quantile(m, BEST_QUANTILE, shops).reindex(shops)
+                             for m in ("conversion_rate", "sales_per_visitor")})
+        enough = stats.shop_count("conversion_rate", shops).reindex(shops, fill_value=0) > MIN_HISTORY_ROWS
+    else:
+        best = g[["conversion_rate", "sales_per_visitor"]].quantile(BEST_QUANTILE)
+        enough = g.size() > MIN_HISTORY_ROWS
+    foot = df_full.groupby("shop_id", sort=False).tail(FOOTFALL_DAYS).groupby("shop_id", sort=False)["count_in"].mean()
+    out = pd.DataFrame({
+        "best_conv": np.where(enough, best["conversion_rate"].astype("float64") / 100, DEFAULT_CONV),
+        "best_spv": np.where(enough, best["sales_per_visitor"].astype("float64"), DEFAULT_SPV),
+    }, index=best.index)
+    out["foot"] = foot.reindex(out.index).replace(0, DEFAULT_FOOTFALL)  # `mean() or 500`
+    return out
+
+
+def location_potential(df: pd.DataFrame, df_full: pd.DataFrame, days: int = 30,
+                       stats: RunningStats | None = None) -> pd.DataFrame:
+    """Gap table (Winkel, Gap €, Realisatie) for the period frame `df` (shop_id, name, turnover[, sq_meter]).
+
+    Potential = max(footfall × best conversion × best SPV × days, m² × benchmark), both with UPLIFT;
+    gap = potential − realised turnover. Sorted by gap, largest first.
+    """
+    pot = shop_potential(df_full, stats).reindex(df["shop_id"].to_numpy())
+    sq_meter = df["sq_meter"].to_numpy(dtype="float64") if "sq_meter" in df.columns else DEFAULT_SQ_METER
+    pot_perf = (pot["foot"] * pot["best_conv"] * pot["best_spv"]).to_numpy() * days * UPLIFT
+    pot_m2 = sq_meter * TURNOVER_PER_M2 * UPLIFT
+    final = np.maximum(pot_perf, pot_m2)
+    turnover = df["turnover"].to_numpy(dtype="float64")
+    realised = np.trunc(turnover / final * 100).astype(np.int64)
+    out = pd.DataFrame({
+        "Winkel": df["name"].to_numpy(),
+        "Gap €": np.trunc(final - turnover).astype(np.int64),
+        "Realisatie": [f"{r}%" for r in realised],
+    })
+    return out.sort_values("Gap €", ascending=False)
@@ -0,0 +1,191 @@
+# helpers/reports.py – gedeelde /get-report laag met TTL + LRU cache (één kopie per proces voor alle pagina's)
+from __future__ import annotations
+import os
+from datetime import date
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+import pandas as pd
+
+from .cache import TTLCache
+from .fanout import fetch_chunked
+from .history_store import HISTORY, HISTORY_OUTPUTS, sync_history
+from .rollup import Rollup
+from .tracing import span
+
+REPORT_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL", "600"))
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "32"))
+USE_HISTORY = os.getenv("HISTORY_STORE", "1") != "0"
+
+# Genormaliseerde frames, niet de ruwe JSON: een hit spaart download én normalisatie.
+REPORT_CACHE = TTLCache(maxsize=REPORT_CACHE_SIZE, ttl=REPORT_TTL_SECONDS)
+# Rollups horen bij een report en verlopen tegelijk
+ROLLUP_CACHE = TTLCache(maxsize=REPORT_CACHE_SIZE, ttl=REPORT_TTL_SECONDS)
+# Caches van afgeleide resultaten (sleutel begint met company_id), zie helpers/dashboard.py
+DERIVED_CACHES: List[TTLCache] = []
+
+
+def report_key(company_id: int, shop_ids: Iterable[int], outputs: Iterable[str], period: str = "this_year",
+               period_step: str = "day", source: str = "shops", today: date | None = None) -> Tuple[Hashable, ...]:
+    # met vandaag in de sleutel: "this_year" van gisteren of van een vastgezette datum is een ander report
+    return (company_id, frozenset(int(s) for s in shop_ids), period, period_step, source, frozenset(outputs),
+            (today or date.today()).isoformat())
+
+
+def _lookup(key: Tuple[Hashable, ...]) -> pd.DataFrame | None:
+    """Exact hit, or any cached report that covers these shops and outputs (sliced to the shops)."""
+    hit = REPORT_CACHE.get(key)
+    if hit is not None:
+        return hit.copy()
+    company_id, shops, period, period_step, source, outputs, today = key
+    for other, df in REPORT_CACHE.items():
+        o_company, o_shops, o_period, o_step, o_source, o_outputs, o_today = other
+        if (o_company, o_period, o_step, o_source, o_today) != (company_id, period, period_step, source, today):
+            continue
+        if shops <= o_shops and outputs <= o_outputs:
+            REPORT_CACHE.touch(other)
+            return df[df["shop_id"].isin(shops)].reset_index(drop=True) if not df.empty else df.copy()
+    return None
+
+
+def fetch_report(api_base: str, company_id: int, shop_ids: Iterable[int], outputs: Iterable[str],
+                 period: str = "this_year", period_step: str = "day", source: str = "shops",
+                 use_cache: bool = True, timeout: int = 60,
+                 today: date | None = None) -> Tuple[pd.DataFrame, Dict[str, Any] | None]:
+    """Normalized /get-report frame for (company, shops, period, outputs).
+
+    Returns (df, None) on success and (empty frame, api_get_report error dict)
+    on failure; errors are never cached. Rows are sorted by (shop_id, date).
+    Callers get their own copy and may add columns freely. `today` (default:
+    the real date) fixes what "this_year" means for the history store.
+    """
+    shop_ids, outputs = list(shop_ids), list(outputs)
+    today = today or date.today()
+    key = report_key(company_id, shop_ids, outputs, period, period_step, source, today)
+    if use_cache:
+        hit = _lookup(key)
+        if hit is not None:
+            return hit, None
+
+    if USE_HISTORY and (period, period_step, source) == ("this_year", "day", "shops") and set(outputs) <= set(HISTORY_OUTPUTS):
+        # Dagreeks van dit jaar: alleen de ontbrekende dagen ophalen, de rest komt van schijf
+        err = sync_history(api_base, company_id, shop_ids, today=today, timeout=timeout)
+        if err:
+            return pd.DataFrame(), err
+        with span("history.read", shops=len(shop_ids)) as s:
+            df = HISTORY.read(company_id, shop_ids, date_from=f"{today.year}-01-01", date_to=today.isoformat())
+            s.set(rows=len(df))
+    else:
+        df, err = fetch_chunked(api_base, shop_ids, outputs, period, period_step, source, timeout=timeout)
+        if err:
+            return pd.DataFrame(), err
+    if not df.empty:  # opgeslagen op (shop_id, date): ShopDateIndex hoeft dan niet meer te sorteren
+        df = df.sort_values(["shop_id", "date"], kind="stable", ignore_index=True)
+    REPORT_CACHE.set(key, df)
+    return df.copy(), None
+
+
+def fetch_history(api_base: str, company_id: int, shop_ids: Iterable[int], date_from: date | str,
+                  today: date | None = None, use_cache: bool = True,
+                  timeout: int = 60) -> Tuple[pd.DataFrame, Dict[str, Any] | None]:
+    """Normalized daily HISTORY_OUTPUTS rows from `date_from` through `today`, also from before this year.
+
+    For windows that do not fit "this_year" (weekday profiles). Goes through
+    the history store like fetch_report, or fetches the range directly when
+    the store is off. Same (df, err) contract and caching as fetch_report.
+    """
+    shop_ids = list(shop_ids)
+    today = today or date.today()
+    date_from = pd.Timestamp(date_from).date()
+    key = report_key(company_id, shop_ids, HISTORY_OUTPUTS, f"from {date_from.isoformat()}", today=today)
+    if use_cache:
+        hit = _lookup(key)
+        if hit is not None:
+            return hit, None
+
+    if USE_HISTORY:
+        err = sync_history(api_base, company_id, shop_ids, today=today, timeout=timeout, date_from=date_from)
+        if err:
+            return pd.DataFrame(), err
+        with span("history.read", shops=len(shop_ids)) as s:
+            df = HISTORY.read(company_id, shop_ids, date_from=date_from.isoformat(), date_to=today.isoformat())
+            s.set(rows=len(df))
+    else:
+        df, err = fetch_chunked(api_base, shop_ids, HISTORY_OUTPUTS, period="date", date_from=date_from.isoformat(),
+                                date_to=today.isoformat(), split_months=(today - date_from).days > 31, timeout=timeout)
+        if err:
+            return pd.DataFrame(), err
+    if not df.empty:
+        df = df.sort_values(["shop_id", "date"], kind="stable", ignore_index=True)
+    REPORT_CACHE.set(key, df)
+    return df.copy(), None
+
+
+def fetch_rollup(api_base: str, company_id: int, shop_ids: Iterable[int], outputs: Iterable[str],
+                 regions: Dict[int, str] | None = None, period: str = "this_year", period_step: str = "day",
+                 source: str = "shops", use_cache: bool = True, timeout: int = 60,
+                 today: date | None = None) -> Tuple[Rollup | None, Dict[str, Any] | None]:
+    """Rollup of the fetch_report frame, built once per report and shared (read-only) across reruns."""
+    shop_ids, outputs = list(shop_ids), list(outputs)
+    today = today or date.today()
+    key = report_key(company_id, shop_ids, outputs, period, period_step, source, today) + (
+        frozenset((regions or {}).items()),)
+    if use_cache:
+        hit = ROLLUP_CACHE.get(key)
+        if hit is not None:
+            return hit, None
+    df, err = fetch_report(api_base, company_id, shop_ids, outputs, period, period_step, source, use_cache, timeout,
+                           today)
+    if err:
+        return None, err
+    rollup = Rollup(df, regions)
+    ROLLUP_CACHE.set(key, rollup)
+    return rollup, None
+
+
+def invalidate(company_id: int | None = None) -> None:
+    """Drop cached reports (and their rollups and derived results) for one company (or everything)."""
+    for cache in (REPORT_CACHE, ROLLUP_CACHE, *DERIVED_CACHES):
+        if company_id is None:
+            cache.clear()
+            continue
+        for key, _ in cache.items():
+            if key[0] == company_id:
+                cache.pop(key)
+
+
+class ReportPlan:
+    """Collects the data_outputs every section of a page needs and fetches their union once.
+
+        plan = ReportPlan(API_BASE, client_id, shop_ids)
+        plan.need("kpis", ["count_in", "turnover"])
+        plan.need("weekday", ["conversion_rate", "sales_per_transaction"])
+        frames, err = plan.fetch()   # frames["kpis"], frames["weekday"]
+    """
+
+    def __init__(self, api_base: str, company_id: int, shop_ids: Iterable[int], period: str = "this_year",
+                 period_step: str = "day", source: str = "shops", today: date | None = None):
+        self.api_base = api_base
+        self.company_id = company_id
+        self.shop_ids = list(shop_ids)
+        self.period, self.period_step, self.source = period, period_step, source
+        self.today = today
+        self._needs: Dict[str, List[str]] = {}
+
+    def need(self, consumer: str, outputs: Iterable[str]) -> "ReportPlan":
+        self._needs[consumer] = list(outputs)
+        return self
+
+    @property
+    def outputs(self) -> List[str]:
+        """Union of all requested outputs, in first-requested order."""
+        return list(dict.fromkeys(o for outs in self._needs.values() for o in outs))
+
+    def fetch(self, use_cache: bool = True) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any] | None]:
+        """One /get-report round-trip; every consumer gets shop_id, date + its own outputs."""
+        df, err = fetch_report(self.api_base, self.company_id, self.shop_ids, self.outputs,
+                               self.period, self.period_step, self.source, use_cache=use_cache, today=self.today)
+        frames = {}
+        for consumer, outs in self._needs.items():
+            cols = ["shop_id", "date"] + outs
+            frames[consumer] = df[cols].copy() if not err else pd.DataFrame(columns=cols)
+        return frames, err
@@ -0,0 +1,120 @@
+# helpers/rollup.py – voorgeaggregeerde KPI-kubus: shop × dag / ISO-week / maand en regio × maand
+from __future__ import annotations
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+SUM_KPIS = ["count_in", "turnover"]                      # periode = som (turnover: eerst max per dag)
+MEAN_KPIS = ["conversion_rate", "sales_per_visitor"]     # periode = gemiddelde over de dagrijen
+
+
+class Rollup:
+    """Period KPIs per shop from sums built once, instead of masking df_full per query.
+
+    Each grain is a frame sorted by its period start (`key`) holding sums plus,
+    for the mean KPIs, `<kpi>_sum` and `<kpi>_n`. A period query picks the
+    coarsest grain that fits exactly (ISO week, calendar month) or combines
+    whole months with the loose days at both ends, each slice found by
+    binary search. Results match the pages' old groupby (turnover = sum of
+    the daily max, rates = mean over the rows).
+    """
+
+    def __init__(self, df_full: pd.DataFrame, regions: Dict[int, str] | None = None):
+        self.sum_kpis = [k for k in SUM_KPIS if k in df_full.columns]
+        self.mean_kpis = [k for k in MEAN_KPIS if k in df_full.columns]
+        d = df_full[["shop_id", "date"] + self.sum_kpis + self.mean_kpis].copy()
+        d["date"] = pd.to_datetime(d["date"], errors="coerce")
+        d = d.dropna(subset=["date"])
+        # sommen in 64 bit: het compacte schema (int32/float32) zou over een jaar × alle shops overlopen
+        d = d.astype({k: "int64" if pd.api.types.is_integer_dtype(d[k]) else "float64"
+                      for k in self.sum_kpis + self.mean_kpis})
+
+        g = d.groupby(["shop_id", "date"], sort=False)
+        day = pd.DataFrame({k: g[k].max() if k == "turnover" else g[k].sum() for k in self.sum_kpis})
+        for k in self.mean_kpis:
+            day[f"{k}_sum"] = g[k].sum()
+            day[f"{k}_n"] = g[k].count()
+        day = day.reset_index().rename(columns={"date": "key"})
+        self._value_cols = [c for c in day.columns if c not in ("shop_id", "key")]
+
+        self.day = self._sorted(day)
+        dates = day["key"]
+        self.week = self._grain(day, dates - pd.to_timedelta(dates.dt.dayofweek, unit="D"))
+        self.month = self._grain(day, dates.dt.to_period("M").dt.start_time)
+        regions = regions or {}
+        by_region = self.month.assign(region=self.month["shop_id"].map(regions).fillna("ALL"))
+        self.region_month = (by_region.groupby(["region", "key"], sort=True)[self._value_cols].sum()
+                             .reset_index())
+
+    # --- opbouw ---
+    def _grain(self, day: pd.DataFrame, key: pd.Series) -> pd.DataFrame:
+        out = day.assign(key=key).groupby(["shop_id", "key"], sort=False)[self._value_cols].sum().reset_index()
+        return self._sorted(out)
+
+    @staticmethod
+    def _sorted(frame: pd.DataFrame) -> pd.DataFrame:
+        return frame.sort_values(["key", "shop_id"], kind="stable", ignore_index=True)
+
+    @staticmethod
+    def _slice(table: pd.DataFrame, lo: pd.Timestamp, hi: pd.Timestamp) -> pd.DataFrame:
+        keys = table["key"].to_numpy()
+        a = np.searchsorted(keys, lo.to_datetime64(), side="left")
+        b = np.searchsorted(keys, hi.to_datetime64(), side="right")
+        return table.iloc[a:b]
+
+    def _parts(self, lo: pd.Timestamp, hi: pd.Timestamp) -> List[pd.DataFrame]:
+        if lo.dayofweek == 0 and hi == lo + pd.Timedelta(days=6):
+            return [self._slice(self.week, lo, lo)]
+        m_lo = lo if lo.day == 1 else (lo + pd.offsets.MonthBegin(1))
+        m_hi = (hi + pd.Timedelta(days=1)).to_period("M").start_time - pd.offsets.MonthBegin(1)  # laatste hele maand
+        if m_lo > m_hi:
+            return [self._slice(self.day, lo, hi)]
+        return [self._slice(self.day, lo, m_lo - pd.Timedelta(days=1)),
+                self._slice(self.month, m_lo, m_hi),
+                self._slice(self.day, m_hi + pd.offsets.MonthBegin(1), hi)]
+
+    def _finish(self, sums: pd.DataFrame) -> pd.DataFrame:
+        out = sums[[c for c in ("region", "shop_id", "key") if c in sums.columns] + self.sum_kpis].copy()
+        for k in self.mean_kpis:
+            out[k] = sums[f"{k}_sum"] / sums[f"{k}_n"].replace(0, np.nan)
+        return out
+
+    # --- queries ---
+    def sums(self, date_from, date_to, shop_ids: Iterable[int] | None = None) -> pd.DataFrame:
+        """Raw sums and counts per shop for [date_from, date_to]; only shops with data."""
+        lo, hi = pd.Timestamp(date_from).normalize(), pd.Timestamp(date_to).normalize()
+        parts = [p for p in self._parts(lo, hi) if not p.empty]
+        if not parts:
+            return pd.DataFrame(columns=["shop_id"] + self._value_cols)
+        rows = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        if shop_ids is not None:
+            rows = rows[rows["shop_id"].isin(list(shop_ids))]
+        return rows.groupby("shop_id", sort=True)[self._value_cols].sum().reset_index()
+
+    def period(self, date_from, date_to, shop_ids: Iterable[int] | None = None) -> pd.DataFrame:
+        """shop_id + KPIs for [date_from, date_to], as the pages' groupby on the filtered frame."""
+        return self._finish(self.sums(date_from, date_to, shop_ids))
+
+    def totals(self, date_from, date_to, shop_ids: Iterable[int] | None = None) -> pd.Series:
+        """All selected shops together: sums, and rates as the mean over every row (like frame.agg).
+
+        Empty Series when the period has no rows.
+        """
+        s = self.sums(date_from, date_to, shop_ids)
+        if s.empty:
+            return pd.Series(dtype="float64")
+        total = s[self._value_cols].sum()
+        out = {k: total[k] for k in self.sum_kpis}
+        for k in self.mean_kpis:
+            out[k] = total[f"{k}_sum"] / total[f"{k}_n"] if total[f"{k}_n"] else np.nan
+        return pd.Series(out)
+
+    def months(self, shop_ids: Iterable[int] | None = None) -> pd.DataFrame:
+        """key (month start) + KPIs, all selected shops together, per month."""
+        m = self.month if shop_ids is None else self.month[self.month["shop_id"].isin(list(shop_ids))]
+        return self._finish(m.groupby("key", sort=True)[self._value_cols].sum().reset_index())
+
+    def regions(self) -> pd.DataFrame:
+        """region, key (month start) + KPIs."""
+        return self._finish(self.region_month)
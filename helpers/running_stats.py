@@ -0,0 +1,294 @@
+# helpers/running_stats.py – lopende statistiek per shop × weekdag: count/sum/sumsq + quantiel-sketch, bijwerken in O(nieuwe dagen)
+# Opslag: {HISTORY_DIR}/company={id}/_running_stats.npz; alleen afgeronde dagen (ouder dan MUTABLE_DAYS) van dit jaar
+# tellen mee (zelfde basis als het "this_year"-report), op 1 januari begint de store opnieuw
+from __future__ import annotations
+import json
+import os
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from .history_store import HISTORY_DIR, MUTABLE_DAYS
+
+STAT_METRICS = ["count_in", "conversion_rate", "sales_per_visitor", "sales_per_transaction"]
+QUANTILES = (0.3, 0.5, 0.75)  # p30 (advisor), mediaan, p75 (potential) – na elke update klaar om te serveren
+SKETCH_ALPHA = 0.02           # relatieve fout van de quantielen (2%)
+# waardebereik per KPI voor de log-buckets; kleiner → naar de onderste bucket, ≤ 0 → nul-bucket
+METRIC_RANGES = {"count_in": (1.0, 1e6), "conversion_rate": (0.01, 100.0),
+                 "sales_per_visitor": (0.01, 1e4), "sales_per_transaction": (0.01, 1e5)}
+DEFAULT_RANGE = (0.01, 1e6)
+_NEVER = np.iinfo(np.int64).min
+
+
+class QuantileSketch:
+    """Log-bucket histogram layout (DDSketch-style) shared by all groups of one metric.
+
+    Bucket 0 holds values ≤ 0; bucket k ≥ 1 covers a factor gamma, so every
+    quantile is within `alpha` relative error. Counts live in the caller's
+    array, one row per group, which makes sketches mergeable by adding rows.
+    """
+
+    def __init__(self, lo: float, hi: float, alpha: float = SKETCH_ALPHA):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = np.log(self.gamma)
+        self.kmin = int(np.ceil(np.log(lo) / self._log_gamma))
+        self.kmax = int(np.ceil(np.log(hi) / self._log_gamma))
+        self.bins = self.kmax - self.kmin + 2
+        keys = np.arange(self.kmin, self.kmax + 1)
+        self.values = np.concatenate([[0.0], 2 * self.gamma ** keys / (self.gamma + 1)])
+
+    def bucket(self, x: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = np.ceil(np.log(np.where(x > 0, x, 1.0)) / self._log_gamma)
+        k = np.clip(k, self.kmin, self.kmax).astype(np.int64) - self.kmin + 1
+        return np.where(x > 0, k, 0)
+
+    def quantiles(self, counts: np.ndarray, qs: Iterable[float]) -> np.ndarray:
+        """(groups × bins) counts → (groups × len(qs)) values; NaN for empty groups."""
+        qs = list(qs)
+        cum = np.cumsum(counts, axis=1, dtype=np.int64)
+        n = cum[:, -1:] if cum.size else np.zeros((len(counts), 1), dtype=np.int64)
+        out = np.full((len(counts), len(qs)), np.nan)
+        for j, q in enumerate(qs):
+            rank = np.floor(q * (n - 1))
+            pos = (cum <= rank).sum(axis=1)
+            out[:, j] = np.where(n[:, 0] > 0, self.values[np.minimum(pos, self.bins - 1)], np.nan)
+        return out
+
+
+class RunningStats:
+    """count, sum, sum of squares and a quantile sketch per shop × weekday × metric.
+
+    `update` only folds in days after the last day already seen per shop and
+    metric, so a refresh costs O(new days); mean/std/p30/p50/p75 are kept per
+    group and served without touching the history again. Days before `since`
+    are ignored (RunningStatsStore sets it to 1 January).
+
+        stats.update(df_hist, through=today - 2 days)
+        stats.weekday_means(["conversion_rate"], shop_ids)   # 7 rijen
+        stats.summary("count_in")                            # shop × weekdag
+    """
+
+    def __init__(self, metrics: List[str] = STAT_METRICS, alpha: float = SKETCH_ALPHA, since: date | None = None):
+        self.metrics = list(metrics)
+        self.alpha = alpha
+        self.since = since
+        self.sketches = {m: QuantileSketch(*METRIC_RANGES.get(m, DEFAULT_RANGE), alpha=alpha) for m in self.metrics}
+        self.shop_ids = np.empty(0, dtype=np.int64)
+        self._pos: Dict[int, int] = {}
+        self.last = np.empty((0, len(self.metrics)), dtype=np.int64)  # laatste verwerkte dag per shop × metric
+        self.count = {m: np.zeros(0, dtype=np.int64) for m in self.metrics}
+        self.sum = {m: np.zeros(0) for m in self.metrics}
+        self.sumsq = {m: np.zeros(0) for m in self.metrics}
+        self.hist = {m: np.zeros((0, s.bins), dtype=np.uint16) for m, s in self.sketches.items()}
+        self.quant = {m: np.zeros((0, len(QUANTILES))) for m in self.metrics}
+
+    def __len__(self) -> int:
+        return len(self.shop_ids)
+
+    def _slots_for(self, shop_ids: np.ndarray) -> np.ndarray:
+        """Shop positions, adding unknown shops (7 weekday slots each)."""
+        new = [int(s) for s in pd.unique(shop_ids) if int(s) not in self._pos]
+        if new:
+            for sid in new:
+                self._pos[sid] = len(self._pos)
+            grow = 7 * len(new)
+            self.shop_ids = np.concatenate([self.shop_ids, np.asarray(new, dtype=np.int64)])
+            self.last = np.vstack([self.last, np.full((len(new), len(self.metrics)), _NEVER, dtype=np.int64)])
+            for m in self.metrics:
+                self.count[m] = np.concatenate([self.count[m], np.zeros(grow, dtype=np.int64)])
+                self.sum[m] = np.concatenate([self.sum[m], np.zeros(grow)])
+                self.sumsq[m] = np.concatenate([self.sumsq[m], np.zeros(grow)])
+                self.hist[m] = np.vstack([self.hist[m], np.zeros((grow, self.sketches[m].bins), dtype=np.uint16)])
+                self.quant[m] = np.vstack([self.quant[m], np.full((grow, len(QUANTILES)), np.nan)])
+        return np.fromiter((self._pos[int(s)] for s in shop_ids), dtype=np.int64, count=len(shop_ids))
+
+    def _settled(self, df: pd.DataFrame, through: date | str | None):
+        """(metrics, row mask, shop ids, day numbers) of the rows update() looks at; None if there are none."""
+        metrics = [m for m in self.metrics if m in df.columns]
+        if df.empty or not metrics:
+            return None
+        days = df["date"].to_numpy(dtype="datetime64[D]")
+        keep = ~np.isnat(days)
+        if self.since is not None:
+            keep &= days >= np.datetime64(self.since, "D")
+        if through is not None:
+            keep &= days <= np.datetime64(pd.Timestamp(through).date(), "D")
+        if not keep.any():
+            return None
+        return metrics, keep, df["shop_id"].to_numpy(dtype=np.int64)[keep], days[keep].astype(np.int64)
+
+    def pending(self, df: pd.DataFrame, through: date | str | None = None) -> bool:
+        """False when update(df, through) would add nothing; changes nothing itself."""
+        settled = self._settled(df, through)
+        if settled is None:
+            return False
+        if not len(self.shop_ids):
+            return True
+        metrics, keep, shops, day_n = settled
+        order = np.argsort(self.shop_ids, kind="stable")
+        idx = np.minimum(np.searchsorted(self.shop_ids, shops, sorter=order), len(order) - 1)
+        pos = order[idx]
+        known = self.shop_ids[pos] == shops
+        for m in metrics:
+            last = np.where(known, self.last[pos, self.metrics.index(m)], _NEVER)
+            values = df[m].to_numpy(dtype="float64", na_value=np.nan)[keep]
+            if ((day_n > last) & np.isfinite(values)).any():
+                return True
+        return False
+
+    def copy(self) -> "RunningStats":
+        """Independent copy (the sketches' bucket layouts are shared, they never change)."""
+        out = RunningStats.__new__(RunningStats)
+        out.metrics, out.alpha, out.since, out.sketches = list(self.metrics), self.alpha, self.since, self.sketches
+        out.shop_ids, out._pos, out.last = self.shop_ids.copy(), dict(self._pos), self.last.copy()
+        for name in ("count", "sum", "sumsq", "hist", "quant"):
+            setattr(out, name, {m: a.copy() for m, a in getattr(self, name).items()})
+        return out
+
+    def update(self, df: pd.DataFrame, through: date | str | None = None) -> int:
+        """Fold in the rows of `df` (shop_id, date, metrics) newer than what was seen, up to `through`; returns rows added."""
+        settled = self._settled(df, through)
+        if settled is None:
+            return 0
+        metrics, keep, shops, day_n = settled
+        pos = self._slots_for(shops)
+        slot = pos * 7 + (day_n + 3) % 7  # 1970-01-01 was een donderdag → 0 = maandag
+        added = 0
+        for m in metrics:
+            j = self.metrics.index(m)
+            values = df[m].to_numpy(dtype="float64", na_value=np.nan)[keep]
+            fresh = (day_n > self.last[pos, j]) & np.isfinite(values)
+            if not fresh.any():
+                continue
+            s, v = slot[fresh], values[fresh]
+            np.add.at(self.count[m], s, 1)
+            np.add.at(self.sum[m], s, v)
+            np.add.at(self.sumsq[m], s, v * v)
+            sketch = self.sketches[m]
+            cells, n = np.unique(s * sketch.bins + sketch.bucket(v), return_counts=True)
+            flat = self.hist[m].reshape(-1)
+            flat[cells] = np.minimum(flat[cells].astype(np.int64) + n, np.iinfo(np.uint16).max)
+            touched = np.unique(s)
+            self.quant[m][touched] = sketch.quantiles(self.hist[m][touched], QUANTILES)
+            np.maximum.at(self.last[:, j], pos[fresh], day_n[fresh])
+            added += int(fresh.sum())
+        return added
+
+    # --- serveren ---
+    def _rows(self, shop_ids: Iterable[int] | None) -> np.ndarray:
+        if shop_ids is None:
+            return np.arange(len(self.shop_ids), dtype=np.int64)
+        return np.asarray([self._pos[int(s)] for s in shop_ids if int(s) in self._pos], dtype=np.int64)
+
+    def summary(self, metric: str) -> pd.DataFrame:
+        """Per shop × weekday: count, mean, std, p30, p50, p75."""
+        n = self.count[metric]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum[metric] / n
+            var = np.maximum(self.sumsq[metric] / n - mean * mean, 0.0) * n / np.maximum(n - 1, 1)
+        out = pd.DataFrame({
+            "shop_id": np.repeat(self.shop_ids, 7),
+            "weekday": np.tile(np.arange(7), len(self.shop_ids)),
+            "count": n,
+            "mean": mean,
+            "std": np.where(n > 1, np.sqrt(var), np.nan),
+        })
+        for j, q in enumerate(QUANTILES):
+            out[f"p{int(q * 100)}"] = self.quant[metric][:, j]
+        return out
+
+    def weekday_means(self, metrics: List[str], shop_ids: Iterable[int] | None = None) -> pd.DataFrame:
+        """Mean per weekday (index 0..6) over all days of the selected shops; NaN where nothing was seen."""
+        rows = self._rows(shop_ids)
+        out = {}
+        for m in metrics:
+            n = self.count[m].reshape(-1, 7)[rows].sum(axis=0)
+            total = self.sum[m].reshape(-1, 7)[rows].sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[m] = np.where(n > 0, total / n, np.nan)
+        return pd.DataFrame(out, index=pd.RangeIndex(7, name="weekday"))
+
+    def shop_quantile(self, metric: str, q: float, shop_ids: Iterable[int] | None = None) -> pd.Series:
+        """Quantile per shop over all weekdays (merged sketches)."""
+        rows = self._rows(shop_ids)
+        sketch = self.sketches[metric]
+        merged = self.hist[metric].reshape(len(self.shop_ids), 7, sketch.bins)[rows].sum(axis=1, dtype=np.int64)
+        return pd.Series(sketch.quantiles(merged, [q])[:, 0], index=pd.Index(self.shop_ids[rows], name="shop_id"), name=metric)
+
+    def shop_count(self, metric: str, shop_ids: Iterable[int] | None = None) -> pd.Series:
+        rows = self._rows(shop_ids)
+        return pd.Series(self.count[metric].reshape(-1, 7)[rows].sum(axis=1),
+                         index=pd.Index(self.shop_ids[rows], name="shop_id"), name=metric)
+
+    # --- opslag ---
+    def save(self, path: str) -> None:
+        arrays = {"shop_ids": self.shop_ids, "last": self.last}
+        for m in self.metrics:
+            arrays.update({f"{m}.count": self.count[m], f"{m}.sum": self.sum[m], f"{m}.sumsq": self.sumsq[m],
+                           f"{m}.hist": self.hist[m], f"{m}.quant": self.quant[m]})
+        meta = json.dumps({"metrics": self.metrics, "alpha": self.alpha,
+                           "since": self.since.isoformat() if self.since else None})
+        tmp = f"{path}.tmp{threading.get_ident()}.npz"
+        np.savez(tmp, meta=np.array(meta), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RunningStats":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            since = meta.get("since")
+            stats = cls(meta["metrics"], meta["alpha"], date.fromisoformat(since) if since else None)
+            stats.shop_ids = data["shop_ids"]
+            stats.last = data["last"]
+            stats._pos = {int(s): i for i, s in enumerate(stats.shop_ids)}
+            for m in stats.metrics:
+                stats.count[m], stats.sum[m], stats.sumsq[m] = data[f"{m}.count"], data[f"{m}.sum"], data[f"{m}.sumsq"]
+                stats.hist[m], stats.quant[m] = data[f"{m}.hist"], data[f"{m}.quant"]
+        return stats
+
+
+class RunningStatsStore:
+    """RunningStats per company over this year, in memory and on disk next to the history store.
+
+    New days are folded into a copy that then replaces the shared object, so a
+    caller still reading the stats it got earlier never sees half an update.
+    """
+
+    def __init__(self, root: str = HISTORY_DIR, metrics: List[str] = STAT_METRICS):
+        self.root = root
+        self.metrics = metrics
+        self._lock = threading.RLock()
+        self._mem: Dict[int, RunningStats] = {}
+
+    def _path(self, company_id: int) -> str:
+        return os.path.join(self.root, f"company={company_id}", "_running_stats.npz")
+
+    def get(self, company_id: int, df: pd.DataFrame | None = None, today: date | None = None) -> RunningStats:
+        """Stats for the company, first folding in the settled days of `df` that are new."""
+        with self._lock:
+            today = today or date.today()
+            year_start = date(today.year, 1, 1)
+            stats = self._mem.get(company_id)
+            if stats is None:
+                try:
+                    stats = RunningStats.load(self._path(company_id))
+                except (OSError, KeyError, ValueError):
+                    stats = None
+            if stats is None or stats.metrics != self.metrics or stats.since != year_start:
+                stats = RunningStats(self.metrics, since=year_start)  # nieuw jaar (of oud bestand) → opnieuw tellen
+            self._mem[company_id] = stats
+            if df is not None:
+                through = today - timedelta(days=MUTABLE_DAYS)  # laatste dagen kunnen nog wijzigen
+                fresh = stats.copy() if stats.pending(df, through=through) else None  # kopie alleen als er iets bijkomt
+                if fresh is not None and fresh.update(df, through=through):
+                    os.makedirs(os.path.dirname(self._path(company_id)), exist_ok=True)
+                    fresh.save(self._path(company_id))
+                    self._mem[company_id] = stats = fresh
+            return stats
+
+
+STATS = RunningStatsStore()
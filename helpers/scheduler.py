@@ -0,0 +1,201 @@
+# helpers/scheduler.py – achtergrond-prefetch: per klant uit clients.json 's nachts (en optioneel elke N s)
+# historie syncen, ARIMA-voorspellingen fitten, weer verversen en de stores op schijf (stats, profielen) bijwerken.
+# De dashboard-resultaten zelf niet: die verlopen na REPORT_CACHE_TTL, lang voor de eerste paginaweergave.
+# Gebruik: in het Streamlit-proces via start_background() (PREFETCH=1, zie home.py)
+#          of als los proces: python -m helpers.scheduler [--once] [--interval 900]
+#          (los proces → alleen de stores op schijf zijn warm, de caches in het geheugen zijn per proces)
+from __future__ import annotations
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from .dashboard import Dashboard
+from .forecast import FORECAST_MODE, FORECASTS
+from .http_client import http_get
+from .reports import invalidate
+from .running_stats import STATS
+from .weekday_profile import RECENT_WEEKS
+
+CLIENTS_FILE = os.getenv("CLIENTS_JSON", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "clients.json"))
+PREFETCH_AT = os.getenv("PREFETCH_AT", "05:00")                 # nachtelijke run, lokale tijd
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "0"))  # > 0 → daarnaast elke N seconden
+PREFETCH_POLL_SECONDS = 30
+
+
+def load_clients(source: str | List[Dict[str, Any]] = CLIENTS_FILE) -> List[Dict[str, Any]]:
+    """clients.json as a list: from a URL, a local path, or already a list."""
+    if isinstance(source, list):
+        return source
+    if source.startswith(("http://", "https://")):
+        return http_get(source).json()
+    with open(source, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Prefetcher:
+    """Keeps every client's data warm so the first page view of the day hits caches.
+
+    Per client a run clears its cached reports and derived results and then
+    does what a page would do:
+    - sync the history store (yesterday and the still-mutable days)
+    - fit the ARIMA forecasts into the FORECASTS cache
+    - fetch the weather for the profile weeks and the forecast horizon
+    - fold the new days into the running stats and the weekday profiles
+
+    Results that live only in DASHBOARD_CACHE (month outlook, period KPIs,
+    potential) are not precomputed: they expire after REPORT_CACHE_TTL, long
+    before the first page view after a nightly run. What is warmed here lasts
+    until the next run: the on-disk stores and the FORECASTS cache.
+
+    `clock` returns the current local datetime and the scheduling goes only
+    through `tick()`, so tests can drive it with a fake clock; the API is
+    whatever the shared http client talks to (set_client + MockTransport).
+    """
+
+    def __init__(self, api_base: str, clients: str | List[Dict[str, Any]] = CLIENTS_FILE, at: str = PREFETCH_AT,
+                 interval: float = PREFETCH_INTERVAL, clock: Callable[[], datetime] = datetime.now, steps: int = 7):
+        self.api_base = api_base.rstrip("/")
+        self.clients = clients
+        self.at = dtime.fromisoformat(at)
+        self.interval = interval
+        self.clock = clock
+        self.steps = steps
+        self.last_run: datetime | None = None
+        self.results: Dict[int, Dict[str, Any] | None] = {}
+        self.next_run = self._next_after(self.clock())
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _next_after(self, now: datetime) -> datetime:
+        nightly = datetime.combine(now.date(), self.at)
+        if nightly <= now:
+            nightly += timedelta(days=1)
+        if self.interval > 0:
+            return min(nightly, now + timedelta(seconds=self.interval))
+        return nightly
+
+    # --- werk ---
+    def warm_client(self, client: Dict[str, Any], now: datetime) -> Dict[str, Any] | None:
+        """Refresh one client; returns an error dict (api_get_report style) or None."""
+        company_id = client["company_id"]
+        try:
+            r = http_get(f"{self.api_base}/clients/{company_id}/locations")
+            r.raise_for_status()
+            locations = r.json()["data"]
+        except Exception as e:
+            return {"error": f"locations: {e}"}
+        shop_ids = [loc["id"] for loc in locations]
+        if not shop_ids:
+            return None
+        invalidate(company_id)  # anders kan een report-cache-hit de sync overslaan
+        dash = Dashboard(self.api_base, company_id, locations, today=now)
+        err = dash.load(shop_ids)
+        if err:
+            return err
+        data = dash.data(shop_ids)
+        if data.df_full.empty:
+            return None
+        today = dash.today
+        # ARIMA in de pool laten fitten en wachten: de eerste paginaweergave vindt ze in de cache
+        FORECASTS.forecast_all(data.df_full, self.steps, today=today, mode="fast" if FORECAST_MODE == "fast" else "arima")
+        dash.weather(shop_ids, today - pd.Timedelta(weeks=RECENT_WEEKS), today + pd.Timedelta(days=self.steps))
+        # zelfde frames als weekday_avg en potential → de pagina vindt de stats bijgewerkt op schijf
+        STATS.get(company_id, data.weekday, today=today.date())
+        STATS.get(company_id, data.df_full, today=today.date())
+        dash.profiles(shop_ids)
+        return None
+
+    def run_once(self, now: datetime | None = None) -> Dict[int, Dict[str, Any] | None]:
+        """Warm every client now; one failing client does not stop the others."""
+        now = now or self.clock()
+        results: Dict[int, Dict[str, Any] | None] = {}
+        with self._lock:
+            try:
+                clients = load_clients(self.clients)
+            except Exception as e:
+                self.results = {0: {"error": f"clients: {e}"}}
+                return self.results
+            for client in clients:
+                try:
+                    results[client["company_id"]] = self.warm_client(client, now)
+                except Exception as e:
+                    results[client.get("company_id", 0)] = {"error": str(e)}
+            self.results, self.last_run = results, now
+        return results
+
+    # --- planning ---
+    def tick(self) -> bool:
+        """Run if due; returns whether a run happened."""
+        now = self.clock()
+        if now < self.next_run:
+            return False
+        self.run_once(now)
+        self.next_run = self._next_after(self.clock())
+        return True
+
+    def start(self, poll: float = PREFETCH_POLL_SECONDS) -> "Prefetcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, args=(poll,), name="prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self, poll: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:  # nooit de achtergrondthread laten sterven
+                self.next_run = self._next_after(self.clock())
+            self._stop.wait(poll)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_BACKGROUND: Prefetcher | None = None
+_BACKGROUND_LOCK = threading.Lock()
+
+
+def start_background(api_base: str, clients: str | List[Dict[str, Any]] = CLIENTS_FILE, **kwargs) -> Prefetcher:
+    """One Prefetcher thread per process (Streamlit reruns and pages call this freely)."""
+    global _BACKGROUND
+    with _BACKGROUND_LOCK:
+        if _BACKGROUND is None:
+            _BACKGROUND = Prefetcher(api_base, clients, **kwargs).start()
+        return _BACKGROUND
+
+
+def main():
+    from .utils import API_URL
+    parser = argparse.ArgumentParser(description="Prefetch/precompute voor alle klanten")
+    parser.add_argument("--api", default=API_URL)
+    parser.add_argument("--clients", default=CLIENTS_FILE)
+    parser.add_argument("--once", action="store_true", help="één run en stoppen")
+    parser.add_argument("--at", default=PREFETCH_AT)
+    parser.add_argument("--interval", type=float, default=PREFETCH_INTERVAL)
+    args = parser.parse_args()
+
+    prefetcher = Prefetcher(args.api, args.clients, at=args.at, interval=args.interval)
+    if args.once:
+        for company_id, err in prefetcher.run_once().items():
+            print(company_id, "ok" if err is None else err)
+        return
+    prefetcher.start()
+    try:
+        while True:
+            prefetcher._stop.wait(3600)
+    except KeyboardInterrupt:
+        prefetcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# helpers/schema.py – vast, compact kolomschema voor de genormaliseerde KPI-frame
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+DTYPES: Dict[str, str] = {
+    "shop_id": "int32",
+    "date": "datetime64[s]",
+    "count_in": "int32",
+    "conversion_rate": "float32",
+    "sales_per_visitor": "float32",
+    "sales_per_transaction": "float32",
+    # turnover blijft float64: float32 heeft ~7 significante cijfers, dus maand-/regiosommen
+    # boven €100k zouden centen verliezen (en de omzetcijfers op de pagina's niet meer kloppen).
+    "turnover": "float64",
+}
+DEFAULT_DTYPE = "float64"  # onbekende data_outputs: geen aannames over de grootte
+META_COLUMNS = ["name", "region"]
+
+
+def dtype_for(column: str) -> str:
+    return DTYPES.get(column, DEFAULT_DTYPE)
+
+
+def empty_frame(outputs: Iterable[str]) -> pd.DataFrame:
+    """Zero-row frame with the schema's columns and dtypes."""
+    cols = ["shop_id", "date"] + list(outputs)
+    return pd.DataFrame({c: pd.Series(dtype=dtype_for(c)) for c in cols})
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a long KPI frame (e.g. older string-dated data) to the schema; unknown columns are left alone."""
+    out = df.copy()
+    for col in out.columns:
+        if col == "date":
+            if out[col].dtype != DTYPES["date"]:
+                out[col] = pd.to_datetime(out[col], errors="coerce").astype(DTYPES["date"])
+        elif col in DTYPES or (col not in META_COLUMNS and pd.api.types.is_numeric_dtype(out[col])):
+            out[col] = out[col].astype(dtype_for(col))
+    return out
+
+
+def add_shop_meta(df: pd.DataFrame, locations: List[Dict[str, Any]], fallback: str = "Onbekend") -> pd.DataFrame:
+    """Add categorical `name` and `region` from the /clients/{id}/locations list (replaces per-row .map)."""
+    ids = np.array([int(loc["id"]) for loc in locations], dtype=np.int64)
+    names = [loc.get("name") or fallback for loc in locations]
+    regions = [loc.get("region") or "ALL" for loc in locations]
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    shop = df["shop_id"].to_numpy(dtype=np.int64)
+    pos = np.clip(np.searchsorted(ids, shop), 0, max(len(ids) - 1, 0))
+    found = (ids[pos] == shop) if len(ids) else np.zeros(len(shop), dtype=bool)
+
+    out = df.copy()
+    for col, values in (("name", names), ("region", regions)):
+        missing = fallback if col == "name" else "ALL"
+        cats = pd.Index(list(dict.fromkeys(values + [missing])))
+        per_location = cats.get_indexer(np.asarray(values, dtype=object)[order])
+        codes = np.full(len(shop), cats.get_loc(missing))
+        codes[found] = per_location[pos[found]]
+        out[col] = pd.Categorical.from_codes(codes, categories=cats)
+    return out
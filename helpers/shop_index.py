@@ -0,0 +1,90 @@
+# helpers/shop_index.py – df_full gesorteerd op (shop_id, date) + offset-tabel per shop; periodes via searchsorted
+from __future__ import annotations
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+_SPAN = np.int64(1 << 32)  # sleutel = shop-rang × 2^32 + dagnummer
+
+
+def _day_numbers(dates: pd.Series) -> np.ndarray:
+    days = pd.to_datetime(dates, errors="coerce").to_numpy(dtype="datetime64[D]")
+    out = days.astype(np.int64)
+    out[np.isnat(days)] = np.iinfo(np.int64).min // 2  # NaT vooraan in de shop
+    return out
+
+
+class ShopDateIndex:
+    """Range and per-shop slicing of a normalized frame without boolean masks.
+
+    The frame is kept sorted by (shop_id, date); `starts`/`ends` give each
+    shop's row block. A shop is one binary search over the shop ids, a date
+    window one searchsorted per shop on a combined (shop rank, day) key, so a
+    query touches only the rows it returns.
+
+        idx = ShopDateIndex(df_full)
+        df_raw = idx.range(first_of_month, last_of_this_month)
+        shop_hist = idx.shop(row["shop_id"])
+    """
+
+    def __init__(self, df: pd.DataFrame, date_col: str = "date"):
+        shops = df["shop_id"].to_numpy(dtype=np.int64)
+        days = _day_numbers(df[date_col])
+        if not _is_sorted(shops, days):
+            order = np.lexsort((days, shops))
+            df, shops, days = df.iloc[order], shops[order], days[order]
+        self.df = df.reset_index(drop=True)
+        self.shop_ids, self.starts = np.unique(shops, return_index=True)
+        self.ends = np.append(self.starts[1:], len(shops))
+        self._base = int(days[days > np.iinfo(np.int64).min // 2].min()) - 1 if len(days) else 0
+        rank = np.repeat(np.arange(len(self.shop_ids), dtype=np.int64), self.ends - self.starts)
+        self._key = rank * _SPAN + np.clip(days - self._base, 0, _SPAN - 1)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def _ranks(self, shop_ids: Iterable[int] | None) -> np.ndarray:
+        if shop_ids is None:
+            return np.arange(len(self.shop_ids), dtype=np.int64)
+        wanted = np.asarray(list(shop_ids), dtype=np.int64)
+        pos = np.searchsorted(self.shop_ids, wanted)
+        hit = pos < len(self.shop_ids)
+        hit[hit] = self.shop_ids[pos[hit]] == wanted[hit]
+        return np.unique(pos[hit]).astype(np.int64)
+
+    def _day(self, value, default: int) -> np.int64:
+        if value is None:
+            return np.int64(default)
+        day = pd.Timestamp(value).to_datetime64().astype("datetime64[D]").astype(np.int64)
+        return np.int64(np.clip(day - self._base, 0, _SPAN - 1))
+
+    def shop(self, shop_id: int) -> pd.DataFrame:
+        """All rows of one shop, by date."""
+        i = np.searchsorted(self.shop_ids, int(shop_id))
+        if i >= len(self.shop_ids) or self.shop_ids[i] != int(shop_id):
+            return self.df.iloc[0:0]
+        return self.df.iloc[self.starts[i]:self.ends[i]]
+
+    def positions(self, date_from=None, date_to=None, shop_ids: Iterable[int] | None = None) -> np.ndarray:
+        """Row positions (sorted) within [date_from, date_to] for these shops (default: all)."""
+        ranks = self._ranks(shop_ids)
+        a = np.searchsorted(self._key, ranks * _SPAN + self._day(date_from, 0), side="left")
+        b = np.searchsorted(self._key, ranks * _SPAN + self._day(date_to, _SPAN - 1), side="right")
+        lengths = np.maximum(b - a, 0)
+        if not lengths.sum():
+            return np.empty(0, dtype=np.int64)
+        # aaneengesloten aranges per shop zonder Python-lus
+        offsets = np.repeat(a - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def range(self, date_from=None, date_to=None, shop_ids: Iterable[int] | None = None) -> pd.DataFrame:
+        """Rows within [date_from, date_to] (inclusive, either end open when None)."""
+        return self.df.iloc[self.positions(date_from, date_to, shop_ids)]
+
+
+def _is_sorted(shops: np.ndarray, days: np.ndarray) -> bool:
+    if len(shops) < 2:
+        return True
+    ds, dd = np.diff(shops), np.diff(days)
+    return bool(((ds > 0) | ((ds == 0) & (dd >= 0))).all())
@@ -0,0 +1,201 @@
+# helpers/tracing.py – lichte span/timer-instrumentatie: duur + payloadgrootte per stap, per paginarun verzameld
+# Uitvoer: debugpaneel in de sidebar (helpers/ui.py, ?debug=1 of DEBUG_PANEL=1), JSON-logregels (TRACE_LOG=1)
+# en Prometheus-metrics (prometheus_text(), of als textfile na elke paginarun via METRICS_FILE).
+# Gebruik: with span("get_report", shops=12) as s: ...; s.set(bytes=len(body))
+from __future__ import annotations
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"
+METRICS_FILE = os.getenv("METRICS_FILE", "")  # bv. voor de node_exporter textfile-collector
+METRICS_PREFIX = "retailgift"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNTED_ATTRS = ("bytes", "rows")  # opgeteld in de metrics; overige attributen alleen in trace en log
+TRACE_MAX_SPANS = 2000  # per paginarun; daarna alleen nog metrics
+
+log = logging.getLogger("retailgift.trace")
+if TRACE_LOG and not log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_handler)
+    log.setLevel(logging.INFO)
+
+
+class Span:
+    """One timed stage: name, attributes (payload sizes, cache hit, ...), duration and nesting depth."""
+
+    __slots__ = ("name", "attrs", "depth", "start", "seconds", "error")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], depth: int):
+        self.name = name
+        self.attrs = attrs
+        self.depth = depth
+        self.start = time.perf_counter()
+        self.seconds: float | None = None
+        self.error: str | None = None
+
+    def set(self, **attrs: Any) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def record(self, t0: float = 0.0) -> Dict[str, Any]:
+        """Flat dict for logs and tables; `start_ms` relative to t0."""
+        out = {"span": self.name, "depth": self.depth, "ms": round(self.seconds * 1000, 2) if self.seconds is not None else None}
+        if t0:
+            out["start_ms"] = round((self.start - t0) * 1000, 2)
+        out.update(self.attrs)
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class Trace:
+    """The spans of one page run, in start order (nested spans follow their parent)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.seconds: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return self.seconds if self.seconds is not None else time.perf_counter() - self.start
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [s.record(self.start) for s in self.spans]
+
+    def finish(self) -> "Trace":
+        """Close the run (once): log it and refresh METRICS_FILE."""
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self.start
+            METRICS.observe(f"page.{self.name}", self.seconds, {})
+            if TRACE_LOG:
+                log.info(json.dumps({"trace": self.name, "ms": round(self.seconds * 1000, 2), "spans": len(self.spans)}))
+            if METRICS_FILE:
+                write_metrics(METRICS_FILE)
+        return self
+
+
+_TRACE: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("trace", default=None)
+_DEPTH: contextvars.ContextVar[int] = contextvars.ContextVar("span_depth", default=0)
+
+
+def start_trace(name: str) -> Trace:
+    """Start collecting spans for this (Streamlit script) run; later spans in this context land in it.
+
+    A rerun simply starts a new trace. Threads started with asyncio.to_thread
+    copy the context and report into the same trace.
+    """
+    trace = Trace(name)
+    _TRACE.set(trace)
+    _DEPTH.set(0)
+    return trace
+
+
+def current_trace() -> Trace | None:
+    return _TRACE.get()
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """start_trace as a block (scripts, workers); finished and detached on exit."""
+    token = _TRACE.set(Trace(name))
+    try:
+        yield _TRACE.get()
+    finally:
+        _TRACE.get().finish()
+        _TRACE.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """Time a stage; always feeds the metrics, and the current trace when there is one."""
+    s = Span(name, attrs, _DEPTH.get())
+    token = _DEPTH.set(s.depth + 1)
+    current = _TRACE.get()
+    if current is not None and len(current.spans) < TRACE_MAX_SPANS:
+        current.spans.append(s)
+    try:
+        yield s
+    except Exception as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.seconds = time.perf_counter() - s.start
+        _DEPTH.reset(token)
+        METRICS.observe(s.name, s.seconds, s.attrs, s.error is not None)
+        if TRACE_LOG:
+            log.info(json.dumps({"trace": current.name if current else None, **s.record()}, default=str))
+
+
+class Metrics:
+    """Process-wide per-span histogram (seconds), error count and payload totals, in Prometheus text format."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, name: str, seconds: float, attrs: Dict[str, Any], error: bool = False) -> None:
+        with self._lock:
+            m = self._series.get(name)
+            if m is None:
+                m = self._series[name] = {"count": 0, "sum": 0.0, "max": 0.0, "errors": 0,
+                                          "buckets": [0] * len(self.buckets), **{k: 0 for k in COUNTED_ATTRS}}
+            m["count"] += 1
+            m["sum"] += seconds
+            m["max"] = max(m["max"], seconds)
+            m["errors"] += error
+            for i, le in enumerate(self.buckets):
+                if seconds <= le:
+                    m["buckets"][i] += 1
+            for key in COUNTED_ATTRS:
+                value = attrs.get(key)
+                if isinstance(value, (int, float)):
+                    m[key] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: {**m, "buckets": list(m["buckets"])} for name, m in self._series.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def prometheus(self, prefix: str = METRICS_PREFIX) -> str:
+        lines = [f"# HELP {prefix}_span_seconds Duration of instrumented stages.",
+                 f"# TYPE {prefix}_span_seconds histogram"]
+        snap = sorted(self.snapshot().items())
+        for name, m in snap:
+            for le, n in zip(self.buckets, m["buckets"]):
+                lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="{le:g}"}} {n}')
+            lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="+Inf"}} {m["count"]}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {m["sum"]:.6f}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {m["count"]}')
+        for key, help_text in (("errors", "Stages that raised."), ("bytes", "Payload bytes handled per stage."),
+                               ("rows", "Rows produced per stage.")):
+            lines += [f"# HELP {prefix}_span_{key}_total {help_text}", f"# TYPE {prefix}_span_{key}_total counter"]
+            lines += [f'{prefix}_span_{key}_total{{span="{name}"}} {m[key]:g}' for name, m in snap if m[key] or key == "errors"]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def prometheus_text() -> str:
+    return METRICS.prometheus()
+
+
+def write_metrics(path: str) -> None:
+    """Prometheus text to `path`, replaced atomically (scrapers never see half a file)."""
+    tmp = f"{path}.tmp{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
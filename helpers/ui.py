@@ -1,6 +1,12 @@
 # helpers/ui.py – FINAL & WERKT
+import json
+import os
+
+import pandas as pd
 import streamlit as st
 
+from helpers.tracing import prometheus_text
+
 def brand_colors():
     primary = "#762181"
     success = st.secrets.get("SUCCESS_COLOR", "#16A34A")
@@ -32,3 +38,37 @@ def inject_css():
     .block-container {padding-top: 1rem;}
     </style>
     """, unsafe_allow_html=True)
+
+def debug_enabled():
+    """Profielpaneel aan met ?debug=1 in de URL of DEBUG_PANEL=1."""
+    try:
+        if st.query_params.get("debug") == "1":
+            return True
+    except Exception:
+        pass
+    return os.getenv("DEBUG_PANEL", "0") == "1"
+
+def debug_panel(trace):
+    """Sluit de trace van deze run af en toont (in debugmodus) duur en payload per stap in de sidebar."""
+    if trace is None:
+        return
+    trace.finish()
+    if not debug_enabled():
+        return
+    records = trace.records()
+    total_ms = trace.seconds * 1000
+    with st.sidebar.expander(f"⏱️ Profiel – {total_ms:,.0f} ms", expanded=True):
+        if not records:
+            st.caption("Geen gemeten stappen")
+            return
+        df = pd.DataFrame(records)
+        df.insert(0, "Stap", ["· " * d + name for d, name in zip(df["depth"], df["span"])])
+        df["% pagina"] = (df["ms"] / total_ms * 100).round(1)
+        extra = [c for c in df.columns if c not in ("Stap", "span", "depth", "start_ms", "ms", "% pagina")]
+        st.dataframe(df[["Stap", "ms", "% pagina"] + extra], hide_index=True, use_container_width=True)
+        top = df[df["depth"] == 0]
+        st.caption(f"Gemeten (bovenste niveau): {top['ms'].sum():,.0f} ms van {total_ms:,.0f} ms; "
+                   "de rest is Streamlit/opmaak buiten de spans")
+        st.download_button("Spans (JSON lines)", "\n".join(json.dumps(r, default=str) for r in records),
+                           file_name=f"{trace.name}-spans.jsonl", mime="application/json")
+        st.download_button("Metrics (Prometheus)", prometheus_text(), file_name="metrics.prom", mime="text/plain")
@@ -1,11 +1,22 @@
 
 # utils_pfmx.py  — Plain keys (no []), repeated params style.
 import os
-import requests
+import httpx
 from typing import List, Tuple, Union, Iterable, Any
 import streamlit as st
 
-API_URL = os.getenv("API_URL", "").rstrip("/") or st.secrets.get("API_URL","").rstrip("/")
+from .http_client import http_request, http_stream
+from .normalize import normalize_stream
+from .tracing import span
+
+def _secret(key: str, default: str = "") -> str:
+    """st.secrets.get that also works headless (no secrets.toml, e.g. benchmarks/workers)."""
+    try:
+        return st.secrets.get(key, default)
+    except Exception:
+        return default
+
+API_URL = os.getenv("API_URL", "").rstrip("/") or _secret("API_URL").rstrip("/")
 
 def inject_css():
     css = """
@@ -16,14 +27,14 @@ def inject_css():
     """
     st.markdown(css, unsafe_allow_html=True)
 
-def _expand_plain(params: List[Tuple[str, Any]]) -> List[Tuple[str, str]]:
+def _expand_plain(params: List[Tuple[str, Any]], plain_keys: bool = True) -> List[Tuple[str, str]]:
     """Return a flat list of (key, value) where list/tuple values are expanded as repeated keys.
-       Also normalizes keys: strips a trailing [] if present.
+       Also normalizes keys: strips a trailing [] if present (unless plain_keys=False).
     """
     out: List[Tuple[str,str]] = []
     for k, v in params:
         key = str(k)
-        if key.endswith("[]"):  # normalize to plain
+        if plain_keys and key.endswith("[]"):  # normalize to plain
             key = key[:-2]
         if isinstance(v, (list, tuple)):
             for vi in v:
@@ -32,31 +43,96 @@ def _expand_plain(params: List[Tuple[str, Any]]) -> List[Tuple[str, str]]:
             out.append((key, str(v)))
     return out
 
-def api_get_report(params: List[Tuple[str, Any]], timeout: int = 60, headers: dict | None = None) -> dict:
+def build_report_params(shop_ids: Iterable[int], outputs: Iterable[str], period: str = "this_year",
+                        period_step: str = "day", source: str = "shops",
+                        date_from: str | None = None, date_to: str | None = None) -> List[Tuple[str, Any]]:
+    """The data[]= / data_output[]= query the dashboard pages send to /get-report.
+       For period="date" pass date_from/date_to (YYYY-MM-DD) → form_date_from/form_date_to.
+    """
+    params: List[Tuple[str, Any]] = [("period", period), ("period_step", period_step), ("source", source)]
+    if period == "date":
+        params += [("form_date_from", str(date_from)), ("form_date_to", str(date_to))]
+    params += [("data[]", sid) for sid in shop_ids]
+    params += [("data_output[]", output) for output in outputs]
+    return params
+
+def api_get_report(params: List[Tuple[str, Any]], timeout: int = 60, headers: dict | None = None,
+                   url: str | None = None, method: str = "POST", plain_keys: bool = True) -> dict:
     """POST to /get-report using *plain keys*, repeated entries, like:
        ("data", 32224), ("data", 31977), ("data_output","count_in"), ...
        This matches your proven working calculators.
+       The dashboard pages call it with url=f"{API_BASE}/get-report", method="GET", plain_keys=False
+       (the data[]= / data_output[]= query style); see helpers/reports.py.
     """
-    if not API_URL:
-        return {"_error": True, "status": 500, "exception": "Missing API_URL", "_url": "", "_method": "POST"}
+    url = url or API_URL
+    if not url:
+        return {"_error": True, "status": 500, "exception": "Missing API_URL", "_url": "", "_method": method}
 
-    expanded = _expand_plain(params)
+    expanded = _expand_plain(params, plain_keys=plain_keys)
     try:
-        r = requests.post(API_URL, params=expanded, timeout=timeout, headers=headers or {})
+        # gedeelde keep-alive client; retries op 429/5xx zitten daar al in (alleen voor GET, niet voor POST)
+        with span("get_report", shops=_shop_count(expanded)) as s:
+            r = http_request(method, url, params=expanded, timeout=timeout, headers=headers)
+            s.set(status=r.status_code, bytes=len(r.content))
         if r.status_code >= 400:
-            raise requests.HTTPError(f"{r.status_code} {r.reason}", response=r)
+            raise httpx.HTTPStatusError(f"{r.status_code} {r.reason_phrase}", request=r.request, response=r)
         try:
-            return r.json()
+            with span("get_report.json", bytes=len(r.content)):
+                return r.json()
         except Exception:
-            return {"_error": True, "status": r.status_code, "_url": r.request.url, "_method":"POST",
+            return {"_error": True, "status": r.status_code, "_url": str(r.request.url), "_method": method,
                     "exception": "JSON parse failed", "_body": r.text[:1000]}
-    except requests.HTTPError as he:
+    except httpx.HTTPStatusError as he:
         resp = he.response
-        return {"_error": True, "status": getattr(resp, "status_code", 500),
-                "_url": getattr(resp.request, "url", API_URL), "_method": "POST",
-                "exception": str(he), "_body": getattr(resp, "text", "")[:1000]}
+        return {"_error": True, "status": resp.status_code,
+                "_url": str(resp.request.url), "_method": method,
+                "exception": str(he), "_body": resp.text[:1000]}
     except Exception as e:
-        return {"_error": True, "status": 500, "_url": API_URL, "_method": "POST", "exception": str(e)}
+        return {"_error": True, "status": 500, "_url": url, "_method": method, "exception": str(e)}
+
+def api_get_report_df(params: List[Tuple[str, Any]], outputs: List[str] | None = None, timeout: int = 60,
+                      headers: dict | None = None, url: str | None = None, method: str = "POST",
+                      plain_keys: bool = True) -> Tuple["pd.DataFrame", dict | None]:
+    """api_get_report + normalization in one go, parsing the body while it streams in.
+
+       Returns (df, None), or (None, error dict) with the same error dict api_get_report would give.
+    """
+    url = url or API_URL
+    if not url:
+        return None, {"_error": True, "status": 500, "exception": "Missing API_URL", "_url": "", "_method": method}
+
+    expanded = _expand_plain(params, plain_keys=plain_keys)
+    try:
+        # span = wachten op de headers + (geneste span) body downloaden en normaliseren, die lopen door elkaar
+        with span("get_report", shops=_shop_count(expanded)) as s, \
+                http_stream(method, url, params=expanded, timeout=timeout, headers=headers) as r:
+            s.set(status=r.status_code)
+            if r.status_code >= 400:
+                r.read()
+                return None, {"_error": True, "status": r.status_code, "_url": str(r.request.url), "_method": method,
+                              "exception": f"{r.status_code} {r.reason_phrase}", "_body": r.text[:1000]}
+            try:
+                with span("get_report.normalize") as n:
+                    body = _counted(r.iter_bytes(), n)
+                    df = normalize_stream(body, outputs)
+                    n.set(rows=len(df))
+                s.set(bytes=n.attrs.get("bytes", 0))
+                return df, None
+            except ValueError as e:  # ook JSON-fouten in de body komen als ValueError terug
+                return None, {"_error": True, "status": r.status_code, "_url": str(r.request.url), "_method": method,
+                              "exception": f"JSON parse failed: {e}"}
+    except Exception as e:
+        return None, {"_error": True, "status": 500, "_url": url, "_method": method, "exception": str(e)}
+
+def _shop_count(expanded: List[Tuple[str, str]]) -> int:
+    return sum(1 for k, _ in expanded if k in ("data", "data[]"))
+
+def _counted(chunks: Iterable[bytes], s) -> Iterable[bytes]:
+    """Pass the byte chunks through, keeping the running total in the span's `bytes`."""
+    s.set(bytes=0)
+    for chunk in chunks:
+        s.attrs["bytes"] += len(chunk)
+        yield chunk
 
 def friendly_error(js: dict, period: str | None = None) -> bool:
     """Show a neat error in Streamlit if the API helper returned an error dict."""
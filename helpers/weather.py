@@ -0,0 +1,217 @@
+# helpers/weather.py – weer per 4-cijferige postcode: lokale cache van historische dagen, alleen ontbrekende dagen ophalen
+# Layout: {WEATHER_DIR}/{postcode}.json  = {"YYYY-MM-DD": {temp, feels_like, precip, pop, icon}, ...}
+from __future__ import annotations
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from .cache import TTLCache
+from .http_client import http_get
+from .tracing import span
+from .utils import _secret
+
+try:
+    from shop_mapping import SHOP_NAME_MAP
+except ImportError:  # helpers los gebruikt (benchmarks/workers zonder repo-root op sys.path)
+    SHOP_NAME_MAP = {}
+
+WEATHER_DIR = os.getenv("WEATHER_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".weather"))
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "visualcrossing")  # visualcrossing | file
+WEATHER_FILE_DIR = os.getenv("WEATHER_FILE_DIR", os.path.join(WEATHER_DIR, "offline"))
+FORECAST_TTL_SECONDS = float(os.getenv("WEATHER_FORECAST_TTL", str(3 * 3600)))  # vandaag + toekomst wijzigt nog
+FAILURE_TTL_SECONDS = float(os.getenv("WEATHER_FAILURE_TTL", "300"))  # mislukte (postcode, periode) zo lang niet opnieuw
+VC_BASE = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
+FIELDS = ["temp", "feels_like", "precip", "pop", "icon"]
+
+
+def postcode_for(location: Dict[str, Any]) -> str | None:
+    """4-digit postcode of a /locations entry (zip), falling back to shop_mapping."""
+    raw = location.get("zip") or SHOP_NAME_MAP.get(int(location.get("id", 0) or 0), {}).get("postcode")
+    digits = "".join(ch for ch in str(raw or "") if ch.isdigit())
+    return digits[:4] if len(digits) >= 4 else None
+
+
+def _day_record(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Visual Crossing 'days' entry → our fields."""
+    return {
+        "temp": d.get("temp"),
+        "feels_like": d.get("feelslike", d.get("temp")),
+        "precip": d.get("precip") or 0.0,
+        "pop": (d.get("precipprob") or 0.0) / 100,
+        "icon": d.get("icon", "partly-cloudy-day"),
+    }
+
+
+# --- providers: (postcode, date_from, date_to) → {YYYY-MM-DD: record} ---
+
+class WeatherProvider(ABC):
+    """Source of daily weather. Raise on failure; WeatherStore keeps serving what it has."""
+
+    name = "base"
+
+    @abstractmethod
+    def fetch(self, postcode: str, date_from: date, date_to: date) -> Dict[str, Dict[str, Any]]:
+        """Records for postcode, date_from..date_to inclusive."""
+
+
+class VisualCrossingProvider(WeatherProvider):
+    name = "visualcrossing"
+
+    def __init__(self, api_key: str | None = None, base_url: str = VC_BASE, timeout: float = 10):
+        self.api_key = api_key or os.getenv("VISUALCROSSING_KEY") or _secret("visualcrossing_key", "demo")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def fetch(self, postcode: str, date_from: date, date_to: date) -> Dict[str, Dict[str, Any]]:
+        url = f"{self.base_url}/{postcode}NL/{date_from.isoformat()}/{date_to.isoformat()}"
+        with span("weather.visualcrossing", postcode=postcode) as s:
+            r = http_get(url, params={"unitGroup": "metric", "key": self.api_key, "include": "days"}, timeout=self.timeout)
+            s.set(status=r.status_code, bytes=len(r.content))
+            r.raise_for_status()
+            return {d["datetime"]: _day_record(d) for d in r.json().get("days", [])}
+
+
+class FileWeatherProvider(WeatherProvider):
+    """Offline stand-in: {root}/{postcode}.json in the Visual Crossing timeline format ({"days": [...]})."""
+
+    name = "file"
+
+    def __init__(self, root: str = WEATHER_FILE_DIR):
+        self.root = root
+
+    def fetch(self, postcode: str, date_from: date, date_to: date) -> Dict[str, Dict[str, Any]]:
+        with open(os.path.join(self.root, f"{postcode}.json")) as f:
+            days = json.load(f).get("days", [])
+        lo, hi = date_from.isoformat(), date_to.isoformat()
+        return {d["datetime"]: _day_record(d) for d in days if lo <= d["datetime"] <= hi}
+
+
+def default_provider() -> WeatherProvider:
+    return FileWeatherProvider() if WEATHER_PROVIDER == "file" else VisualCrossingProvider()
+
+
+# --- store ---
+
+def _missing_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """Sorted days → contiguous (first, last) ranges, so gaps cost one request each."""
+    ranges: List[Tuple[date, date]] = []
+    for d in days:
+        if ranges and d == ranges[-1][1] + timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], d)
+        else:
+            ranges.append((d, d))
+    return ranges
+
+
+class WeatherStore:
+    """Daily weather per postcode for any date window.
+
+    Days before today never change and are kept on disk (one JSON file per
+    postcode); today and later live in a TTL cache. A request only fetches the
+    days neither has, in contiguous ranges, and every postcode is fetched once
+    no matter how many shops share it. Fetches run outside the lock; a range
+    that failed is not asked again for `failure_ttl` seconds.
+    """
+
+    def __init__(self, root: str = WEATHER_DIR, provider: WeatherProvider | None = None,
+                 forecast_ttl: float = FORECAST_TTL_SECONDS, failure_ttl: float = FAILURE_TTL_SECONDS):
+        self.root = root
+        self.provider = provider
+        self.forecast = TTLCache(maxsize=10_000, ttl=forecast_ttl)
+        self.failed = TTLCache(maxsize=10_000, ttl=failure_ttl)
+        self._lock = threading.RLock()
+        self._history: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def _provider(self) -> WeatherProvider:
+        if self.provider is None:
+            self.provider = default_provider()
+        return self.provider
+
+    def _path(self, postcode: str) -> str:
+        return os.path.join(self.root, f"{postcode}.json")
+
+    def _load(self, postcode: str) -> Dict[str, Dict[str, Any]]:
+        if postcode not in self._history:
+            try:
+                with open(self._path(postcode)) as f:
+                    self._history[postcode] = json.load(f)
+            except (OSError, ValueError):
+                self._history[postcode] = {}
+        return self._history[postcode]
+
+    def _save(self, postcode: str) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self._path(postcode)}.tmp{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            json.dump(self._history[postcode], f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp, self._path(postcode))
+
+    def _missing(self, postcode: str, days: List[date], today: date) -> List[Tuple[date, date]]:
+        """Ranges of `days` neither on disk nor in the forecast cache, minus ranges that failed recently."""
+        with self._lock:
+            history = self._load(postcode)
+            missing = [d for d in days if (d.isoformat() not in history if d < today
+                                           else self.forecast.get((postcode, d.isoformat())) is None)]
+        return [r for r in _missing_ranges(missing) if (postcode, *r) not in self.failed]
+
+    def _fill(self, postcode: str, days: List[date], today: date) -> None:
+        for lo, hi in self._missing(postcode, days, today):
+            try:
+                fetched = self._provider().fetch(postcode, lo, hi)
+            except Exception:  # provider weg/limiet → met wat er is verder, even niet opnieuw proberen
+                self.failed.set((postcode, lo, hi), True)
+                continue
+            with self._lock:
+                history = self._load(postcode)
+                stored = False
+                for day, record in fetched.items():
+                    if day < today.isoformat():
+                        history[day] = record
+                        stored = True
+                    else:
+                        self.forecast.set((postcode, day), record)
+                if stored:
+                    self._save(postcode)
+
+    def get(self, postcodes: Iterable[str], date_from: date | str, date_to: date | str,
+            today: date | None = None) -> pd.DataFrame:
+        """Long frame postcode, date, temp, feels_like, precip, pop, icon; days nobody could supply are absent."""
+        today = today or date.today()
+        lo, hi = pd.Timestamp(date_from).date(), pd.Timestamp(date_to).date()
+        days = [lo + timedelta(days=i) for i in range((hi - lo).days + 1)]
+        rows = []
+        for postcode in dict.fromkeys(p for p in postcodes if p):  # gedeelde postcodes één keer
+            self._fill(postcode, days, today)
+            with self._lock:
+                history = self._load(postcode)
+                for d in days:
+                    key = d.isoformat()
+                    record = history.get(key) if d < today else self.forecast.get((postcode, key))
+                    if record:
+                        rows.append({"postcode": postcode, "date": key, **record})
+        return _weather_frame(rows)
+
+
+def area_forecast(wx: pd.DataFrame) -> List[Dict[str, Any]]:
+    """WeatherStore.get frame over several postcodes → one forecast list (mean per day) for advisor.build_advice."""
+    if wx.empty:
+        return []
+    daily = wx.groupby("date", sort=True)[["temp", "feels_like", "pop"]].mean()
+    return [{"date": d.date().isoformat(), **{k: round(float(v), 2) for k, v in row.items() if pd.notna(v)}}
+            for d, row in daily.iterrows()]
+
+
+def _weather_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["postcode", "date"] + FIELDS)
+    df["date"] = pd.to_datetime(df["date"]).astype("datetime64[s]")
+    for col in ("temp", "feels_like", "precip", "pop"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+WEATHER = WeatherStore()
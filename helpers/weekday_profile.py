@@ -0,0 +1,158 @@
+# helpers/weekday_profile.py – weekdagprofiel per shop (visitors, p30, spv, mediaan) voor advisor.build_advice
+# Opslag: {HISTORY_DIR}/company={id}/_weekday_profile.arrow; bij nieuwe dagen alleen de geraakte weekdagen herberekenen
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .history_store import HISTORY_DIR, MUTABLE_DAYS, _atomic_write, _write_ipc
+
+PROFILE_WEEKS = int(os.getenv("PROFILE_WEEKS", "52"))  # venster voor p30 en mediaan
+RECENT_WEEKS = 4  # huidig niveau = gemiddelde van de laatste 4 dezelfde weekdagen
+PROFILE_COLUMNS = ["shop_id", "weekday", "visitors", "visitors_p30", "spv", "spv_median", "days"]
+
+
+def weekday_profiles(df: pd.DataFrame, weeks: int = PROFILE_WEEKS, recent_weeks: int = RECENT_WEEKS,
+                     end: pd.Timestamp | None = None) -> pd.DataFrame:
+    """One row per shop × weekday (0=Mon) from normalized daily rows, in one grouped pass.
+
+    visitors/spv are the mean of the last `recent_weeks` occurrences of that
+    weekday; visitors_p30/spv_median cover the last `weeks` weeks up to `end`.
+    """
+    if df.empty:
+        return pd.DataFrame({c: pd.Series(dtype="int64" if c in ("shop_id", "weekday", "days") else "float64")
+                             for c in PROFILE_COLUMNS})
+    end = pd.Timestamp(end if end is not None else df["date"].max())
+    window = df[(df["date"] > end - pd.Timedelta(weeks=weeks)) & (df["date"] <= end)]
+    frame = pd.DataFrame({
+        "shop_id": window["shop_id"].to_numpy(dtype=np.int64),
+        "weekday": window["date"].dt.weekday.to_numpy(dtype=np.int64),
+        "date": window["date"].to_numpy(),
+        "count_in": window["count_in"].to_numpy(dtype="float64"),
+        "spv": window["sales_per_visitor"].to_numpy(dtype="float64"),
+    }).sort_values(["shop_id", "weekday", "date"], kind="stable")
+    groups = frame.groupby(["shop_id", "weekday"], sort=True)
+    recent = frame[groups.cumcount(ascending=False) < recent_weeks].groupby(["shop_id", "weekday"], sort=True)
+    out = pd.DataFrame({
+        "visitors": recent["count_in"].mean(),
+        "visitors_p30": groups["count_in"].quantile(0.3),
+        "spv": recent["spv"].mean(),
+        "spv_median": groups["spv"].median(),
+        "days": groups.size(),
+    }).reset_index()
+    return out[PROFILE_COLUMNS]
+
+
+def _touched_weekdays(since: pd.Timestamp, end: pd.Timestamp) -> List[int]:
+    """Weekdays whose profile changes when a shop profiled through `since` gets days up to `end`."""
+    if pd.isna(since) or since > end:
+        return list(range(7))
+    first = since - pd.Timedelta(days=MUTABLE_DAYS - 1)  # laatste dagen kunnen nog gewijzigd zijn
+    return sorted({d.weekday() for d in pd.date_range(first, end)}) if end - first < pd.Timedelta(days=7) else list(range(7))
+
+
+class WeekdayProfileStore:
+    """Weekday profiles per company, kept on disk and updated with new days only.
+
+    A new day changes the profile of its own weekday (and the weekday whose
+    oldest day leaves the window, which is the same one), so an update
+    recomputes just those weekdays plus shops that were not profiled yet.
+    Every shop keeps the day its profile runs through (`through` column), so a
+    call for a subset of the shops leaves the other shops' profiles valid.
+    """
+
+    def __init__(self, root: str = HISTORY_DIR, weeks: int = PROFILE_WEEKS, recent_weeks: int = RECENT_WEEKS):
+        self.root = root
+        self.weeks = weeks
+        self.recent_weeks = recent_weeks
+        self._lock = threading.RLock()
+        self._mem: Dict[int, pd.DataFrame] = {}
+
+    def _path(self, company_id: int) -> str:
+        return os.path.join(self.root, f"company={company_id}", "_weekday_profile.arrow")
+
+    def _load(self, company_id: int) -> pd.DataFrame | None:
+        if company_id in self._mem:
+            return self._mem[company_id]
+        try:
+            with pa.memory_map(self._path(company_id), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            meta = table.schema.metadata or {}
+            if int(meta.get(b"weeks", b"0")) != self.weeks or int(meta.get(b"recent", b"0")) != self.recent_weeks:
+                return None
+            if "through" not in table.column_names:  # bestand van vóór de per-shop stand → opnieuw opbouwen
+                return None
+            self._mem[company_id] = table.to_pandas()
+            return self._mem[company_id]
+        except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+            return None
+
+    def _save(self, company_id: int, profile: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(profile, preserve_index=False)
+        table = table.replace_schema_metadata({"weeks": str(self.weeks), "recent": str(self.recent_weeks)})
+        os.makedirs(os.path.dirname(self._path(company_id)), exist_ok=True)
+        _atomic_write(self._path(company_id), lambda f: _write_ipc(f, table))
+        self._mem[company_id] = profile
+
+    def get(self, company_id: int, df: pd.DataFrame) -> pd.DataFrame:
+        """Profiles for the shops in `df` (normalized history through its last date)."""
+        if df.empty:
+            return weekday_profiles(df)
+        end = pd.Timestamp(df["date"].max())
+        shops = df["shop_id"].unique()
+        with self._lock:
+            profile = self._load(company_id)
+            if profile is None:
+                profile = weekday_profiles(df.iloc[:0]).assign(through=pd.Series(dtype="datetime64[s]"))
+            through = profile.groupby("shop_id", sort=False)["through"].first().reindex(shops)
+            weekdays = df["date"].dt.weekday
+            redo = np.zeros(len(df), dtype=bool)
+            drop = np.zeros(len(profile), dtype=bool)
+            updated: List[int] = []
+            for since, group in through.groupby(through, dropna=False):  # NaT: shop nog niet geprofileerd
+                if since == end:
+                    continue
+                sids, touched = group.index.to_numpy(), _touched_weekdays(since, end)
+                redo |= (df["shop_id"].isin(sids) & weekdays.isin(touched)).to_numpy()
+                drop |= (profile["shop_id"].isin(sids) & profile["weekday"].isin(touched)).to_numpy()
+                updated.extend(sids.tolist())
+            if updated:
+                fresh = weekday_profiles(df[redo], self.weeks, self.recent_weeks, end).assign(through=end)
+                kept = profile[~drop].copy()
+                kept.loc[kept["shop_id"].isin(updated), "through"] = end
+                profile = (pd.concat([kept, fresh], ignore_index=True)
+                           .sort_values(["shop_id", "weekday"], kind="stable").reset_index(drop=True))
+                self._save(company_id, profile)
+            return profile.loc[profile["shop_id"].isin(shops), PROFILE_COLUMNS].reset_index(drop=True)
+
+
+def advice_history(profile: pd.DataFrame, names: Dict[int, str], weather: pd.DataFrame | None = None,
+                   postcodes: Dict[int, str | None] | None = None) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """Profiles → stores_hist_by_weekday for advisor.build_advice / build_advice_batch.
+
+    `weather` (WeatherStore.get frame over the recent weeks) fills `temps` per
+    shop × weekday through the shop's postcode; without it temps stay empty.
+    """
+    temps: Dict[tuple, List[float]] = {}
+    if weather is not None and not weather.empty and postcodes:
+        wx = weather.dropna(subset=["temp"])
+        for (postcode, wd), part in wx.groupby([wx["postcode"], wx["date"].dt.weekday]):
+            temps[(postcode, int(wd))] = [float(t) for t in part["temp"]]
+    out: Dict[int, Dict[str, Dict[str, Any]]] = {wd: {} for wd in range(7)}
+    for r in profile.itertuples(index=False):
+        sid, wd = int(r.shop_id), int(r.weekday)
+        out[wd][names.get(sid, f"Shop {sid}")] = {
+            "visitors": float(r.visitors),
+            "visitors_p30": float(r.visitors_p30),
+            "spv": float(r.spv),
+            "spv_median": float(r.spv_median),
+            "temps": temps.get(((postcodes or {}).get(sid), wd), []),
+        }
+    return out
+
+
+PROFILES = WeekdayProfileStore()
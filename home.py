@@ -1,7 +1,13 @@
+import os
 import streamlit as st
 
 st.set_page_config(page_title="RetailGift AI", layout="centered")
 
+# Achtergrond-prefetch (historie, voorspellingen, weer) in dit proces; één thread, ook over reruns heen
+if os.getenv("PREFETCH", "0") == "1":
+    from helpers.scheduler import start_background
+    start_background(st.secrets["API_URL"].rstrip("/"), os.getenv("CLIENTS_JSON") or st.secrets.get("clients_json_url"))
+
 st.image("https://i.imgur.com/8Y5fX5P.png", width=300)
 st.title("STORE TRAFFIC IS A GIFT")
 st.markdown("### Kies jouw dashboard")
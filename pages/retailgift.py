@@ -1,55 +1,43 @@
 # pages/retailgift.py – DEFINITIEF PERFECTE VERSIE – ALLES WERKT – 25 nov 2025
 import streamlit as st
-import requests
 import pandas as pd
-import sys
-import os
-from datetime import date, timedelta
-from urllib.parse import urlencode
-import importlib
-import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
 import plotly.graph_objects as go
-import openai
 
-# --- PATH + NORMALIZE (zoals jij het altijd had – 100% veilig) ---
-current_dir = os.path.dirname(os.path.abspath(__file__))
-helpers_path = os.path.join(current_dir, "..", "helpers")
-if helpers_path not in sys.path:
-    sys.path.append(helpers_path)
+# --- DATA (headless rekenkern, gedeeld door alle pagina's) ---
+from helpers.dashboard import Dashboard
+from helpers.http_client import http_get
+from helpers.llm import llm_configured
+from helpers.tracing import span, start_trace
 
-import normalize
-importlib.reload(normalize)
-normalize_vemcount_response = normalize.normalize_vemcount_response
+trace = start_trace("retailgift")  # tijd per stap; paneel met ?debug=1
 
 # --- UI CSS ---
 try:
-    from helpers.ui import inject_css
+    from helpers.ui import debug_panel, inject_css
 except:
     def inject_css():
         st.markdown("", unsafe_allow_html=True)
+    def debug_panel(trace):
+        pass
 inject_css()
 
 # --- SECRETS ---
 API_BASE = st.secrets["API_URL"].rstrip("/")
 CLIENTS_JSON = st.secrets["clients_json_url"]
-VISUALCROSSING_KEY = st.secrets.get("visualcrossing_key", "demo")
 
-# --- OPENAI ---
-try:
-    client = openai.OpenAI(api_key=st.secrets["openai_api_key"])
-    st.session_state.openai_ready = True
-except:
-    st.session_state.openai_ready = False
+# --- OPENAI (client pas bij eerste gebruik, helpers/llm.py) ---
+st.session_state.openai_ready = llm_configured()
 
 # --- SIDEBAR ---
 st.sidebar.image("https://i.imgur.com/8Y5fX5P.png", width=200)
 st.sidebar.title("STORE TRAFFIC IS A GIFT")
 tool = st.sidebar.radio("Niveau", ["Store Manager", "Regio Manager", "Directie"])
-clients = requests.get(CLIENTS_JSON).json()
+with span("api.clients"):
+    clients = http_get(CLIENTS_JSON).json()
 client = st.sidebar.selectbox("Klant", clients, format_func=lambda x: f"{x['name']} ({x['brand']})")
 client_id = client["company_id"]
-locations = requests.get(f"{API_BASE}/clients/{client_id}/locations").json()["data"]
+with span("api.locations"):
+    locations = http_get(f"{API_BASE}/clients/{client_id}/locations").json()["data"]
 
 if tool == "Store Manager":
     selected = st.sidebar.multiselect("Vestiging", locations, format_func=lambda x: x["name"], default=locations[:1], max_selections=1)
@@ -58,47 +46,22 @@ else:
 shop_ids = [loc["id"] for loc in selected]
 
 # --- DATA ---
-params = [("period", "this_year"), ("period_step", "day"), ("source", "shops")]
-for sid in shop_ids: params.append(("data[]", sid))
-for output in ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]:
-    params.append(("data_output[]", output))
-url = f"{API_BASE}/get-report?{urlencode(params, doseq=True, safe='[]')}"
-resp = requests.get(url)
-if resp.status_code != 200: st.error("API fout"); st.stop()
-
-df_full = normalize_vemcount_response(resp.json())
-if df_full.empty: st.error("Geen data"); st.stop()
-
-df_full["name"] = df_full["shop_id"].map({loc["id"]: loc["name"] for loc in locations}).fillna("Onbekend")
-df_full["date"] = pd.to_datetime(df_full["date"])
-df_full = df_full.dropna(subset=["date"])
-
-today = pd.Timestamp.today().normalize()
-first_of_month = today.replace(day=1)
-last_of_this_month = (first_of_month + pd.DateOffset(months=1) - pd.Timedelta(days=1))
-first_of_last_month = first_of_month - pd.DateOffset(months=1)
-
-df_this_month = df_full[df_full["date"] >= first_of_month]
-df_last_month = df_full[(df_full["date"] >= first_of_last_month) & (df_full["date"] < first_of_month)]
-
-# --- AGGREGEER ---
-agg_cols = {"turnover": "sum", "count_in": "sum", "conversion_rate": "mean"}
-if "sales_per_visitor" in df_this_month.columns:
-    agg_cols["sales_per_visitor"] = "mean"
-
-df = df_this_month.groupby("shop_id").agg(agg_cols).reset_index()
-df["name"] = df["shop_id"].map({loc["id"]: loc["name"] for loc in locations})
-df["sq_meter"] = df["shop_id"].map({loc["id"]: loc.get("sq_meter", 100) for loc in locations})
-
-# --- MAANDVOORSPELLING ---
-days_passed = today.day
-days_left = last_of_this_month.day - days_passed
-current_turnover = df["turnover"].sum()
-avg_daily = current_turnover / days_passed if days_passed > 0 else 0
-expected_remaining = int(avg_daily * days_left * 1.07)
-total_expected = current_turnover + expected_remaining
-last_month_total = df_last_month["turnover"].sum()
-vs_last = f"{(total_expected / last_month_total - 1)*100:+.1f}%" if last_month_total > 0 else "N/A"
+dash = Dashboard(API_BASE, client_id, locations)
+api_err = dash.load(shop_ids)
+if api_err: st.error("API fout"); st.stop()
+if dash.data(shop_ids).df_full.empty: st.error("Geen data"); st.stop()
+
+today = dash.today
+first_of_month, last_of_this_month = dash.period_bounds()["this_month"]
+
+# --- AGGREGEER + MAANDVOORSPELLING (gememoïseerd in helpers/dashboard.py) ---
+df = dash.period_kpis(shop_ids, first_of_month, last_of_this_month)
+outlook = dash.month_outlook(shop_ids)
+days_left = outlook["days_left"]
+current_turnover = outlook["current_turnover"]
+expected_remaining = outlook["expected_remaining"]
+total_expected = outlook["total_expected"]
+vs_last = outlook["vs_last"]
 
 # ========================
 # STORE MANAGER VIEW – ALLES VAN GISTEREN TERUG
@@ -116,20 +79,11 @@ if tool == "Store Manager" and len(df) == 1:
     st.success(f"**Nog {days_left} dagen** → +€{expected_remaining:,} verwacht")
 
     # DAGELIJKSE DATA
-    daily = df_this_month[df_this_month["shop_id"] == row["shop_id"]].copy()
+    daily = dash.daily([row["shop_id"]], first_of_month)
     daily["dag"] = daily["date"].dt.strftime("%a %d %b")
 
     # VOORSPELLING
-    recent = df_full[(df_full["date"] >= today - pd.Timedelta(days=30)) & (df_full["shop_id"] == row["shop_id"])]
-    hist_footfall = recent["count_in"].fillna(240).astype(int).tolist()
-    def forecast_series(s, steps=7):
-        if len(s) < 3: return [int(np.mean(s or [240]))] * steps
-        try:
-            model = ARIMA(s, order=(1,1,1)).fit()
-            return [max(50, int(round(x))) for x in model.forecast(steps)]
-        except:
-            return [int(np.mean(s))] * steps
-    forecast_footfall = forecast_series(hist_footfall)
+    forecast_footfall = dash.forecast([row["shop_id"]], 7).get(int(row["shop_id"]), [240] * 7)
     future_dates = pd.date_range(today + pd.Timedelta(days=1), periods=7)
     base_conv = row["conversion_rate"] / 100
     base_spv = row.get("sales_per_visitor", 2.8)
@@ -140,14 +94,8 @@ if tool == "Store Manager" and len(df) == 1:
     st.dataframe(forecast_df.style.format({"Verw. Footfall": "{:,}", "Verw. Omzet": "€{:,}"}))
 
     # WEER
-    zip_code = selected[0]["zip"][:4]
-    weather_df = pd.DataFrame()
-    try:
-        r = requests.get(f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{zip_code}NL?unitGroup=metric&key={VISUALCROSSING_KEY}&include=days", timeout=10)
-        if r.status_code == 200:
-            days = r.json()["days"][:15]
-            weather_df = pd.DataFrame([{"Dag": pd.to_datetime(d["datetime"]).strftime("%a %d"), "Icon": d["icon"]} for d in days])
-    except: pass
+    wx = dash.weather([row["shop_id"]], future_dates[0], future_dates[-1])
+    weather_df = pd.DataFrame({"Dag": wx["date"].dt.strftime("%a %d"), "Icon": wx["icon"]})
     if weather_df.empty:
         weather_df = pd.DataFrame({"Dag": forecast_df["Dag"], "Icon": ["partly-cloudy-day"]*7})
     icon_map = {"clear-day": "☀️", "partly-cloudy-day": "⛅", "cloudy": "☁️", "rain": "🌧️", "snow": "❄️", "default": "🌤️"}
@@ -163,7 +111,8 @@ if tool == "Store Manager" and len(df) == 1:
         fig.add_annotation(x=w["Dag"], y=max_y, text=w["Weer"], showarrow=False, font=dict(size=26))
     fig.update_layout(height=700, barmode="group", title="Footfall & Omzet + Weer + Voorspelling", 
                       plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white")
-    st.plotly_chart(fig, use_container_width=True)
+    with span("render.plotly", traces=len(fig.data)):
+        st.plotly_chart(fig, use_container_width=True)
 
     # ACTIE
     if row["conversion_rate"] < 12:
@@ -205,4 +154,5 @@ elif tool == "Regio Manager":
 
     # Hotspot + Potential + Chat – allemaal werken
 
+debug_panel(trace)
 st.caption("RetailGift AI – ALLES TERUG + 100% WERKENDE – NOOIT MEER ERRORS – 25 nov 2025")
@@ -1,31 +1,23 @@
 # pages/retailgift_regio.py – 100% WERKENDE REGIO MANAGER MET LIVE CBS GRAFIEK (25 nov 2025)
 import streamlit as st
-import requests
 import pandas as pd
-import sys
-import os
-from datetime import date, timedelta
-from urllib.parse import urlencode
-import importlib
-import numpy as np
 import plotly.graph_objects as go
-from openai import OpenAI
 
-# --- PATH + RELOAD ---
-current_dir = os.path.dirname(os.path.abspath(__file__))
-helpers_path = os.path.join(current_dir, "..", "helpers")
-if helpers_path not in sys.path:
-    sys.path.append(helpers_path)
-import normalize
-importlib.reload(normalize)
-normalize_vemcount_response = normalize.normalize_vemcount_response
+# --- GEDEELDE DATALAAG (cache over reruns en pagina's) ---
+from helpers.dashboard import Dashboard
+from helpers.http_client import http_get
+from helpers.llm import chat
+from helpers.tracing import span, start_trace
+
+trace = start_trace("retailgift_regio")  # tijd per stap; paneel met ?debug=1
 
 # --- UI FALLBACK ---
 try:
-    from helpers.ui import inject_css, kpi_card
+    from helpers.ui import debug_panel, inject_css, kpi_card
 except:
     def inject_css(): st.markdown("", unsafe_allow_html=True)
     def kpi_card(t, v, d, c=""): st.metric(t, v, d)
+    def debug_panel(trace): pass
 
 # --- PAGE CONFIG ---
 st.set_page_config(layout="wide", initial_sidebar_state="expanded")
@@ -35,54 +27,33 @@ inject_css()
 API_BASE = st.secrets["API_URL"].rstrip("/")
 CLIENTS_JSON = st.secrets["clients_json_url"]
 
-# --- OPENAI ---
-client = OpenAI(api_key=st.secrets["openai_api_key"])
-
 # --- SIDEBAR ---
 st.sidebar.image("https://i.imgur.com/8Y5fX5P.png", width=200)
 st.sidebar.title("STORE TRAFFIC IS A GIFT")
-clients = requests.get(CLIENTS_JSON).json()
+with span("api.clients"):
+    clients = http_get(CLIENTS_JSON).json()
 client = st.sidebar.selectbox("Klant", clients, format_func=lambda x: f"{x['name']} ({x['brand']})")
 client_id = client["company_id"]
-locations = requests.get(f"{API_BASE}/clients/{client_id}/locations").json()["data"]
+with span("api.locations"):
+    locations = http_get(f"{API_BASE}/clients/{client_id}/locations").json()["data"]
 
 # --- ALLE WINKELS AUTOMATISCH ---
 shop_ids = [loc["id"] for loc in locations]
 
-# --- DATA OPHALEN ---
-params = [("period", "this_year"), ("period_step", "day"), ("source", "shops")]
-for sid in shop_ids:
-    params.append(("data[]", sid))
-for output in ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]:
-    params.append(("data_output[]", output))
-url = f"{API_BASE}/get-report?{urlencode(params, doseq=True, safe='[]')}"
-resp = requests.get(url)
-if resp.status_code != 200:
+# --- DATA OPHALEN + NORMALISATIE (headless rekenkern, gememoïseerd over reruns en pagina's) ---
+dash = Dashboard(API_BASE, client_id, locations)
+api_err = dash.load(shop_ids)
+if api_err:
     st.error("API fout")
     st.stop()
-
-# --- JOUW WERKENDE NORMALISATIE ---
-raw_json = resp.json()
-df_full = normalize_vemcount_response(raw_json)
-if df_full.empty:
+if dash.data(shop_ids).df_full.empty:
     st.error("Geen data")
     st.stop()
-df_full["name"] = df_full["shop_id"].map({loc["id"]: loc["name"] for loc in locations}).fillna("Onbekend")
-df_full["date"] = pd.to_datetime(df_full["date"], errors='coerce')
-df_full = df_full.dropna(subset=["date"])
-
-# --- FILTER OP DEZE MAAND ---
-today = pd.Timestamp.today().normalize()
-first_of_month = today.replace(day=1)
-last_of_this_month = (first_of_month + pd.DateOffset(months=1) - pd.Timedelta(days=1))
-df_raw = df_full[(df_full["date"] >= first_of_month) & (df_full["date"] <= last_of_this_month)]
-
-# --- AGGREGEER ---
-daily_correct = df_raw.groupby(["shop_id", "date"])["turnover"].max().reset_index()
-df = daily_correct.groupby("shop_id").agg({"turnover": "sum"}).reset_index()
-temp = df_raw.groupby("shop_id").agg({"count_in": "sum", "conversion_rate": "mean", "sales_per_visitor": "mean"}).reset_index()
-df = df.merge(temp, on="shop_id", how="left")
-df["name"] = df["shop_id"].map({loc["id"]: loc["name"] for loc in locations})
+
+# --- DEZE MAAND ---
+today = dash.today
+first_of_month, last_of_this_month = dash.period_bounds()["this_month"]
+df = dash.period_kpis(shop_ids, first_of_month, last_of_this_month)
 
 # --- KPI'S ---
 agg = df.agg({"count_in": "sum", "turnover": "sum", "conversion_rate": "mean", "sales_per_visitor": "mean"})
@@ -111,11 +82,18 @@ cbs_detailhandel = {
     "Nov": 131.0, "Dec": 135.5
 }
 
-# Jouw regio omzet per maand
-monthly = df_full.groupby(df_full["date"].dt.strftime("%b"))["turnover"].sum().reindex(cbs_vertrouwen.keys(), fill_value=0)
+# Jouw regio omzet per maand (per regio gestapeld als de winkels over meerdere regio's verdeeld zijn)
+month_labels = list(cbs_vertrouwen.keys())
+by_region = dash.data(shop_ids).rollup.regions()
+by_region = by_region[by_region["key"].dt.year == today.year]
 
 fig = go.Figure()
-fig.add_trace(go.Bar(x=monthly.index, y=monthly.values, name="Jouw regio omzet", marker_color="#ff7f0e"))
+for region, part in by_region.groupby("region", sort=True):
+    monthly = part.set_index(part["key"].dt.month)["turnover"].reindex(range(1, 13), fill_value=0)
+    if by_region["region"].nunique() == 1:
+        fig.add_trace(go.Bar(x=month_labels, y=monthly.values, name="Jouw regio omzet", marker_color="#ff7f0e"))
+    else:
+        fig.add_trace(go.Bar(x=month_labels, y=monthly.values, name=f"Omzet {region}"))
 fig.add_trace(go.Scatter(x=list(cbs_vertrouwen.keys()), y=list(cbs_vertrouwen.values()), name="Consumentenvertrouwen", yaxis="y2", line=dict(color="#00d4ff", width=5)))
 fig.add_trace(go.Scatter(x=list(cbs_detailhandel.keys()), y=list(cbs_detailhandel.values()), name="Detailhandel NL (index)", yaxis="y3", line=dict(color="#2ca02c", width=4, dash="dot")))
 fig.update_layout(
@@ -123,9 +101,11 @@ fig.update_layout(
     yaxis=dict(title="Omzet €"),
     yaxis2=dict(title="Vertrouwen", overlaying="y", side="right"),
     yaxis3=dict(title="NL omzet index", overlaying="y", side="right", position=0.94),
+    barmode="stack",
     height=500
 )
-st.plotly_chart(fig, use_container_width=True)
+with span("render.plotly", traces=len(fig.data)):
+    st.plotly_chart(fig, use_container_width=True)
 
 # --- WINKELPRESTATIES MET STOPLICHTEN ---
 st.subheader("Winkelprestaties vs regio gemiddelde")
@@ -150,6 +130,27 @@ df_display = df_display[["name", "count_in", "conversion_rate", "turnover", "vs
 df_display.columns = ["Winkel", "Footfall", "Conversie %", "Omzet €", "vs Regio", "Aandeel omzet"]
 st.dataframe(df_display.style.format({"Footfall": "{:,}", "Conversie %": "{:.1f}", "Omzet €": "€{:,}"}), use_container_width=True)
 
+# --- VOORSPELLING FOOTFALL ALLE WINKELS (batch, parallel, gecachet) ---
+st.subheader("Verwachte footfall komende 7 dagen")
+fc = dash.forecast_frame(shop_ids, 7)
+if not fc.empty:
+    fc["Winkel"] = fc["name"]
+    fc["Dag"] = fc["date"].dt.strftime("%a %d")
+    fc_wide = fc.pivot_table(index="Winkel", columns="Dag", values="count_in_forecast", aggfunc="sum", sort=False)
+    fc_wide["Totaal 7d"] = fc_wide.sum(axis=1)
+    st.dataframe(fc_wide.sort_values("Totaal 7d", ascending=False).style.format("{:,.0f}"), use_container_width=True)
+
+# --- ACTIEPLAN KOMENDE 7 DAGEN (weekdagprofielen + weer → advisor-regels) ---
+st.subheader("Actieplan komende 7 dagen")
+cci = cbs_vertrouwen[month_labels[today.month - 1]]
+advice = dash.advice(shop_ids, cci, client["name"])  # weekdagprofielen + weer → advisor-regels van deze klant
+plan = [{"Dag": pd.Timestamp(d["date"]).strftime("%a %d"), "Winkel": s["store"], "Actie": a}
+        for d in advice["days"] for s in d["stores"] for a in s["store_actions"] + s["regional_actions"]]
+if plan:
+    st.dataframe(pd.DataFrame(plan), use_container_width=True, hide_index=True)
+else:
+    st.info("Geen weersverwachting beschikbaar voor het actieplan")
+
 # --- AI HOTSPOT DETECTOR ---
 st.markdown("### 🤖 AI Hotspot Detector – Automatische aanbeveling")
 worst = df_display.iloc[-1]
@@ -161,19 +162,7 @@ if "🟢" in best["vs Regio"]:
 
 # --- LOCATION POTENTIAL 2.0 ---
 st.subheader("Location Potential 2.0 – Wat zou elke winkel écht moeten opleveren?")
-pot_list = []
-for _, r in df.iterrows():
-    hist = df_full[df_full["shop_id"] == r["shop_id"]]
-    best_conv = hist["conversion_rate"].quantile(0.75)/100 if len(hist)>5 else 0.16
-    best_spv = hist["sales_per_visitor"].quantile(0.75) if len(hist)>5 else 3.3
-    foot = hist["count_in"].tail(30).mean() or 500
-    pot_perf = foot * best_conv * best_spv * 30 * 1.03
-    pot_m2 = r.get("sq_meter", 100) * 87.5 * 1.03
-    final = max(pot_perf, pot_m2)
-    gap = final - r["turnover"]
-    pot_list.append({"Winkel": r["name"], "Gap €": int(gap), "Realisatie": f"{int(r['turnover']/final*100)}%"})
-
-pot_df = pd.DataFrame(pot_list).sort_values("Gap €", ascending=False)
+pot_df = dash.potential(shop_ids, first_of_month, last_of_this_month)  # p75 uit de lopende sketches: dit jaar t/m eergisteren
 st.dataframe(pot_df.style.format({"Gap €": "€{:,}"}), use_container_width=True)
 st.success(f"**Totaal onbenut potentieel: €{int(pot_df['Gap €'].sum()):,}**")
 
@@ -192,17 +181,15 @@ if prompt := st.chat_input("Vraag alles over omzet, conversie, potentieel..."):
         st.markdown(prompt)
     with st.chat_message("assistant"):
         with st.spinner("AI denkt na..."):
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                temperature=0.3,
-                messages=[
+            # OpenAI-client wordt pas hier (eerste vraag) geïmporteerd en aangemaakt (helpers/llm.py)
+            with span("llm.chat"):
+                answer = chat([
                     {"role": "system", "content": "Je bent McKinsey senior retail analist. Antwoord kort, concreet en actiegericht in normaal Nederlands."},
                     {"role": "user", "content": f"Data: {len(df)} winkels, omzet €{int(agg['turnover']):,}, totaal onbenut €{int(pot_df['Gap €'].sum()):,}. Vraag: {prompt}"}
-                ]
-            )
-            answer = response.choices[0].message.content
+                ])
             st.markdown(answer)
             st.session_state.messages.append({"role": "assistant", "content": answer})
 
+debug_panel(trace)
 st.success("REGIO MANAGER 100% WERKENDE – KLAAR VOOR MORGEN")
 st.balloons()
@@ -1,31 +1,24 @@
 # pages/retailgift_store.py – 100% JOUW WERKENDE SCRIPT + FIXES + VERWACHTE OMZET + % VS VORIGE MAAND (25 nov 2025)
 import streamlit as st
-import requests
 import pandas as pd
-import sys
-import os
 from datetime import date, timedelta
-from urllib.parse import urlencode
-import importlib
-import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
 import plotly.graph_objects as go
 
-# --- 1. PATH + RELOAD ---
-current_dir = os.path.dirname(os.path.abspath(__file__))
-helpers_path = os.path.join(current_dir, "..", "helpers")
-if helpers_path not in sys.path:
-    sys.path.append(helpers_path)
-import normalize
-importlib.reload(normalize)
-normalize_vemcount_response = normalize.normalize_vemcount_response
+# --- 1. GEDEELDE DATALAAG (cache over reruns en pagina's) ---
+from helpers.dashboard import Dashboard
+from helpers.http_client import http_get
+from helpers.forecast_compose import calendar_table, compose_turnover, weekday_multipliers
+from helpers.tracing import span, start_trace
+
+trace = start_trace("retailgift_store")  # tijd per stap; paneel met ?debug=1
 
 # --- 2. UI FALLBACK ---
 try:
-    from helpers.ui import inject_css, kpi_card
+    from helpers.ui import debug_panel, inject_css, kpi_card
 except:
     def inject_css(): st.markdown("", unsafe_allow_html=True)
     def kpi_card(t, v, d, c=""): st.metric(t, v, d)
+    def debug_panel(trace): pass
 
 # --- 3. PAGE CONFIG ---
 st.set_page_config(layout="wide", initial_sidebar_state="expanded")
@@ -34,16 +27,17 @@ inject_css()
 # --- 4. SECRETS ---
 API_BASE = st.secrets["API_URL"].rstrip("/")
 CLIENTS_JSON = st.secrets["clients_json_url"]
-VISUALCROSSING_KEY = st.secrets.get("visualcrossing_key", "demo")
 
 # --- 5. SIDEBAR ---
 st.sidebar.image("https://i.imgur.com/8Y5fX5P.png", width=200)
 st.sidebar.title("STORE TRAFFIC IS A GIFT")
 tool = st.sidebar.radio("Niveau", ["Store Manager", "Regio Manager", "Directie"])
-clients = requests.get(CLIENTS_JSON).json()
+with span("api.clients"):
+    clients = http_get(CLIENTS_JSON).json()
 client = st.sidebar.selectbox("Klant", clients, format_func=lambda x: f"{x['name']} ({x['brand']})")
 client_id = client["company_id"]
-locations = requests.get(f"{API_BASE}/clients/{client_id}/locations").json()["data"]
+with span("api.locations"):
+    locations = http_get(f"{API_BASE}/clients/{client_id}/locations").json()["data"]
 
 if tool == "Store Manager":
     selected = st.sidebar.multiselect("Vestiging", locations, format_func=lambda x: x["name"], default=locations[:1])
@@ -65,105 +59,49 @@ if period_option == "date":
     form_date_from = start.strftime("%Y-%m-%d")
     form_date_to = end.strftime("%Y-%m-%d")
 
-# --- 6. DATA OPHALEN ---
-params = [("period", "this_year"), ("period_step", "day"), ("source", "shops")]
-for sid in shop_ids:
-    params.append(("data[]", sid))
-for output in ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]:
-    params.append(("data_output[]", output))
-url = f"{API_BASE}/get-report?{urlencode(params, doseq=True, safe='[]')}"
-resp = requests.get(url)
-if resp.status_code != 200:
+# --- 6. DATA OPHALEN (één /get-report voor KPI's + weekdaggemiddelden, gedeeld via helpers/dashboard.py) ---
+dash = Dashboard(API_BASE, client_id, locations)
+api_err = dash.load(shop_ids)
+if api_err:
     st.error("API fout")
     st.stop()
-raw_json = resp.json()
-df_full = normalize_vemcount_response(raw_json)
+df_full = dash.data(shop_ids).df_full
 if df_full.empty:
     st.error("Geen data")
     st.stop()
-df_full["name"] = df_full["shop_id"].map({loc["id"]: loc["name"] for loc in locations}).fillna("Onbekend")
-df_full["date"] = pd.to_datetime(df_full["date"], errors='coerce')
-df_full = df_full.dropna(subset=["date"])
 
 # --- 7. DATUMVARIABELEN + FILTER ---
-today = pd.Timestamp.today().normalize()
-start_week = today - pd.Timedelta(days=today.weekday())
-end_week = start_week + pd.Timedelta(days=6)
-start_last_week = start_week - pd.Timedelta(days=7)
-end_last_week = end_week - pd.Timedelta(days=7)
-first_of_month = today.replace(day=1)
-last_of_this_month = (first_of_month + pd.DateOffset(months=1) - pd.Timedelta(days=1))
-first_of_last_month = first_of_month - pd.DateOffset(months=1)
-
-if period_option == "yesterday":
-    df_raw = df_full[df_full["date"] == (today - pd.Timedelta(days=1))]
-elif period_option == "today":
-    df_raw = df_full[df_full["date"] == today]
-elif period_option == "this_week":
-    df_raw = df_full[(df_full["date"] >= start_week) & (df_full["date"] <= end_week)]
-elif period_option == "last_week":
-    df_raw = df_full[(df_full["date"] >= start_last_week) & (df_full["date"] <= end_last_week)]
-elif period_option == "this_month":
-    df_raw = df_full[(df_full["date"] >= first_of_month) & (df_full["date"] <= last_of_this_month)]
-elif period_option == "last_month":
-    df_raw = df_full[(df_full["date"] >= first_of_last_month) & (df_full["date"] < first_of_month)]
-elif period_option == "date":
-    start = pd.to_datetime(form_date_from)
-    end = pd.to_datetime(form_date_to)
-    df_raw = df_full[(df_full["date"] >= start) & (df_full["date"] <= end)]
+today = dash.today
+period_bounds = dash.period_bounds()
+first_of_month, last_of_this_month = period_bounds["this_month"]
+first_of_last_month, last_of_last_month = period_bounds["last_month"]
+if period_option == "date":
+    period_from, period_to = pd.to_datetime(form_date_from), pd.to_datetime(form_date_to)
 else:
-    df_raw = df_full.copy()
+    period_from, period_to = period_bounds.get(period_option, (df_full["date"].min(), df_full["date"].max()))
+df_raw = dash.daily(shop_ids, period_from, period_to)
 
 # --- 8. VORIGE PERIODE (voor delta's) ---
 prev_agg = pd.Series({"count_in": 0, "turnover": 0, "conversion_rate": 0, "sales_per_visitor": 0})
-if period_option == "this_week":
-    prev_data = df_full[(df_full["date"] >= start_last_week) & (df_full["date"] <= end_last_week)]
-    if not prev_data.empty:
-        prev_agg = prev_data.agg({"count_in": "sum", "turnover": "sum", "conversion_rate": "mean", "sales_per_visitor": "mean"})
-elif period_option == "this_month":
-    prev_data = df_full[(df_full["date"] >= first_of_last_month) & (df_full["date"] < first_of_month)]
-    if not prev_data.empty:
-        prev_agg = prev_data.agg({"count_in": "sum", "turnover": "sum", "conversion_rate": "mean", "sales_per_visitor": "mean"})
+prev_bounds = {"this_week": period_bounds["last_week"], "this_month": period_bounds["last_month"]}
+if period_option in prev_bounds:
+    prev = dash.totals(shop_ids, *prev_bounds[period_option])
+    if not prev.empty:
+        prev_agg = prev
 
 # --- 9. AGGREGEER HUIDIGE PERIODE ---
-daily_correct = df_raw.groupby(["shop_id", "date"])["turnover"].max().reset_index()
-df = daily_correct.groupby("shop_id").agg({"turnover": "sum"}).reset_index()
-temp = df_raw.groupby("shop_id").agg({"count_in": "sum", "conversion_rate": "mean", "sales_per_visitor": "mean"}).reset_index()
-df = df.merge(temp, on="shop_id", how="left")
-df["name"] = df["shop_id"].map({loc["id"]: loc["name"] for loc in locations})
+df = dash.period_kpis(shop_ids, period_from, period_to)
 
-# --- 10. WEEKDAG GEMIDDELDEN ---
-params_hist = [("period", "this_year"), ("period_step", "day"), ("source", "shops")]
-for sid in shop_ids:
-    params_hist.append(("data[]", sid))
-for output in ["conversion_rate", "sales_per_transaction"]:
-    params_hist.append(("data_output[]", output))
-url_hist = f"{API_BASE}/get-report?{urlencode(params_hist, doseq=True, safe='[]')}"
-resp_hist = requests.get(url_hist)
-df_hist = normalize_vemcount_response(resp_hist.json()) if resp_hist.status_code == 200 else pd.DataFrame()
-for col in ["conversion_rate", "sales_per_transaction", "date"]:
-    if col not in df_hist.columns:
-        df_hist[col] = 0.0 if col != "date" else pd.NaT
-df_hist["date"] = pd.to_datetime(df_hist["date"], errors='coerce')
-df_hist["weekday"] = df_hist["date"].dt.weekday.fillna(0).astype(int)
-weekday_avg = pd.DataFrame({"conversion_rate": [13.0]*7, "sales_per_transaction": [22.0]*7}, index=range(7))
-if not df_hist.empty:
-    temp = df_hist.groupby("weekday")[["conversion_rate", "sales_per_transaction"]].mean()
-    weekday_avg.update(temp)
+# --- 10. WEEKDAG GEMIDDELDEN (lopende statistiek per shop × weekdag, alleen nieuwe dagen worden bijgewerkt) ---
+# Basis: dit jaar t/m eergisteren (vandaag en gisteren kunnen nog wijzigen en tellen nog niet mee)
+weekday_avg = dash.weekday_avg(shop_ids)
 
-# --- 11. VOORSPELLING FUNCTIE ---
-def forecast_series(series, steps=7):
-    series = [x for x in series if pd.notnull(x) and x > 0]
-    if len(series) < 3:
-        return [int(np.mean(series))] * steps if series else [240] * steps
-    try:
-        model = ARIMA(series, order=(1,1,1))
-        forecast = model.fit().forecast(steps=steps)
-        return [max(50, int(round(f))) for f in forecast]
-    except:
-        return [int(np.mean(series))] * steps if series else [240] * steps
+# Multiplier-tabellen voor de omzetvoorspelling (dag van de maand / maand → factor)
+WEATHER_BY_DAY = {d: 0.92 for d in range(19, 24)}   # slecht weer verwacht, overige dagen 1.05
+EVENT_BY_DAY = {d: 1.30 for d in range(21, 32)}     # Black Friday-periode
+CBS_BY_MONTH = {m: 0.96 for m in range(1, 13)}      # consumentenvertrouwen per maand
 
-# --- 12. STORE MANAGER VIEW ---
+# --- 11. STORE MANAGER VIEW ---
 if tool == "Store Manager" and len(selected) == 1:
     if df.empty:
         st.error("Geen data beschikbaar")
@@ -178,8 +116,7 @@ if tool == "Store Manager" and len(selected) == 1:
     expected_remaining = int(avg_daily * days_left * 1.07)  # +7% Q4 uplift
     total_expected = current_turnover + expected_remaining
 
-    last_month_data = df_full[(df_full["date"] >= first_of_last_month) & (df_full["date"] < first_of_month) & (df_full["shop_id"] == row["shop_id"])]
-    last_month_turnover = last_month_data["turnover"].sum()
+    last_month_turnover = dash.totals([row["shop_id"]], first_of_last_month, last_of_last_month).get("turnover", 0)
     vs_last = f"{(total_expected / last_month_turnover - 1)*100:+.1f}%" if last_month_turnover > 0 else "N/A"
 
     # --- % VERGELIJKING TOT NU TOE (TERUG ZOALS GISTEREN) ---
@@ -204,28 +141,18 @@ if tool == "Store Manager" and len(selected) == 1:
     daily = df_raw[["date", "count_in", "conversion_rate", "turnover"]].copy()
     daily["date"] = daily["date"].dt.strftime("%a %d")
 
-    # VOORSPELLING
-    recent = df_full[df_full["date"] >= (today - pd.Timedelta(days=30))]
-    hist_footfall = recent["count_in"].fillna(240).astype(int).tolist()
-    if len(hist_footfall) == 0:
-        hist_footfall = [240] * 30
-    forecast_footfall = forecast_series(hist_footfall, 7)
+    # VOORSPELLING (ARIMA, gecachet per shop + laatste datum → niet elke rerun opnieuw fitten)
+    forecast_footfall = dash.forecast([row["shop_id"]], 7).get(int(row["shop_id"]), [240] * 7)
     future_dates = pd.date_range(today + pd.Timedelta(days=1), periods=7)
     base_conv = row.get("conversion_rate", 12.8) / 100
     base_spv = row.get("sales_per_visitor", 2.67)
-    forecast_turnover = []
-    for i, d in enumerate(future_dates):
-        wd = d.weekday()
-        conv_mult = max(weekday_avg.loc[wd, "conversion_rate"] / 13.0, 0.85)
-        spv_mult = max(weekday_avg.loc[wd, "sales_per_transaction"] / 22.0, 0.85)
-        weather = 0.92 if d.day in [19,20,21,22,23] else 1.05
-        bf = 1.30 if d.day >= 21 else 1.0
-        cbs = 0.96
-        final_conv = base_conv * conv_mult * weather * bf * cbs
-        final_spv = base_spv * spv_mult * weather * bf * cbs
-        omzet = forecast_footfall[i] * final_conv * final_spv
-        omzet = max(400, int(round(omzet)))
-        forecast_turnover.append(omzet)
+    forecast_turnover = compose_turnover(
+        [forecast_footfall], [base_conv], [base_spv], future_dates,
+        weekday=weekday_multipliers(weekday_avg),
+        weather=calendar_table(future_dates, WEATHER_BY_DAY, "day", default=1.05),
+        event=calendar_table(future_dates, EVENT_BY_DAY, "day"),
+        cbs=calendar_table(future_dates, CBS_BY_MONTH, "month"),
+    )[0].tolist()
     forecast_df = pd.DataFrame({
         "Dag": future_dates.strftime("%a %d"),
         "Verw. Footfall": forecast_footfall,
@@ -235,31 +162,16 @@ if tool == "Store Manager" and len(selected) == 1:
     st.dataframe(forecast_df.style.format({"Verw. Footfall": "{:,}", "Verw. Omzet": "€{:,}"}))
 
     # WEERLIJNEN + ICONEN
-    zip_code = selected[0]["zip"][:4]
+    # weer uit de lokale cache per postcode (alleen ontbrekende dagen worden opgehaald); geen data → geen weerlijnen
     start_hist = df_raw["date"].min().date()
     end_forecast = today.date() + timedelta(days=7)
-    vc_url = f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{zip_code}NL/{start_hist}/{end_forecast}?unitGroup=metric&key={VISUALCROSSING_KEY}&include=days"
-    weather_df = pd.DataFrame()
-    try:
-        r = requests.get(vc_url, timeout=10)
-        if r.status_code == 200:
-            days = r.json()["days"]
-            weather_df = pd.DataFrame([{
-                "Dag": pd.to_datetime(d["datetime"]).strftime("%a %d"),
-                "Temp": round(d["temp"], 1),
-                "Neerslag_mm": round(d.get("precip", 0), 1),
-                "Icon": d["icon"]
-            } for d in days])
-    except:
-        pass
-    if weather_df.empty:
-        all_dates = pd.date_range(start_hist, end_forecast)
-        weather_df = pd.DataFrame([{
-            "Dag": d.strftime("%a %d"),
-            "Temp": 8 + np.random.uniform(-3, 3),
-            "Neerslag_mm": max(0, np.random.exponential(1.5)),
-            "Icon": "partly-cloudy-day"
-        } for d in all_dates])
+    wx = dash.weather([row["shop_id"]], start_hist, end_forecast)
+    weather_df = pd.DataFrame({
+        "Dag": wx["date"].dt.strftime("%a %d"),
+        "Temp": wx["temp"].round(1),
+        "Neerslag_mm": wx["precip"].round(1),
+        "Icon": wx["icon"],
+    })
     icon_map = {
         "clear-day": "☀️", "clear-night": "🌙", "partly-cloudy-day": "⛅", "partly-cloudy-night": "🌤️",
         "cloudy": "☁️", "overcast": "☁️☁️", "fog": "🌫️", "rain": "🌧️", "drizzle": "🌦️",
@@ -295,7 +207,8 @@ if tool == "Store Manager" and len(selected) == 1:
         plot_bgcolor="#0e1117",
         paper_bgcolor="#0e1117"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    with span("render.plotly", traces=len(fig.data)):  # figuur → JSON naar de browser; tekenen daar telt niet mee
+        st.plotly_chart(fig, use_container_width=True)
 
     # ACTIE
     conv = row.get("conversion_rate", 0)
@@ -304,4 +217,5 @@ if tool == "Store Manager" and len(selected) == 1:
     else:
         st.success("**Top:** Conversie ≥12%. Vandaag piek 12-16u → upselling push!")
 
+debug_panel(trace)
 st.caption("RetailGift AI – Store Manager – 100% WERKENDE VERSIE – VERWACHTE OMZET + % VS VORIGE MAAND – 25 nov 2025")